@@ -1,15 +1,19 @@
+import os
+import re
+import json
+import asyncio
+from functools import lru_cache
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
-from langgraph.graph import StateGraph, END
+from langchain_core.runnables import RunnableConfig
+from langgraph.graph import StateGraph, START, END
+from langgraph.config import get_stream_writer
+from ai_agent.engine_registry import engine_registry, get_llm_cache, stage_temperature
 from utils.enum import ENUM
-from text_to_sql.text_to_sql import TextToSQL
-from text_to_sql.common import (
-    Config,
-    LLMConfig,
-    SLConfig,
-    ContextConfig,
-    QueryConfig,
-)
+from text_to_sql.core import AsyncGeneralLLM
+from text_to_sql.common import LLMConfig
+
+TRIAGE_MODES = ("sequential", "parallel", "fused")
 
 
 class AgentState(BaseModel):
@@ -37,8 +41,8 @@ def format_history(history, max_turns=5):
 
 
 # Tool: Detect language of query
-def detect_language_tool(state: AgentState, llm_agent) -> dict:
-    """Detect language (English or Indonesian) based on user query."""
+def language_prompt(state: AgentState) -> tuple:
+    """Build the (system_prompt, user_prompt) pair for language detection."""
     query = state.query
 
     system_prompt = """
@@ -51,7 +55,10 @@ def detect_language_tool(state: AgentState, llm_agent) -> dict:
     "Apa kabar hari ini?" -> id
     """
 
-    result = llm_agent.generate(system_prompt=system_prompt.strip(), user_prompt=query)
+    return system_prompt.strip(), query
+
+
+def parse_language(result: str) -> dict:
     lang = result.strip().lower()
 
     if lang not in ["en", "id"]:
@@ -59,8 +66,23 @@ def detect_language_tool(state: AgentState, llm_agent) -> dict:
 
     return {"Language": lang}
 
+
+def detect_language_tool(state: AgentState, llm_agent) -> dict:
+    """Detect language (English or Indonesian) based on user query."""
+    system_prompt, user_prompt = language_prompt(state)
+    result = llm_agent.generate(system_prompt=system_prompt, user_prompt=user_prompt)
+    return parse_language(result)
+
+
+async def adetect_language_tool(state: AgentState, llm_agent) -> dict:
+    """Async variant of detect_language_tool for an AsyncGeneralLLM."""
+    system_prompt, user_prompt = language_prompt(state)
+    result = await llm_agent.generate(system_prompt=system_prompt, user_prompt=user_prompt)
+    return parse_language(result)
+
+
 # Tool: Detect if query is data-retrieval related (for text-to-SQL use case)
-def detect_intent_tool(state: AgentState, llm_agent) -> dict:
+def intent_prompt(state: AgentState) -> tuple:
     query = state.query
 
     """
@@ -112,7 +134,10 @@ def detect_intent_tool(state: AgentState, llm_agent) -> dict:
     \"\"\"{query}\"\"\"
     """
 
-    result = llm_agent.generate(system_prompt=system_prompt.strip(), user_prompt="")
+    return system_prompt.strip(), ""
+
+
+def parse_intent(result: str) -> dict:
     final = result.strip().lower()
 
     if final not in ["data", "other"]:
@@ -122,9 +147,23 @@ def detect_intent_tool(state: AgentState, llm_agent) -> dict:
     return {"DetectIntent": final}
 
 
+def detect_intent_tool(state: AgentState, llm_agent) -> dict:
+    """Detect whether the query asks for data ('data') or not ('other')."""
+    system_prompt, user_prompt = intent_prompt(state)
+    result = llm_agent.generate(system_prompt=system_prompt, user_prompt=user_prompt)
+    return parse_intent(result)
+
+
+async def adetect_intent_tool(state: AgentState, llm_agent) -> dict:
+    """Async variant of detect_intent_tool for an AsyncGeneralLLM."""
+    system_prompt, user_prompt = intent_prompt(state)
+    result = await llm_agent.generate(system_prompt=system_prompt, user_prompt=user_prompt)
+    return parse_intent(result)
+
+
 # Tool: Check if the query is specific enough for SQL generation
-def is_question_detailed_enough(state: AgentState, llm_agent) -> dict:
-    """Check if the query is specific enough for SQL generation."""
+def details_prompt(state: AgentState) -> tuple:
+    """Build the (system_prompt, user_prompt) pair for the detail sufficiency check."""
     query = state.query
     history = state.history or []
     history_text = format_history(history, max_turns=3)
@@ -154,7 +193,10 @@ def is_question_detailed_enough(state: AgentState, llm_agent) -> dict:
     Return only 'yes' or 'no' based on the following query:
     """
 
-    result = llm_agent.generate(system_prompt=system_prompt.strip(), user_prompt=query)
+    return system_prompt.strip(), query
+
+
+def parse_details(result: str) -> dict:
     final = result.strip().lower()
 
     if final not in ["yes", "no"]:
@@ -164,60 +206,121 @@ def is_question_detailed_enough(state: AgentState, llm_agent) -> dict:
     return {"CheckDetails": final}
 
 
+def is_question_detailed_enough(state: AgentState, llm_agent) -> dict:
+    """Check if the query is specific enough for SQL generation."""
+    system_prompt, user_prompt = details_prompt(state)
+    result = llm_agent.generate(system_prompt=system_prompt, user_prompt=user_prompt)
+    return parse_details(result)
+
+
+async def ais_question_detailed_enough(state: AgentState, llm_agent) -> dict:
+    """Async variant of is_question_detailed_enough for an AsyncGeneralLLM."""
+    system_prompt, user_prompt = details_prompt(state)
+    result = await llm_agent.generate(system_prompt=system_prompt, user_prompt=user_prompt)
+    return parse_details(result)
+
+
+# Tool: Fused triage of language, intent and detail sufficiency in one call
+def triage_prompt(state: AgentState) -> tuple:
+    """Build the (system_prompt, user_prompt) pair for fused triage."""
+    query = state.query
+    history = state.history or []
+    history_text = format_history(history, max_turns=3)
+
+    system_prompt = f"""
+    You are an AI assistant that triages user queries for a text-to-SQL system.
+    Return ONLY a JSON object with exactly these keys:
+
+    - "language": ISO code of the query language, 'en' for English or 'id' for Indonesian
+    - "intent": 'data' if the query asks to retrieve facts, entities, statistics, filters,
+      aggregations, rankings, comparisons or any structured information stored in tables;
+      'other' for definitions, instructions, general advice or how-to questions
+    - "detailed": 'yes' if the query is clear enough to map to database tables/columns
+      (specific entities, filters, aggregations, sorting or comparisons); 'no' only if it is
+      too vague, misses critical details or needs clarification
+
+    Examples:
+    "Which actors have the first name 'Scarlett'?" -> {{"language": "en", "intent": "data", "detailed": "yes"}}
+    "Apa itu SQL?" -> {{"language": "id", "intent": "other", "detailed": "no"}}
+    "Show me some data" -> {{"language": "en", "intent": "data", "detailed": "no"}}
+
+    Recent conversation:
+    {history_text}
+
+    No explanation, no code block. Output the JSON object for the following query:
+    """
+
+    return system_prompt.strip(), query
+
+
+def triage_tool(state: AgentState, llm_agent) -> dict:
+    """Classify language, intent and detail sufficiency with a single JSON response."""
+    system_prompt, user_prompt = triage_prompt(state)
+    result = llm_agent.generate(system_prompt=system_prompt, user_prompt=user_prompt)
+    return parse_triage(result)
+
+
+async def atriage_tool(state: AgentState, llm_agent) -> dict:
+    """Async variant of triage_tool for an AsyncGeneralLLM."""
+    system_prompt, user_prompt = triage_prompt(state)
+    result = await llm_agent.generate(system_prompt=system_prompt, user_prompt=user_prompt)
+    return parse_triage(result)
+
+
+def parse_triage(result: str) -> dict:
+    """Parse the fused triage response, falling back to the per-tool defaults per field."""
+    cleaned = re.sub(r"^```json|^```|```$", "", (result or "").strip(), flags=re.MULTILINE).strip()
+
+    try:
+        labels = json.loads(cleaned)
+    except json.JSONDecodeError:
+        match = re.search(r"\{.*\}", cleaned, flags=re.DOTALL)
+        try:
+            labels = json.loads(match.group(0)) if match else {}
+        except json.JSONDecodeError:
+            labels = {}
+
+    if not isinstance(labels, dict):
+        labels = {}
+
+    def label(key: str, allowed: tuple, default: str) -> str:
+        value = str(labels.get(key, "")).strip().lower()
+        return value if value in allowed else default
+
+    lang = label("language", ("en", "id"), "en")
+    intent = label("intent", ("data", "other"), "data")
+    detail = label("detailed", ("yes", "no"), "yes")
+
+    return {
+        "Language": lang,
+        "DetectIntent": intent,
+        "CheckDetails": None if intent == "other" else detail,
+    }
+
+
 # Tool: Generate SQL and update history
 def generate_sql_tool(state: AgentState) -> dict:
     """Generate SQL query from user input and update conversation history."""
     query = state.query
 
-    # Initialize text to sql model
-    text_to_sql_config = Config(
-        max_retry_attempt=5,
-        rewriter_config=LLMConfig(
-            type="api",
-            model=state.model,
-            provider=state.provider,
-            api_key=ENUM.get(state.provider, ""),
-        ),
-        query_generator_config=LLMConfig(
-            type="api",
-            model=state.model,
-            provider=state.provider,
-            api_key=ENUM.get(state.provider, ""),
-        ),
-        schema_linker_config=SLConfig(
-            type="api",
-            model=state.model,
-            provider=state.provider,
-            api_key=ENUM.get(state.provider, ""),
-            schema_path=f"./files/schema/{state.database}.txt",
-            metadata_path=f"./files/metadata/{state.database}.json",
-        ),
-        retrieve_context_config=ContextConfig(
-            data_path=f"./files/dataset/dataset_{state.database}.csv"
-        ),
-        query_executor_config = QueryConfig(
-            host=ENUM.get("database", {}).get(state.database, {}).get("DB_SOURCE_HOST", ""),
-            database=ENUM.get("database", {}).get(state.database, {}).get("DB_SOURCE_DATABASE", ""),
-            user=ENUM.get("database", {}).get(state.database, {}).get("DB_SOURCE_USER", ""),
-            password=ENUM.get("database", {}).get(state.database, {}).get("DB_SOURCE_PASSWORD", ""),
-            port=ENUM.get("database", {}).get(state.database, {}).get("DB_SOURCE_PORT", ""),
-        )
-    )
-    text_to_sql = TextToSQL(config=text_to_sql_config)
-
-    # Generate SQL
-    sql = text_to_sql.generate_v3(user_prompt=query)
-    result = text_to_sql.execute_query(sql)
+    # Generate SQL with the shared engine for this database and model
+    with engine_registry.acquire(state.database, state.provider, state.model) as text_to_sql:
+        sql = text_to_sql.generate_v3(user_prompt=query)
+        result = text_to_sql.execute_query(sql)
 
     return {"GenerateSQL": result, "GeneratedQueryRaw": sql}
 
 
+async def agenerate_sql_tool(state: AgentState) -> dict:
+    """Run the blocking engine (LLM calls and psycopg2) in a worker thread."""
+    return await asyncio.to_thread(generate_sql_tool, state)
+
+
 # Tool: Summarize SQL execution result
-def summarize_data_tool(state: AgentState, llm_agent) -> dict:
-    """Generate a natural language summary of the SQL result and update history."""
+def summary_prompt(state: AgentState) -> tuple:
+    """Build the (system_prompt, user_prompt) pair for result summarization."""
     query = state.query
     sql_output = state.GenerateSQL or {}
-    history = state.history or []
 
     # Extract SQL result for natural language summary
     raw_data = sql_output.get("result", []) if isinstance(sql_output, dict) else []
@@ -237,9 +340,16 @@ def summarize_data_tool(state: AgentState, llm_agent) -> dict:
     Explain it clearly and naturally, as if you're talking to a non-technical user.
     """
 
-    summary = llm_agent.generate(
-        system_prompt=system_prompt.strip(), user_prompt=""
-    ).strip()
+    return system_prompt.strip(), ""
+
+
+def finish_summary(state: AgentState, summary: str) -> dict:
+    """Append the summarized turn to the conversation history."""
+    query = state.query
+    sql_output = state.GenerateSQL or {}
+    history = state.history or []
+    raw_data = sql_output.get("result", []) if isinstance(sql_output, dict) else []
+    error_msg = sql_output.get("error") if isinstance(sql_output, dict) else None
 
     # Append to conversation history
     history.append(
@@ -255,31 +365,182 @@ def summarize_data_tool(state: AgentState, llm_agent) -> dict:
     return {"Summary": summary, "history": history}
 
 
+def summarize_data_tool(state: AgentState, llm_agent) -> dict:
+    """Generate a natural language summary of the SQL result and update history."""
+    system_prompt, user_prompt = summary_prompt(state)
+    summary = llm_agent.generate(system_prompt=system_prompt, user_prompt=user_prompt).strip()
+    return finish_summary(state, summary)
+
+
+async def asummarize_data_tool(state: AgentState, llm_agent, on_token=None) -> dict:
+    """
+    Async variant of summarize_data_tool for an AsyncGeneralLLM.
+
+    When on_token is given the summary is streamed and each text delta is passed to it.
+    """
+    system_prompt, user_prompt = summary_prompt(state)
+
+    if on_token is None:
+        summary = await llm_agent.generate(system_prompt=system_prompt, user_prompt=user_prompt)
+    else:
+        parts = []
+        async for delta in llm_agent.stream(system_prompt=system_prompt, user_prompt=user_prompt):
+            parts.append(delta)
+            on_token(delta)
+        summary = "".join(parts)
+
+    return finish_summary(state, summary.strip())
+
+
+# Shared LLM client per provider and model, reused across requests
+@lru_cache(maxsize=16)
+def get_llm_agent(provider: str, model: str) -> AsyncGeneralLLM:
+    """Return the shared non-blocking LLM client for a provider and model."""
+    general_config = LLMConfig(
+        type="api",
+        model=model,
+        provider=provider,
+        api_key=ENUM.get(provider, ""),
+        cache=get_llm_cache("agent"),
+        temperature=stage_temperature("agent"),
+    )
+    return AsyncGeneralLLM(config=general_config)
+
+
+# Resolve the LLM client injected through the run config
+def _llm_agent(config: RunnableConfig):
+    configurable = (config or {}).get("configurable", {})
+    llm_agent = configurable.get("llm_agent")
+    if llm_agent is None:
+        raise ValueError("The agent graph requires an 'llm_agent' in config['configurable'].")
+    return llm_agent
+
+
+def graph_config(llm_agent, stream_tokens: bool = False) -> dict:
+    """
+    Build the run config that injects an LLM client into the compiled graph.
+
+    :param stream_tokens: Stream the summary tokens to the "custom" stream; only for SSE
+        runs, since a streamed completion cannot be retried once the first byte arrived.
+    """
+    return {"configurable": {"llm_agent": llm_agent, "stream_tokens": stream_tokens}}
+
+
+# Join node for parallel triage: the details check only counts for data questions
+def join_triage(state: AgentState) -> dict:
+    if state.DetectIntent == "other":
+        return {"CheckDetails": None}
+    return {"CheckDetails": state.CheckDetails}
+
+
+# Route after triage
+def route_triage(state: AgentState) -> str:
+    if state.DetectIntent == "other" or state.CheckDetails == "no":
+        return "end"
+    return "generate"
+
+
+# Graph nodes: async wrappers that resolve the injected LLM client
+async def detect_language_node(state: AgentState, config: RunnableConfig) -> dict:
+    return await adetect_language_tool(state, _llm_agent(config))
+
+
+async def detect_intent_node(state: AgentState, config: RunnableConfig) -> dict:
+    return await adetect_intent_tool(state, _llm_agent(config))
+
+
+async def check_details_node(state: AgentState, config: RunnableConfig) -> dict:
+    return await ais_question_detailed_enough(state, _llm_agent(config))
+
+
+async def triage_node(state: AgentState, config: RunnableConfig) -> dict:
+    return await atriage_tool(state, _llm_agent(config))
+
+
+async def summarize_data_node(state: AgentState, config: RunnableConfig) -> dict:
+    # Summary tokens go to the "custom" stream of SSE runs; other runs keep the retried full completion
+    on_token = None
+    if (config or {}).get("configurable", {}).get("stream_tokens"):
+        writer = get_stream_writer()
+        on_token = lambda delta: writer({"token": delta})
+    return await asummarize_data_tool(state, _llm_agent(config), on_token=on_token)
+
+
+# Add the three single-purpose triage nodes
+def _add_triage_nodes(workflow: StateGraph):
+    workflow.add_node("DetectLanguageTool", detect_language_node)
+    workflow.add_node("DetectIntentTool", detect_intent_node)
+    workflow.add_node("CheckDetailsTool", check_details_node)
+
+
 # Build workflow graph
-def build_graph(llm_agent):
+def build_graph(triage_mode: str = "sequential"):
+    """
+    Build and compile the agent workflow.
+
+    The graph holds no per-request objects: the LLM client is read from
+    config['configurable']['llm_agent'] at run time (see graph_config), so a single
+    compiled graph can serve every provider and model. Nodes are coroutines, so the
+    graph must be run with ``ainvoke``/``astream`` and an AsyncGeneralLLM client.
+
+    :param triage_mode: 'sequential' runs language, intent and details checks one after
+        another and stops early on non-data intent; 'parallel' fans the three checks out
+        concurrently and joins them before routing; 'fused' asks for all three labels in
+        a single structured LLM call.
+    """
+    if triage_mode not in TRIAGE_MODES:
+        raise ValueError(f"Invalid triage mode '{triage_mode}'. Choose one of {TRIAGE_MODES}.")
+
     workflow = StateGraph(AgentState)
 
-    workflow.add_node("DetectLanguageTool", lambda state: detect_language_tool(state, llm_agent))
-    workflow.add_node("DetectIntentTool", lambda state: detect_intent_tool(state, llm_agent))
-    workflow.add_node("CheckDetailsTool", lambda state: is_question_detailed_enough(state, llm_agent))
-    workflow.add_node("GenerateSQLTool", lambda state: generate_sql_tool(state))
-    workflow.add_node("SummarizeDataTool", lambda state: summarize_data_tool(state, llm_agent))
-
-    workflow.add_edge("DetectLanguageTool", "DetectIntentTool")
-    workflow.add_conditional_edges(
-        "DetectIntentTool",
-        lambda x: x.DetectIntent,
-        {"data": "CheckDetailsTool", "other": END},
-    )
-    workflow.add_conditional_edges(
-        "CheckDetailsTool",
-        lambda x: x.CheckDetails,
-        {"yes": "GenerateSQLTool", "no": END},
-    )
-    workflow.add_edge("GenerateSQLTool", "SummarizeDataTool")
+    workflow.add_node("GenerateSQLTool", agenerate_sql_tool)
+    workflow.add_node("SummarizeDataTool", summarize_data_node)
 
-    workflow.set_entry_point("DetectLanguageTool")
+    if triage_mode == "fused":
+        workflow.add_node("TriageTool", triage_node)
+
+        workflow.add_edge(START, "TriageTool")
+        workflow.add_conditional_edges(
+            "TriageTool",
+            route_triage,
+            {"generate": "GenerateSQLTool", "end": END},
+        )
+    elif triage_mode == "parallel":
+        _add_triage_nodes(workflow)
+        workflow.add_node("TriageJoin", join_triage)
+
+        for node in ("DetectLanguageTool", "DetectIntentTool", "CheckDetailsTool"):
+            workflow.add_edge(START, node)
+        workflow.add_edge(["DetectLanguageTool", "DetectIntentTool", "CheckDetailsTool"], "TriageJoin")
+        workflow.add_conditional_edges(
+            "TriageJoin",
+            route_triage,
+            {"generate": "GenerateSQLTool", "end": END},
+        )
+    else:
+        _add_triage_nodes(workflow)
+        workflow.add_edge("DetectLanguageTool", "DetectIntentTool")
+        workflow.add_conditional_edges(
+            "DetectIntentTool",
+            lambda x: x.DetectIntent,
+            {"data": "CheckDetailsTool", "other": END},
+        )
+        workflow.add_conditional_edges(
+            "CheckDetailsTool",
+            lambda x: x.CheckDetails,
+            {"yes": "GenerateSQLTool", "no": END},
+        )
+        workflow.set_entry_point("DetectLanguageTool")
+
+    workflow.add_edge("GenerateSQLTool", "SummarizeDataTool")
     workflow.set_finish_point("SummarizeDataTool")
 
     # Compile graph
     return workflow.compile()
+
+
+# Compiled graph shared by all requests, one per triage mode
+@lru_cache(maxsize=None)
+def get_graph(triage_mode: Optional[str] = None):
+    """Return the process-wide compiled agent graph, compiling it on first use."""
+    return build_graph(triage_mode or os.getenv("AGENT_TRIAGE_MODE", "sequential"))
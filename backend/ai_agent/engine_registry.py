@@ -0,0 +1,371 @@
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterable, Optional, Tuple
+
+from utils.enum import ENUM
+from text_to_sql.text_to_sql import TextToSQL
+from text_to_sql.common import (
+    Config,
+    LLMConfig,
+    SLConfig,
+    ContextConfig,
+    QueryConfig,
+    LLMCache,
+)
+from text_to_sql.core import ExampleStore
+
+EngineKey = Tuple[str, str, str]
+
+# Precomputed artifact bundles, one subdirectory per database; empty disables them
+BUNDLE_DIR = os.getenv("ENGINE_BUNDLE_DIR", "./files/bundle")
+
+# Stages whose LLM calls go through the shared response cache, e.g. "rewriter,schema_linker".
+# Only deterministic calls are cached, so these stages run at temperature 0. All of
+# rewriter, schema_linker, query_generator and agent are safe to cache: the query
+# generator's fix_query retries bypass the cache and keep sampling, so a retry never
+# gets the same broken SQL back.
+LLM_CACHE_STAGES = frozenset(
+    stage.strip() for stage in os.getenv("LLM_CACHE_STAGES", "").split(",") if stage.strip()
+)
+
+_llm_cache: Optional[LLMCache] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache(stage: str) -> Optional[LLMCache]:
+    """
+    Return the shared LLM response cache if caching is enabled for a stage.
+
+    :param stage: One of rewriter, schema_linker, query_generator or agent.
+    """
+    global _llm_cache
+    if stage not in LLM_CACHE_STAGES:
+        return None
+
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            ttl = os.getenv("LLM_CACHE_TTL", "")
+            _llm_cache = LLMCache(
+                max_entries=int(os.getenv("LLM_CACHE_SIZE", "1024")),
+                ttl=float(ttl) if ttl else None,
+                db_path=os.getenv("LLM_CACHE_PATH") or None,
+            )
+        return _llm_cache
+
+
+def stage_temperature(stage: str) -> float:
+    """Return the sampling temperature of a stage: 0 when its calls are cached."""
+    return 0.0 if stage in LLM_CACHE_STAGES else 0.7
+
+
+def close_llm_cache():
+    """Log the cache counters and close its SQLite connection."""
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is not None:
+            print(f"LLM cache stats: {_llm_cache.stats()}")
+            _llm_cache.close()
+            _llm_cache = None
+
+
+def build_engine_config(database: str, provider: str, model: str) -> Config:
+    """Build the TextToSQL configuration for a (database, provider, model) triple."""
+    db_config = ENUM.get("database", {}).get(database, {})
+
+    return Config(
+        max_retry_attempt=5,
+        rewriter_config=LLMConfig(
+            type="api",
+            model=model,
+            provider=provider,
+            api_key=ENUM.get(provider, ""),
+            cache=get_llm_cache("rewriter"),
+            temperature=stage_temperature("rewriter"),
+        ),
+        query_generator_config=LLMConfig(
+            type="api",
+            model=model,
+            provider=provider,
+            api_key=ENUM.get(provider, ""),
+            cache=get_llm_cache("query_generator"),
+            temperature=stage_temperature("query_generator"),
+        ),
+        schema_linker_config=SLConfig(
+            type="api",
+            model=model,
+            provider=provider,
+            api_key=ENUM.get(provider, ""),
+            schema_path=f"./files/schema/{database}.txt",
+            metadata_path=f"./files/metadata/{database}.json",
+            cache=get_llm_cache("schema_linker"),
+            temperature=stage_temperature("schema_linker"),
+            embedding_precision=os.getenv("EMBEDDING_PRECISION", "float32"),
+            schema_mode=os.getenv("SCHEMA_MODE", "full"),
+            min_link_confidence=float(os.getenv("SCHEMA_MIN_CONFIDENCE", "0.3")),
+            schema_format=os.getenv("SCHEMA_FORMAT", "raw"),
+            linker_mode=os.getenv("LINKER_MODE", "llm"),
+            local_confidence=float(os.getenv("LINKER_LOCAL_CONFIDENCE", "0.6")),
+            column_pooling=os.getenv("COLUMN_POOLING", "none"),
+            max_columns=int(os.getenv("SCHEMA_MAX_COLUMNS", "0")),
+        ),
+        retrieve_context_config=ContextConfig(
+            data_path=f"./files/dataset/dataset_{database}.csv",
+            index_type=os.getenv("EXAMPLE_INDEX_TYPE", "flat"),
+            embedding_precision=os.getenv("EMBEDDING_PRECISION", "float32"),
+            dedup_threshold=float(os.getenv("EXAMPLE_DEDUP_THRESHOLD", "0.97")),
+        ),
+        query_executor_config=QueryConfig(
+            host=db_config.get("DB_SOURCE_HOST", ""),
+            database=db_config.get("DB_SOURCE_DATABASE", ""),
+            user=db_config.get("DB_SOURCE_USER", ""),
+            password=db_config.get("DB_SOURCE_PASSWORD", ""),
+            port=db_config.get("DB_SOURCE_PORT", ""),
+            max_connections=int(os.getenv("DB_POOL_SIZE", "8")),
+        ),
+        bundle_dir=os.path.join(BUNDLE_DIR, database) if BUNDLE_DIR else None,
+    )
+
+
+class _Entry:
+    """Registry slot holding one engine and the number of requests currently using it."""
+
+    def __init__(self):
+        self.engine: Optional[TextToSQL] = None
+        self.error: Optional[BaseException] = None
+        self.ready = threading.Event()
+        self.in_use = 0
+        self.evicted = False
+
+
+class EngineRegistry:
+    """
+    Thread-safe, size-bounded LRU registry of long-lived TextToSQL engines.
+
+    Engines are keyed by (database, provider, model). Building an engine loads the
+    embedding models, embeds the example store and opens the source database
+    connection, so it is done once per key and shared by every request. When the
+    registry is full the least recently used engine is evicted; its connection is
+    closed as soon as the last request holding it releases it.
+    """
+
+    def __init__(self, max_size: int = 8):
+        """
+        Initializes the registry.
+
+        :param max_size: Maximum number of engines kept alive at the same time.
+        """
+        if max_size < 1:
+            raise ValueError("Registry size must be at least 1.")
+
+        self.max_size = max_size
+        self._entries: "OrderedDict[EngineKey, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _get_entry(self, key: EngineKey) -> Tuple[_Entry, bool]:
+        """Return the entry for a key, creating (and reserving) it if missing."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Engine registry has been shut down.")
+
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                entry.in_use += 1
+                return entry, False
+
+            entry = _Entry()
+            entry.in_use = 1
+            self._entries[key] = entry
+            evicted = self._evict_locked()
+
+        self._close_entries(evicted)
+        return entry, True
+
+    def _evict_locked(self):
+        """Drop least recently used entries beyond max_size. Caller must hold the lock."""
+        evicted = []
+        for key in list(self._entries.keys()):
+            if len(self._entries) <= self.max_size:
+                break
+            entry = self._entries[key]
+            if not entry.ready.is_set():
+                # Still being built by another request; evicting it would waste the work.
+                continue
+            del self._entries[key]
+            entry.evicted = True
+            if entry.in_use == 0:
+                evicted.append(entry)
+        return evicted
+
+    @staticmethod
+    def _close_entries(entries: Iterable[_Entry]):
+        """Close the engines of entries that are no longer referenced."""
+        for entry in entries:
+            if entry.engine is not None:
+                try:
+                    entry.engine.close()
+                except Exception as e:
+                    print(f"Warning: Failed to close engine: {e}")
+
+    def _release(self, key: EngineKey, entry: _Entry):
+        """Release one reference to an entry, closing it if it was evicted meanwhile."""
+        with self._lock:
+            entry.in_use -= 1
+            should_close = entry.evicted and entry.in_use == 0
+
+        if should_close:
+            self._close_entries([entry])
+
+    def _discard(self, key: EngineKey, entry: _Entry):
+        """Forget an entry whose engine failed to build."""
+        with self._lock:
+            entry.in_use -= 1
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+
+    @contextmanager
+    def acquire(self, database: str, provider: str, model: str):
+        """
+        Lease the engine for (database, provider, model), building it on first use.
+
+        Concurrent callers asking for the same key wait for a single build instead
+        of constructing duplicate engines.
+
+        :return: Context manager yielding a ready TextToSQL engine.
+        """
+        key = (database, provider, model)
+        entry, owner = self._get_entry(key)
+
+        if owner:
+            try:
+                entry.engine = TextToSQL(config=build_engine_config(*key))
+            except BaseException as e:
+                entry.error = e
+                entry.ready.set()
+                self._discard(key, entry)
+                raise
+            entry.ready.set()
+        else:
+            entry.ready.wait()
+            if entry.error is not None:
+                self._release(key, entry)
+                raise RuntimeError(
+                    f"Failed to initialize engine for {key}: {entry.error}"
+                ) from entry.error
+
+        try:
+            yield entry.engine
+        finally:
+            self._release(key, entry)
+
+    def warm_up(self, keys: Iterable[EngineKey]):
+        """
+        Build engines ahead of the first request.
+
+        :param keys: Iterable of (database, provider, model) triples.
+        """
+        for database, provider, model in keys:
+            try:
+                with self.acquire(database, provider, model):
+                    print(f"Warmed up engine for {database} ({provider}/{model}).")
+            except Exception as e:
+                print(f"Warning: Failed to warm up engine for {database} ({provider}/{model}): {e}")
+
+    def engines(self, database: str) -> list[TextToSQL]:
+        """Return the ready engines currently held for a database."""
+        with self._lock:
+            return [
+                entry.engine
+                for key, entry in self._entries.items()
+                if key[0] == database and entry.ready.is_set() and entry.engine is not None
+            ]
+
+    def add_example(self, database: str, question: str, answer: str, summary: str) -> bool:
+        """
+        Add an accepted example to the live index of every engine serving a database.
+
+        :return: False if every live engine rejected the example as a near-duplicate of a
+            stored one, True otherwise, including when no engine is serving the database.
+        """
+        engines = self.engines(database)
+        rejected = 0
+        for engine in engines:
+            try:
+                if not engine.add_example(question, answer, summary):
+                    rejected += 1
+            except Exception as e:
+                print(f"Warning: Failed to add example to a live engine for {database}: {e}")
+        return rejected < len(engines) or not engines
+
+    def keys(self):
+        """Return the keys of the engines currently held, least recently used first."""
+        with self._lock:
+            return list(self._entries.keys())
+
+    def shutdown(self):
+        """Close every idle engine and refuse new leases; busy engines close on release."""
+        with self._lock:
+            self._closed = True
+            entries = list(self._entries.values())
+            self._entries.clear()
+            idle = []
+            for entry in entries:
+                entry.evicted = True
+                if entry.in_use == 0:
+                    idle.append(entry)
+
+        self._close_entries(idle)
+
+
+def parse_warmup_keys(value: str) -> list[EngineKey]:
+    """Parse 'database:provider:model' triples separated by commas."""
+    keys = []
+    for item in (value or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        parts = item.split(":", 2)
+        if len(parts) != 3:
+            print(f"Warning: Ignoring invalid warm-up entry '{item}'.")
+            continue
+        keys.append(tuple(part.strip() for part in parts))
+    return keys
+
+
+_example_stores: dict[str, ExampleStore] = {}
+_example_stores_lock = threading.Lock()
+
+
+def get_example_store(database: str) -> ExampleStore:
+    """
+    Return the append-only example store of a database's dataset.
+
+    :raises ValueError: If the database is not one of the configured databases.
+    """
+    if database not in ENUM.get("database", {}):
+        raise ValueError(f"Unknown database '{database}'.")
+
+    with _example_stores_lock:
+        store = _example_stores.get(database)
+        if store is None:
+            store = ExampleStore(
+                f"./files/dataset/dataset_{database}.csv",
+                compact_every=int(os.getenv("EXAMPLE_COMPACT_EVERY", "100")),
+                dedup_threshold=float(os.getenv("EXAMPLE_DEDUP_THRESHOLD", "0.97")),
+            )
+            _example_stores[database] = store
+        return store
+
+
+def close_example_stores():
+    """Wait for the background compactions of every example store."""
+    with _example_stores_lock:
+        stores = list(_example_stores.values())
+    for store in stores:
+        store.close()
+
+
+engine_registry = EngineRegistry(max_size=int(os.getenv("ENGINE_REGISTRY_SIZE", "8")))
@@ -1,9 +1,59 @@
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from database.db import init_db
 from routers import user, chat
+from ai_agent.engine_registry import engine_registry, parse_warmup_keys, close_llm_cache, close_example_stores
+from text_to_sql.common import HTTPConfig, configure_http, close_sessions, aclose_sessions
+from text_to_sql.core import embedding_provider, parse_address
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Blocking engine work (SQL generation, psycopg2) runs in this pool off the event loop
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=int(os.getenv("ENGINE_WORKER_THREADS", "64")))
+    )
+
+    # Keep-alive connection pools shared by every LLM client
+    configure_http(
+        HTTPConfig(
+            pool_size=int(os.getenv("HTTP_POOL_SIZE", "20")),
+            max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+            keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30")),
+            http2=os.getenv("HTTP_HTTP2", "true").lower() == "true",
+        )
+    )
+
+    # CPU threads used by the shared sentence embedding model
+    if os.getenv("EMBEDDING_NUM_THREADS"):
+        embedding_provider.set_thread_budget(int(os.getenv("EMBEDDING_NUM_THREADS")))
+
+    # Micro-batch concurrent encode calls, or send them to a shared embedding service
+    service_address = os.getenv("EMBEDDING_SERVICE_ADDRESS", "")
+    embedding_provider.configure(
+        max_batch_size=int(os.getenv("EMBEDDING_BATCH_SIZE", "32")),
+        max_wait_ms=float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5")),
+        service_address=parse_address(service_address) if service_address else None,
+        service_authkey=os.getenv("EMBEDDING_SERVICE_AUTHKEY", "").encode() or None,
+        cache_max_bytes=int(os.getenv("EMBEDDING_CACHE_BYTES", str(32 * 1024 * 1024))),
+    )
+
+    # Build engines listed in ENGINE_WARMUP before serving the first request
+    engine_registry.warm_up(parse_warmup_keys(os.getenv("ENGINE_WARMUP", "")))
+    yield
+    engine_registry.shutdown()
+    print(f"Embedding cache stats: {embedding_provider.cache_stats()}")
+    close_llm_cache()
+    close_example_stores()
+    await aclose_sessions()
+    close_sessions()
+
+
+app = FastAPI(lifespan=lifespan)
 init_db()
 
 app.add_middleware(
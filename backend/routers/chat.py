@@ -1,30 +1,29 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from ai_agent.ai_agent import AgentState, build_graph
+from ai_agent.ai_agent import AgentState, get_graph, get_llm_agent, graph_config
+from ai_agent.engine_registry import engine_registry, get_example_store
 from models.models import User, ChatHistory, ChatMessage, ChatFeedback
 from models.schemas import QueryRequest, FeedbackRequest
-from database.db import get_db
+from database.db import get_db, SessionLocal
 from utils.misc import generate_title
 from utils.auth import get_current_user_id
 from utils.enum import ENUM
-from text_to_sql.core import GeneralLLM
-from text_to_sql.common import LLMConfig
+from text_to_sql.common import LLMConfig, DeadlineExceeded, deadline_scope
 from text_to_sql.core import Summarization
 
 import orjson
-import pandas as pd
 import re
+import os
 
 
 router = APIRouter()
 
+# Time budget for all LLM calls made while answering one query
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "120"))
 
-@router.post("/query")
-async def handle_query(
-    req: QueryRequest,
-    user_id: int = Depends(get_current_user_id),
-    db: Session = Depends(get_db),
-):
+
+def _get_or_create_chat(db: Session, user_id: int, req: QueryRequest) -> ChatHistory:
     user = db.query(User).filter_by(id=user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -39,6 +38,10 @@ async def handle_query(
         db.commit()
         db.refresh(chat)
 
+    return chat
+
+
+def _load_history(db: Session, chat: ChatHistory) -> list:
     messages = (
         db.query(ChatMessage)
         .filter_by(chat_id=chat.id)
@@ -46,7 +49,7 @@ async def handle_query(
         .all()
     )
 
-    history = [
+    return [
         {
             "user": m.user_input,
             "agent": orjson.loads(m.agent_response) if isinstance(m.agent_response, str) else m.agent_response,
@@ -54,59 +57,73 @@ async def handle_query(
         for m in messages
     ]
 
-    # Configurations
-    general_config = LLMConfig(
-        type="api",
-        model=req.model,
-        provider=req.provider,
-        api_key=ENUM.get(req.provider, ""),
-    )
-
-    # Initialize agents
-    llm_agent = GeneralLLM(config=general_config)
-    graph = build_graph(llm_agent)
-
-    # Invoke the agent graph
-    agent_input = AgentState(query=req.query, history=history, model=req.model, provider=req.provider, database=req.database)
-    result = graph.invoke(agent_input)
 
+def _compose_response(result: dict) -> dict:
     # Extract final response and data
     lang = result.get("Language", "en")
     intent = result.get("DetectIntent", "")
     detail = result.get("CheckDetails", "")
     summary = result.get("Summary", "")
     data = result.get("GenerateSQL", [])
-    generated_sql_query = result.get("GeneratedQueryRaw", None)
 
     # Compose final agent response
     if intent == "other":
-        response = {
+        return {
             "response": "Maaf, saya hanya bisa membantu pertanyaan terkait bisnis dan data." if lang == "id" else
                         "Sorry, I can only help with business-related questions. Please ask something involving data insights.",
             "data": [],
         }
     elif detail == "no":
-        response = {
+        return {
             "response": "Bisa tolong berikan detail yang lebih spesifik agar saya bisa memberi insight data yang relevan?" if lang == "id" else
                         "Could you provide more specific details so I can give detailed data insights for you?",
             "data": [],
         }
     else:
-        response = {
+        return {
             "response": summary,
             "data": data,
         }
 
 
-    # Save chat message to history
+def _save_message(db: Session, chat_id: int, user_input: str, response: dict, generated_sql_query) -> ChatMessage:
     chat_msg = ChatMessage(
-        chat_id=chat.id,
-        user_input=req.query,
+        chat_id=chat_id,
+        user_input=user_input,
         agent_response=orjson.dumps(response, default=str).decode(),
         generated_query=generated_sql_query,
     )
     db.add(chat_msg)
     db.commit()
+    db.refresh(chat_msg)
+    return chat_msg
+
+
+@router.post("/query")
+async def handle_query(
+    req: QueryRequest,
+    user_id: int = Depends(get_current_user_id),
+    db: Session = Depends(get_db),
+):
+    chat = _get_or_create_chat(db, user_id, req)
+    history = _load_history(db, chat)
+
+    # Reuse the shared LLM client and compiled graph
+    llm_agent = get_llm_agent(req.provider, req.model)
+    graph = get_graph()
+
+    # Invoke the agent graph
+    agent_input = AgentState(query=req.query, history=history, model=req.model, provider=req.provider, database=req.database)
+    try:
+        with deadline_scope(REQUEST_DEADLINE_SECONDS):
+            result = await graph.ainvoke(agent_input, config=graph_config(llm_agent))
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=f"Request deadline exceeded: {e}")
+
+    response = _compose_response(result)
+
+    # Save chat message to history
+    _save_message(db, chat.id, req.query, response, result.get("GeneratedQueryRaw", None))
 
     # Return response
     return {
@@ -115,6 +132,82 @@ async def handle_query(
     }
 
 
+# Server-Sent Events emitted for each state field as its stage finishes
+STREAM_EVENTS = {
+    "Language": ("language", "language"),
+    "DetectIntent": ("intent", "intent"),
+    "CheckDetails": ("details", "detail"),
+    "GeneratedQueryRaw": ("sql", "query"),
+    "GenerateSQL": ("rows", "data"),
+    "Summary": ("summary", "response"),
+}
+
+
+def _sse(event: str, data: dict) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data, default=str) + b"\n\n"
+
+
+@router.post("/query/stream")
+async def handle_query_stream(
+    req: QueryRequest,
+    user_id: int = Depends(get_current_user_id),
+    db: Session = Depends(get_db),
+):
+    chat = _get_or_create_chat(db, user_id, req)
+    history = _load_history(db, chat)
+    chat_id = chat.id
+
+    llm_agent = get_llm_agent(req.provider, req.model)
+    graph = get_graph()
+    agent_input = AgentState(query=req.query, history=history, model=req.model, provider=req.provider, database=req.database)
+
+    async def event_stream():
+        yield _sse("chat", {"chat_id": chat_id})
+
+        result = {}
+        try:
+            with deadline_scope(REQUEST_DEADLINE_SECONDS):
+                async for mode, update in graph.astream(
+                    agent_input,
+                    config=graph_config(llm_agent, stream_tokens=True),
+                    stream_mode=["updates", "custom"],
+                ):
+                    if mode == "custom":
+                        if "token" in update:
+                            yield _sse("token", {"token": update["token"]})
+                        continue
+
+                    for values in update.values():
+                        if not values:
+                            continue
+                        result.update(values)
+                        for key, (event, field) in STREAM_EVENTS.items():
+                            if key in values:
+                                yield _sse(event, {field: values[key]})
+        except Exception as e:
+            print(f"Error while streaming query: {e}")
+            yield _sse("error", {"detail": str(e)})
+            return
+
+        response = _compose_response(result)
+
+        # Persist at stream end; the request-scoped session may already be closed
+        session = SessionLocal()
+        try:
+            chat_msg = _save_message(session, chat_id, req.query, response, result.get("GeneratedQueryRaw", None))
+            message_id = chat_msg.id
+        finally:
+            session.close()
+
+        yield _sse("done", {"chat_id": chat_id, "message_id": message_id, **response})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/histories")
 def get_all_chat_histories(
     user_id: int = Depends(get_current_user_id),
@@ -196,6 +289,9 @@ def give_feedback(
     user_id: int = Depends(get_current_user_id),
     db: Session = Depends(get_db),
 ):
+    if req.database not in ENUM.get("database", {}):
+        raise HTTPException(status_code=400, detail=f"Unknown database '{req.database}'")
+
     message = db.query(ChatMessage).filter_by(id=req.message_id).first()
 
     if not message:
@@ -222,7 +318,6 @@ def give_feedback(
             api_key=ENUM.get(req.provider, ""),
         )
         summarization = Summarization(config=general_config)
-        dataset_path = f"./files/dataset/dataset_{req.database}.csv"
         
         # New data
         question = message.user_input
@@ -244,16 +339,9 @@ def give_feedback(
                 summary = raw_summary
                 print(f"Warning: Failed to parse summary JSON: {e}")
 
-            # Add data
-            df = pd.read_csv(dataset_path)
-            new_row = {
-                "Question": question,
-                "Answer": answer,
-                "Summary": summary
-            }
-            df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
-
-            # Save
-            df.to_csv(dataset_path, index=False)
+            # Add to the live index of running engines, and append to the dataset unless
+            # they all rejected it as a near-duplicate; compaction dedups the rest
+            if engine_registry.add_example(req.database, question, answer, summary):
+                get_example_store(req.database).append(question, answer, summary)
 
     return {"detail": f"Feedback '{req.feedback}' saved successfully"}
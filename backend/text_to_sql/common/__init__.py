@@ -1,3 +1,7 @@
-from .config import LLMConfig, Config, SLConfig, ContextConfig, QueryConfig
+from .config import LLMConfig, Config, SLConfig, ContextConfig, QueryConfig, HTTPConfig
 from .api_model import APIModel
+from .async_api_model import AsyncAPIModel
 from .local_model import LocalModel
+from .http_session import configure_http, close_sessions, aclose_sessions
+from .retry import RetryPolicy, DeadlineExceeded, deadline_scope
+from .llm_cache import LLMCache
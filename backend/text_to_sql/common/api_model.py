@@ -1,39 +1,80 @@
+import json
+import time
 import requests
+from typing import Optional
+
+from .http_session import get_session
+from .llm_cache import LLMCache
+from .retry import RetryPolicy, parse_retry_after, request_timeout, current_deadline
 
 
 class APIModel:
-    def __init__(self, api_key: str, provider: str = "openai", model: str = "gpt-4"):
+    def __init__(
+        self,
+        api_key: str,
+        provider: str = "openai",
+        model: str = "gpt-4",
+        timeout: float = 300,
+        retry_policy: Optional[RetryPolicy] = None,
+        cache: Optional[LLMCache] = None,
+        cache_ttl: Optional[float] = None,
+        temperature: float = 0.7,
+    ):
         """
         Initializes the API model for text generation.
 
         :param api_key: API key for the selected provider (OpenAI, DeepSeek, Gemini).
         :param provider: The provider name ('openai', 'deepseek', 'gemini').
         :param model: The model name to use (e.g., 'gpt-4' for OpenAI, 'deepseek-chat' for DeepSeek, 'gemini-pro' for Gemini).
+        :param timeout: Timeout in seconds for a single request.
+        :param retry_policy: Retry policy for failed requests (defaults to RetryPolicy()).
+        :param cache: Optional response cache shared by identical calls.
+        :param cache_ttl: Time-to-live in seconds for entries written by this model.
+        :param temperature: Default sampling temperature; only calls at 0 are cached.
         """
         self.api_key = api_key
         self.provider = provider.lower()
         self.model = model
+        self.timeout = timeout
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.cache = cache
+        self.cache_ttl = cache_ttl
+        self.temperature = temperature
+        self.usage = {"prompt_tokens": 0, "completion_tokens": 0, "requests": 0}
         self._initialize_client()
 
     def _initialize_client(self):
         """Prints provider initialization (can be expanded for authentication setup)."""
         print(f"Initializing API client for {self.provider} using model {self.model}.")
 
-    def generate(
+    def _record_usage(self, data: dict):
+        """Accumulates the token usage reported by the provider."""
+        if self.provider == "gemini":
+            usage = data.get("usageMetadata") or {}
+            prompt_tokens = usage.get("promptTokenCount", 0)
+            completion_tokens = usage.get("candidatesTokenCount", 0)
+        else:
+            usage = data.get("usage") or {}
+            prompt_tokens = usage.get("prompt_tokens", 0)
+            completion_tokens = usage.get("completion_tokens", 0)
+
+        self.usage["prompt_tokens"] += prompt_tokens or 0
+        self.usage["completion_tokens"] += completion_tokens or 0
+        self.usage["requests"] += 1
+
+    def _build_request(
         self,
         system_prompt: str,
         user_prompt: str,
-        max_tokens: int = 512,
-        temperature: float = 0.7,
+        max_tokens: int,
+        temperature: float,
+        stream: bool = False,
     ):
         """
-        Generates text using the specified API provider.
+        Builds the provider-specific request.
 
-        :param system_prompt: The system message setting the context.
-        :param user_prompt: The user input to generate a response.
-        :param max_tokens: The maximum number of tokens to generate.
-        :param temperature: Controls randomness (higher = more diverse responses).
-        :return: Generated text response.
+        :param stream: Whether to request a streamed (SSE) response.
+        :return: Tuple of (url, headers, payload).
         """
         if self.provider == "openai":
             url = "https://api.openai.com/v1/chat/completions"
@@ -49,8 +90,10 @@ class APIModel:
                 ],
                 "max_tokens": max_tokens,
                 "temperature": temperature,
-                "stream": False,
+                "stream": stream,
             }
+            if stream:
+                payload["stream_options"] = {"include_usage": True}
 
         elif self.provider == "deepseek":
             url = "https://api.deepseek.com/chat/completions"
@@ -66,11 +109,14 @@ class APIModel:
                 ],
                 "max_tokens": max_tokens,
                 "temperature": temperature,
-                "stream": False,
+                "stream": stream,
             }
 
         elif self.provider == "gemini":
-            url = f"https://generativelanguage.googleapis.com/v1/models/{self.model}:generateContent?key={self.api_key}"
+            if stream:
+                url = f"https://generativelanguage.googleapis.com/v1/models/{self.model}:streamGenerateContent?alt=sse&key={self.api_key}"
+            else:
+                url = f"https://generativelanguage.googleapis.com/v1/models/{self.model}:generateContent?key={self.api_key}"
             headers = {"Content-Type": "application/json"}
 
             full_prompt = f"{system_prompt}\n\nUser: {user_prompt}"
@@ -90,14 +136,175 @@ class APIModel:
         else:
             raise ValueError(f"Unsupported provider: {self.provider}")
 
-        response = requests.post(url, headers=headers, json=payload)
+        return url, headers, payload
 
-        if response.status_code == 200:
-            if self.provider == "gemini":
-                return response.json()["candidates"][0]["content"]["parts"][0]["text"]
-            else:
-                return response.json()["choices"][0]["message"]["content"]
+    def _parse_response(self, data: dict) -> str:
+        """Extracts the generated text from a provider response body."""
+        self._record_usage(data)
+        if self.provider == "gemini":
+            return data["candidates"][0]["content"]["parts"][0]["text"]
+        else:
+            return data["choices"][0]["message"]["content"]
+
+    def _parse_stream_line(self, line: str):
+        """
+        Extracts the text delta from one SSE line of a streamed response.
+
+        :return: The text delta, an empty string for lines without text, or None at end of stream.
+        """
+        if not line or not line.startswith("data:"):
+            return ""
+
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return None
+
+        chunk = json.loads(data)
+        if chunk.get("usage") or chunk.get("usageMetadata"):
+            self._record_usage(chunk)
+
+        if self.provider == "gemini":
+            candidates = chunk.get("candidates") or [{}]
+            parts = candidates[0].get("content", {}).get("parts") or []
+            return "".join(part.get("text", "") for part in parts)
         else:
-            raise Exception(
-                f"API request failed: {response.status_code} - {response.text}"
-            )
+            choices = chunk.get("choices") or [{}]
+            return choices[0].get("delta", {}).get("content") or ""
+
+    def _cache_key(
+        self, system_prompt: str, user_prompt: str, max_tokens: int, temperature: float, use_cache: bool = True
+    ):
+        """Returns the cache key for a call, or None when the call must not be cached."""
+        if self.cache is None or not use_cache or not LLMCache.cacheable(temperature):
+            return None
+        return LLMCache.make_key(
+            self.provider, self.model, system_prompt, user_prompt, temperature, max_tokens
+        )
+
+    def _post(self, url: str, headers: dict, payload: dict, deadline: Optional[float], stream: bool = False):
+        """
+        Sends a request with the retry policy applied.
+
+        Connection errors, timeouts and retryable status codes (e.g. 429, 503) are
+        retried with exponential backoff, honoring Retry-After, until the attempts
+        or the deadline run out.
+
+        :return: A successful (HTTP 200) response.
+        """
+        deadline = deadline if deadline is not None else current_deadline()
+        attempt = 0
+
+        while True:
+            attempt += 1
+            retry_after = None
+
+            try:
+                response = get_session(self.provider).post(
+                    url,
+                    headers=headers,
+                    json=payload,
+                    stream=stream,
+                    timeout=request_timeout(self.timeout, deadline),
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            else:
+                if response.status_code == 200:
+                    return response
+
+                error = Exception(
+                    f"API request failed: {response.status_code} - {response.text}"
+                )
+                response.close()
+                if not self.retry_policy.is_retryable(response.status_code):
+                    raise error
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+
+            delay = self.retry_policy.next_delay(attempt, error, retry_after, deadline)
+            print(f"[Retrying] Attempt {attempt} failed ({error}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+    def generate(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        max_tokens: int = 512,
+        temperature: Optional[float] = None,
+        deadline: Optional[float] = None,
+        use_cache: bool = True,
+    ):
+        """
+        Generates text using the specified API provider.
+
+        :param system_prompt: The system message setting the context.
+        :param user_prompt: The user input to generate a response.
+        :param max_tokens: The maximum number of tokens to generate.
+        :param temperature: Controls randomness (higher = more diverse responses); defaults to the model's.
+        :param deadline: Absolute deadline (time.monotonic()); defaults to the request deadline.
+        :param use_cache: Whether the response cache may serve and store this call.
+        :return: Generated text response.
+        """
+        temperature = self.temperature if temperature is None else temperature
+        cache_key = self._cache_key(system_prompt, user_prompt, max_tokens, temperature, use_cache)
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        url, headers, payload = self._build_request(
+            system_prompt, user_prompt, max_tokens, temperature
+        )
+
+        response = self._post(url, headers, payload, deadline)
+        text = self._parse_response(response.json())
+
+        if cache_key is not None:
+            self.cache.set(cache_key, text, ttl=self.cache_ttl)
+        return text
+
+    def stream(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        max_tokens: int = 512,
+        temperature: Optional[float] = None,
+        deadline: Optional[float] = None,
+        use_cache: bool = True,
+    ):
+        """
+        Streams generated text from the specified API provider.
+
+        Retries only happen before the first byte of the response is received.
+
+        :param system_prompt: The system message setting the context.
+        :param user_prompt: The user input to generate a response.
+        :param max_tokens: The maximum number of tokens to generate.
+        :param temperature: Controls randomness (higher = more diverse responses); defaults to the model's.
+        :param deadline: Absolute deadline (time.monotonic()); defaults to the request deadline.
+        :param use_cache: Whether the response cache may serve and store this call.
+        :return: Generator yielding text deltas as they arrive.
+        """
+        temperature = self.temperature if temperature is None else temperature
+        cache_key = self._cache_key(system_prompt, user_prompt, max_tokens, temperature, use_cache)
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+
+        url, headers, payload = self._build_request(
+            system_prompt, user_prompt, max_tokens, temperature, stream=True
+        )
+
+        parts = []
+        with self._post(url, headers, payload, deadline, stream=True) as response:
+            for line in response.iter_lines(decode_unicode=True):
+                delta = self._parse_stream_line(line)
+                if delta is None:
+                    break
+                if delta:
+                    parts.append(delta)
+                    yield delta
+
+        if cache_key is not None:
+            self.cache.set(cache_key, "".join(parts), ttl=self.cache_ttl)
@@ -0,0 +1,191 @@
+import asyncio
+from typing import Optional
+
+import httpx
+
+from .api_model import APIModel
+from .http_session import get_async_client
+from .retry import parse_retry_after, request_timeout, current_deadline
+
+
+class AsyncAPIModel(APIModel):
+    """
+    Non-blocking counterpart of APIModel for use inside an asyncio event loop.
+
+    Shares request building, response parsing and the retry policy with APIModel;
+    only the transport differs, so ``generate`` must be awaited.
+    """
+
+    async def _apost(self, url: str, headers: dict, payload: dict, deadline: Optional[float]):
+        """
+        Sends a request with the retry policy applied, without blocking the event loop.
+
+        :return: A successful (HTTP 200) response.
+        """
+        deadline = deadline if deadline is not None else current_deadline()
+        client = get_async_client(self.provider)
+        attempt = 0
+
+        while True:
+            attempt += 1
+            retry_after = None
+
+            try:
+                response = await client.post(
+                    url,
+                    headers=headers,
+                    json=payload,
+                    timeout=request_timeout(self.timeout, deadline),
+                )
+            except (httpx.TransportError, httpx.TimeoutException) as e:
+                error = e
+            else:
+                if response.status_code == 200:
+                    return response
+
+                error = Exception(
+                    f"API request failed: {response.status_code} - {response.text}"
+                )
+                if not self.retry_policy.is_retryable(response.status_code):
+                    raise error
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+
+            delay = self.retry_policy.next_delay(attempt, error, retry_after, deadline)
+            print(f"[Retrying] Attempt {attempt} failed ({error}); retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def _cache_get(self, key: str) -> Optional[str]:
+        """Looks up the response cache, off the event loop when it reads from disk."""
+        if self.cache.blocking:
+            return await asyncio.to_thread(self.cache.get, key)
+        return self.cache.get(key)
+
+    async def _cache_set(self, key: str, value: str):
+        """Stores a response in the cache, off the event loop when it writes to disk."""
+        if self.cache.blocking:
+            await asyncio.to_thread(self.cache.set, key, value, self.cache_ttl)
+        else:
+            self.cache.set(key, value, ttl=self.cache_ttl)
+
+    async def generate(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        max_tokens: int = 512,
+        temperature: Optional[float] = None,
+        deadline: Optional[float] = None,
+        use_cache: bool = True,
+    ):
+        """
+        Generates text using the specified API provider without blocking the event loop.
+
+        :param system_prompt: The system message setting the context.
+        :param user_prompt: The user input to generate a response.
+        :param max_tokens: The maximum number of tokens to generate.
+        :param temperature: Controls randomness (higher = more diverse responses); defaults to the model's.
+        :param deadline: Absolute deadline (time.monotonic()); defaults to the request deadline.
+        :param use_cache: Whether the response cache may serve and store this call.
+        :return: Generated text response.
+        """
+        temperature = self.temperature if temperature is None else temperature
+        cache_key = self._cache_key(system_prompt, user_prompt, max_tokens, temperature, use_cache)
+        if cache_key is not None:
+            cached = await self._cache_get(cache_key)
+            if cached is not None:
+                return cached
+
+        url, headers, payload = self._build_request(
+            system_prompt, user_prompt, max_tokens, temperature
+        )
+
+        response = await self._apost(url, headers, payload, deadline)
+        text = self._parse_response(response.json())
+
+        if cache_key is not None:
+            await self._cache_set(cache_key, text)
+        return text
+
+    async def stream(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        max_tokens: int = 512,
+        temperature: Optional[float] = None,
+        deadline: Optional[float] = None,
+        use_cache: bool = True,
+    ):
+        """
+        Streams generated text from the specified API provider without blocking the event loop.
+
+        Retries only happen before the first byte of the response is received.
+
+        :param system_prompt: The system message setting the context.
+        :param user_prompt: The user input to generate a response.
+        :param max_tokens: The maximum number of tokens to generate.
+        :param temperature: Controls randomness (higher = more diverse responses); defaults to the model's.
+        :param deadline: Absolute deadline (time.monotonic()); defaults to the request deadline.
+        :param use_cache: Whether the response cache may serve and store this call.
+        :return: Async generator yielding text deltas as they arrive.
+        """
+        temperature = self.temperature if temperature is None else temperature
+        cache_key = self._cache_key(system_prompt, user_prompt, max_tokens, temperature, use_cache)
+        if cache_key is not None:
+            cached = await self._cache_get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+
+        url, headers, payload = self._build_request(
+            system_prompt, user_prompt, max_tokens, temperature, stream=True
+        )
+
+        deadline = deadline if deadline is not None else current_deadline()
+        client = get_async_client(self.provider)
+        attempt = 0
+
+        while True:
+            attempt += 1
+            retry_after = None
+
+            try:
+                request = client.build_request(
+                    "POST",
+                    url,
+                    headers=headers,
+                    json=payload,
+                    timeout=request_timeout(self.timeout, deadline),
+                )
+                response = await client.send(request, stream=True)
+            except (httpx.TransportError, httpx.TimeoutException) as e:
+                error = e
+            else:
+                if response.status_code == 200:
+                    break
+
+                body = await response.aread()
+                await response.aclose()
+                error = Exception(
+                    f"API request failed: {response.status_code} - {body.decode(errors='replace')}"
+                )
+                if not self.retry_policy.is_retryable(response.status_code):
+                    raise error
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+
+            delay = self.retry_policy.next_delay(attempt, error, retry_after, deadline)
+            print(f"[Retrying] Attempt {attempt} failed ({error}); retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+        parts = []
+        try:
+            async for line in response.aiter_lines():
+                delta = self._parse_stream_line(line)
+                if delta is None:
+                    break
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        finally:
+            await response.aclose()
+
+        if cache_key is not None:
+            await self._cache_set(cache_key, "".join(parts))
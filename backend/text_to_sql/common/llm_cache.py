@@ -0,0 +1,184 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class LLMCache:
+    """
+    Content-addressed cache of LLM responses with an in-memory LRU tier and an
+    optional persistent SQLite tier.
+
+    Entries are keyed by a hash of (provider, model, system prompt, user prompt,
+    temperature, max_tokens and any further sampling settings), so identical calls
+    from any stage, engine or experiment run share the same entry. A cache is
+    opted into per stage by passing it in that stage's LLMConfig. Models only cache
+    deterministic (temperature 0) calls, so sampled outputs are never replayed.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: Optional[float] = None,
+        db_path: Optional[str] = None,
+        max_disk_entries: Optional[int] = None,
+    ):
+        """
+        Initializes the cache.
+
+        :param max_entries: Maximum number of entries kept in memory (LRU eviction).
+        :param ttl: Default time-to-live in seconds; None keeps entries until evicted.
+        :param db_path: Path of the SQLite file for the persistent tier; None disables it.
+        :param max_disk_entries: Maximum number of entries kept on disk; None is unbounded.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+        self.max_disk_entries = max_disk_entries
+
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "memory_hits": 0, "disk_hits": 0, "writes": 0}
+        self._connection = None
+
+        if self.db_path:
+            self._connection = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL, accessed_at REAL NOT NULL)"
+            )
+            self._connection.commit()
+
+    @staticmethod
+    def make_key(
+        provider: str,
+        model: str,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        max_tokens: int,
+        **sampling,
+    ) -> str:
+        """
+        Returns the content hash identifying one LLM call.
+
+        :param sampling: Further generation settings that change the output, e.g. top_k and top_p.
+        """
+        key = [provider, model, system_prompt, user_prompt, temperature, max_tokens]
+        if sampling:
+            key.append(sorted(sampling.items()))
+        raw = json.dumps(key, ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def cacheable(temperature: float) -> bool:
+        """Whether a call is deterministic enough for its response to be replayed."""
+        return temperature <= 0
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Looks up a cached response, promoting disk hits into memory.
+
+        :return: The cached response, or None on a miss or expired entry.
+        """
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._stats["hits"] += 1
+                    self._stats["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+
+            if self._connection is not None:
+                row = self._connection.execute(
+                    "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, expires_at = row
+                    if expires_at is None or expires_at > now:
+                        self._connection.execute(
+                            "UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key)
+                        )
+                        self._connection.commit()
+                        self._set_memory(key, value, expires_at)
+                        self._stats["hits"] += 1
+                        self._stats["disk_hits"] += 1
+                        return value
+                    self._connection.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._connection.commit()
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        """
+        Stores a response in both tiers.
+
+        :param ttl: Time-to-live in seconds for this entry; defaults to the cache TTL.
+        """
+        ttl = ttl if ttl is not None else self.ttl
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+
+        with self._lock:
+            self._set_memory(key, value, expires_at)
+            self._stats["writes"] += 1
+
+            if self._connection is not None:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, value, expires_at, now),
+                )
+                if self.max_disk_entries is not None:
+                    self._connection.execute(
+                        "DELETE FROM llm_cache WHERE key IN ("
+                        "SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                        (self.max_disk_entries,),
+                    )
+                self._connection.commit()
+
+    def _set_memory(self, key: str, value: str, expires_at: Optional[float]):
+        """Inserts into the memory tier, evicting least recently used entries. Caller must hold the lock."""
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters, the hit rate and the number of entries in memory."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        """Removes every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            if self._connection is not None:
+                self._connection.execute("DELETE FROM llm_cache")
+                self._connection.commit()
+
+    @property
+    def blocking(self) -> bool:
+        """Whether lookups and writes touch the disk tier; async callers should then run them in a thread."""
+        return self._connection is not None
+
+    def close(self):
+        """Closes the SQLite connection."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -1,16 +1,29 @@
 from transformers import pipeline
+from typing import Optional
 import torch
 
+from .llm_cache import LLMCache
+
 
 class LocalModel:
-    def __init__(self, model_path: str, use_gpu: bool = False):
+    def __init__(
+        self,
+        model_path: str,
+        use_gpu: bool = False,
+        cache: Optional[LLMCache] = None,
+        cache_ttl: Optional[float] = None,
+    ):
         """
         Initializes the LLM model for query rewriting.
 
         :param model_path: Hugging Face model name (e.g., 'deepseek-ai/DeepSeek-R1-Distill-Qwen-1.5B')
         :param use_gpu: Whether to use GPU for inference.
+        :param cache: Optional response cache shared by identical calls.
+        :param cache_ttl: Time-to-live in seconds for entries written by this model.
         """
         self.model_path = model_path
+        self.cache = cache
+        self.cache_ttl = cache_ttl
         self.device = torch.device(
             "cuda" if torch.cuda.is_available() and use_gpu else "cpu"
         )
@@ -37,6 +50,7 @@ class LocalModel:
         temperature: float = 0.3,
         top_k: int = 50,
         top_p: float = 0.9,
+        use_cache: bool = True,
     ):
         """
         Generates a rewritten query based on user input.
@@ -47,8 +61,26 @@ class LocalModel:
         :param temperature: Controls randomness.
         :param top_k: Sampling control.
         :param top_p: Nucleus filtering.
+        :param use_cache: Whether the response cache may serve and store this call.
         :return: Rewritten query only (no extra text).
         """
+        cache_key = None
+        # The pipeline always samples, so only a zero temperature is reproducible
+        if self.cache is not None and use_cache and LLMCache.cacheable(temperature):
+            cache_key = LLMCache.make_key(
+                "local",
+                self.model_path,
+                system_prompt,
+                user_prompt,
+                temperature,
+                max_length,
+                top_k=top_k,
+                top_p=top_p,
+            )
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
         full_prompt = f"""
         {system_prompt}
 
@@ -70,4 +102,6 @@ class LocalModel:
         rewritten_query = response[0]["generated_text"].strip()
         rewritten_query = rewritten_query.replace(full_prompt.strip(), "").strip()
 
+        if cache_key is not None:
+            self.cache.set(cache_key, rewritten_query, ttl=self.cache_ttl)
         return rewritten_query
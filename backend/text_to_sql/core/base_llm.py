@@ -37,7 +37,10 @@ class BaseLLM(ABC):
         if not self.config.model_path:
             raise ValueError("Model path must be provided for local models.")
         return LocalModel(
-            model_path=self.config.model_path, use_gpu=self.config.use_gpu
+            model_path=self.config.model_path,
+            use_gpu=self.config.use_gpu,
+            cache=self.config.cache,
+            cache_ttl=self.config.cache_ttl,
         )
 
     def _load_api_model(self) -> APIModel:
@@ -48,6 +51,11 @@ class BaseLLM(ABC):
             api_key=self.config.api_key,
             model=self.config.model,
             provider=self.config.provider,
+            timeout=self.config.timeout,
+            retry_policy=self.config.retry_policy,
+            cache=self.config.cache,
+            cache_ttl=self.config.cache_ttl,
+            temperature=self.config.temperature,
         )
 
     def _load_system_prompt(self, system_prompt_path: Optional[str] = None) -> str:
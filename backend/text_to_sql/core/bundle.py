@@ -0,0 +1,318 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .embedding import EMBEDDING_MODEL, SharedEncoder, embedding_provider
+from .retrieve_context import load_examples, encode_texts
+from .schema_linker import build_column_texts, build_knowledge_base, build_fk_graph
+
+BUNDLE_VERSION = 2
+
+MANIFEST_FILE = "manifest.json"
+SCHEMA_FILE = "schema.txt"
+METADATA_FILE = "metadata.json"
+EXAMPLES_FILE = "examples.json"
+EXAMPLE_EMBEDDINGS_FILE = "example_embeddings.npy"
+KNOWLEDGE_BASE_FILE = "knowledge_base.json"
+TABLE_EMBEDDINGS_FILE = "table_embeddings.npy"
+FK_GRAPH_FILE = "fk_graph.json"
+COLUMNS_FILE = "columns.json"
+COLUMN_EMBEDDINGS_FILE = "column_embeddings.npy"
+
+
+def _file_hash(path: str) -> str:
+    """Returns the sha256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_hashes(schema_path: str, metadata_path: str, data_path: str) -> Dict[str, str]:
+    """Returns the content hash of each source file a bundle is built from."""
+    return {
+        "schema": _file_hash(schema_path),
+        "metadata": _file_hash(metadata_path),
+        "examples": _file_hash(data_path),
+    }
+
+
+def bundle_hash(sources: Dict[str, str], model_name: str = EMBEDDING_MODEL) -> str:
+    """Combines the bundle format version, embedding model and source hashes into one key."""
+    raw = json.dumps(
+        {"version": BUNDLE_VERSION, "model": model_name, "sources": sources}, sort_keys=True
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ArtifactBundle:
+    """
+    Precomputed per-database artifacts: schema text, metadata, example store,
+    knowledge base, FK graph and the example, table and column embedding matrices. The matrices are
+    memory-mapped read-only, so engines in several worker processes share pages.
+    """
+
+    def __init__(self, path: str):
+        """
+        Loads a bundle directory written by build_bundle.
+
+        :param path: Directory containing manifest.json and the artifact files.
+        """
+        self.path = path
+
+        with open(os.path.join(path, MANIFEST_FILE), "r", encoding="utf-8") as file:
+            self.manifest = json.load(file)
+        if self.manifest.get("version") != BUNDLE_VERSION:
+            raise ValueError(
+                f"Unsupported bundle version {self.manifest.get('version')} at {path}."
+            )
+
+        with open(os.path.join(path, SCHEMA_FILE), "r", encoding="utf-8") as file:
+            self.schema = file.read()
+        self.metadata = self._load_json(METADATA_FILE)
+        self.examples: List[Dict[str, Any]] = self._load_json(EXAMPLES_FILE)
+        self.knowledge_base: Dict[str, str] = self._load_json(KNOWLEDGE_BASE_FILE)
+        self.fk_graph: Dict[str, List[Dict[str, str]]] = self._load_json(FK_GRAPH_FILE)
+        self.table_names = list(self.knowledge_base.keys())
+        self.columns = [tuple(column) for column in self._load_json(COLUMNS_FILE)]
+
+        self.example_embeddings = np.load(
+            os.path.join(path, EXAMPLE_EMBEDDINGS_FILE), mmap_mode="r"
+        )
+        self.table_embeddings = np.load(
+            os.path.join(path, TABLE_EMBEDDINGS_FILE), mmap_mode="r"
+        )
+        self.column_embeddings = np.load(
+            os.path.join(path, COLUMN_EMBEDDINGS_FILE), mmap_mode="r"
+        )
+
+    def _load_json(self, name: str):
+        with open(os.path.join(self.path, name), "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    @property
+    def hash(self) -> str:
+        return self.manifest["hash"]
+
+    def __repr__(self):
+        return (
+            f"ArtifactBundle(path={self.path}, examples={len(self.examples)}, "
+            f"tables={len(self.table_names)})"
+        )
+
+
+def latest_bundle(bundle_dir: str, exclude: Optional[str] = None) -> Optional[ArtifactBundle]:
+    """
+    Returns the most recently built bundle in bundle_dir that this version can load.
+
+    :param exclude: Path of a bundle version to skip.
+    """
+    if not os.path.isdir(bundle_dir):
+        return None
+
+    candidates = []
+    for name in os.listdir(bundle_dir):
+        path = os.path.join(bundle_dir, name)
+        manifest = os.path.join(path, MANIFEST_FILE)
+        if ".tmp-" in name or path == exclude or not os.path.exists(manifest):
+            continue
+        candidates.append((os.path.getmtime(manifest), path))
+
+    for _, path in sorted(candidates, reverse=True):
+        try:
+            bundle = ArtifactBundle(path)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Skipping unreadable bundle at {path}: {e}")
+            continue
+        if bundle.manifest.get("model") == EMBEDDING_MODEL:
+            return bundle
+    return None
+
+
+def _example_embeddings(
+    encoder, questions: List[str], previous: Optional[ArtifactBundle], batch_size: int
+) -> np.ndarray:
+    """
+    Embeds the example questions, copying the rows of questions a previous bundle
+    already embedded, so a dataset grown by feedback only encodes the new rows.
+    """
+    known = {}
+    if previous is not None:
+        known = {str(example["Question"]): i for i, example in enumerate(previous.examples)}
+    rows = [known.get(question) for question in questions]
+    reused = [i for i, row in enumerate(rows) if row is not None]
+    if not reused:
+        return encode_texts(encoder, questions, batch_size=batch_size)
+
+    missing = [i for i, row in enumerate(rows) if row is None]
+    embeddings = np.empty((len(questions), previous.example_embeddings.shape[1]), dtype=np.float32)
+    embeddings[reused] = previous.example_embeddings[[rows[i] for i in reused]]
+    if missing:
+        embeddings[missing] = encode_texts(
+            encoder, [questions[i] for i in missing], batch_size=batch_size
+        )
+    print(f"Reused {len(reused)} example embedding(s) from {previous.path}, encoded {len(missing)}.")
+    return embeddings
+
+
+def build_bundle(
+    bundle_dir: str,
+    schema_path: str,
+    metadata_path: str,
+    data_path: str,
+    encoder: Optional[SharedEncoder] = None,
+    batch_size: int = 64,
+) -> str:
+    """
+    Builds the bundle for a set of source files into bundle_dir/<hash>.
+
+    The bundle is written to a temporary directory and renamed into place, so a
+    concurrent build or a reader never sees a partial bundle. Embeddings already
+    held by the latest previous bundle are copied instead of re-encoded.
+
+    :param bundle_dir: Parent directory holding the versions of one database's bundle.
+    :param encoder: Sentence embedding model; the shared one is used if not given.
+    :return: Path of the bundle directory.
+    """
+    sources = source_hashes(schema_path, metadata_path, data_path)
+    key = bundle_hash(sources)
+    target = os.path.join(bundle_dir, key[:16])
+    if os.path.exists(os.path.join(target, MANIFEST_FILE)):
+        return target
+
+    with open(schema_path, "r", encoding="utf-8") as file:
+        schema = file.read().strip()
+    if not schema:
+        raise ValueError(f"Schema file at {schema_path} is empty.")
+    with open(metadata_path, "r", encoding="utf-8") as file:
+        metadata = json.load(file)
+
+    df = load_examples(data_path)
+    examples = df[["Question", "Answer", "Summary"]].to_dict(orient="records")
+    knowledge_base = build_knowledge_base(metadata)
+    columns, column_texts = build_column_texts(metadata)
+
+    previous = latest_bundle(bundle_dir, exclude=target)
+    shared = encoder is None
+    encoder = encoder or embedding_provider.acquire(EMBEDDING_MODEL)
+    try:
+        example_embeddings = _example_embeddings(
+            encoder, df["Question"].astype(str).tolist(), previous, batch_size
+        )
+        if previous is not None and previous.manifest["sources"].get("metadata") == sources["metadata"]:
+            # The knowledge base and column texts derive from the metadata alone
+            table_embeddings = np.array(previous.table_embeddings)
+            column_embeddings = np.array(previous.column_embeddings)
+        else:
+            table_embeddings = encode_texts(
+                encoder, list(knowledge_base.values()), batch_size=batch_size
+            )
+            column_embeddings = encode_texts(encoder, column_texts, batch_size=batch_size)
+    finally:
+        if shared:
+            embedding_provider.release(encoder)
+
+    os.makedirs(bundle_dir, exist_ok=True)
+    staging = f"{target}.tmp-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    try:
+        with open(os.path.join(staging, SCHEMA_FILE), "w", encoding="utf-8") as file:
+            file.write(schema)
+        for name, data in (
+            (METADATA_FILE, metadata),
+            (EXAMPLES_FILE, examples),
+            (KNOWLEDGE_BASE_FILE, knowledge_base),
+            (FK_GRAPH_FILE, build_fk_graph(metadata)),
+            (COLUMNS_FILE, columns),
+        ):
+            with open(os.path.join(staging, name), "w", encoding="utf-8") as file:
+                json.dump(data, file, ensure_ascii=False)
+        np.save(os.path.join(staging, EXAMPLE_EMBEDDINGS_FILE), example_embeddings)
+        np.save(os.path.join(staging, TABLE_EMBEDDINGS_FILE), table_embeddings)
+        np.save(os.path.join(staging, COLUMN_EMBEDDINGS_FILE), column_embeddings)
+
+        manifest = {
+            "version": BUNDLE_VERSION,
+            "hash": key,
+            "model": EMBEDDING_MODEL,
+            "sources": sources,
+            "source_paths": {
+                "schema": schema_path,
+                "metadata": metadata_path,
+                "examples": data_path,
+            },
+            "counts": {
+                "examples": len(examples),
+                "tables": len(knowledge_base),
+                "columns": len(columns),
+            },
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        with open(os.path.join(staging, MANIFEST_FILE), "w", encoding="utf-8") as file:
+            json.dump(manifest, file, indent=2)
+
+        os.rename(staging, target)
+    except OSError:
+        # Another process finished the same bundle first
+        shutil.rmtree(staging, ignore_errors=True)
+        if not os.path.exists(os.path.join(target, MANIFEST_FILE)):
+            raise
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    return target
+
+
+def prune_bundles(bundle_dir: str, keep: str, superseded_only: bool = False):
+    """
+    Removes every bundle version in bundle_dir except the one named keep.
+
+    :param superseded_only: Only remove versions built before keep, so a newer bundle
+        built concurrently by another process survives.
+    """
+    built_at = os.path.getmtime(os.path.join(keep, MANIFEST_FILE)) if superseded_only else None
+    for name in os.listdir(bundle_dir):
+        path = os.path.join(bundle_dir, name)
+        if name == os.path.basename(keep) or not os.path.isdir(path) or ".tmp-" in name:
+            continue
+        manifest = os.path.join(path, MANIFEST_FILE)
+        if built_at is not None and os.path.exists(manifest) and os.path.getmtime(manifest) > built_at:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def load_bundle(
+    bundle_dir: str,
+    schema_path: str,
+    metadata_path: str,
+    data_path: str,
+    encoder: Optional[SharedEncoder] = None,
+    batch_size: int = 64,
+) -> ArtifactBundle:
+    """
+    Loads the bundle matching the current source files, rebuilding it first if
+    any source hash changed since the last build. A rebuild removes the versions
+    it supersedes, so appended feedback does not pile up embedding matrices on disk.
+
+    :return: The memory-mapped ArtifactBundle.
+    """
+    key = bundle_hash(source_hashes(schema_path, metadata_path, data_path))
+    path = os.path.join(bundle_dir, key[:16])
+
+    if not os.path.exists(os.path.join(path, MANIFEST_FILE)):
+        print(f"Building artifact bundle at {path}.")
+        path = build_bundle(
+            bundle_dir, schema_path, metadata_path, data_path, encoder=encoder, batch_size=batch_size
+        )
+        prune_bundles(bundle_dir, keep=path, superseded_only=True)
+
+    return ArtifactBundle(path)
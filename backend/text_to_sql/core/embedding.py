@@ -0,0 +1,650 @@
+import json
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from multiprocessing.connection import Client, Connection
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+Address = Union[str, Tuple[str, int]]
+
+
+def parse_address(value: str) -> Address:
+    """Parses 'host:port' into a TCP address; anything else is a Unix socket path."""
+    host, sep, port = value.rpartition(":")
+    if sep and port.isdigit() and "/" not in value:
+        return (host or "127.0.0.1", int(port))
+    return value
+
+
+# Largest frame accepted on the embedding service socket, about 40k texts of 384 floats
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+
+
+def send_message(connection: Connection, header: dict, payload: Optional[np.ndarray] = None):
+    """
+    Sends one embedding service message: a JSON header frame, followed for embeddings
+    by a frame of raw float32 bytes whose shape is given in the header.
+
+    Messages are never pickled, so a peer cannot make the other side run code.
+    """
+    if payload is not None:
+        payload = np.ascontiguousarray(payload, dtype=np.float32)
+        header = {**header, "shape": list(payload.shape)}
+    connection.send_bytes(json.dumps(header).encode("utf-8"))
+    if payload is not None:
+        connection.send_bytes(payload.tobytes())
+
+
+def recv_message(connection: Connection) -> Tuple[dict, Optional[np.ndarray]]:
+    """
+    Receives one message sent with send_message.
+
+    :return: The JSON header and the float32 payload, if the header announces one.
+    """
+    header = json.loads(connection.recv_bytes(MAX_MESSAGE_BYTES).decode("utf-8"))
+    if not isinstance(header, dict):
+        raise ValueError("Malformed embedding service message.")
+    payload = None
+    if "shape" in header:
+        data = connection.recv_bytes(MAX_MESSAGE_BYTES)
+        # Copied so callers get a writable array rather than a view of the bytes
+        payload = np.frombuffer(data, dtype=np.float32).reshape(header["shape"]).copy()
+    return header, payload
+
+
+def _finalize(
+    embeddings: np.ndarray,
+    single: bool,
+    convert_to_tensor: bool = False,
+    normalize_embeddings: bool = False,
+):
+    """Shapes a float32 batch result the way SentenceTransformer.encode would return it."""
+    if normalize_embeddings:
+        norms = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        embeddings = embeddings / norms
+    if single:
+        embeddings = embeddings[0]
+    if convert_to_tensor:
+        import torch
+
+        return torch.from_numpy(np.ascontiguousarray(embeddings))
+    return embeddings
+
+
+class SharedEncoder:
+    """
+    Thread-safe handle to a SentenceTransformer shared by every engine in the process.
+
+    Calls are serialized so concurrent requests do not oversubscribe the CPU with
+    competing intra-op thread pools.
+    """
+
+    def __init__(self, model_name: str, model: SentenceTransformer):
+        self.model_name = model_name
+        self.model = model
+        self._lock = threading.Lock()
+
+    def encode(self, sentences, **kwargs):
+        """Encodes sentences with the shared model; accepts SentenceTransformer.encode arguments."""
+        with self._lock:
+            return self.model.encode(sentences, **kwargs)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def __repr__(self):
+        return f"SharedEncoder(model_name={self.model_name})"
+
+
+class _EncodeRequest:
+    __slots__ = ("texts", "future")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.future: Future = Future()
+
+
+class BatchingEncoder:
+    """
+    Encoder that merges concurrent encode calls into micro-batches.
+
+    A dispatcher thread collects requests until max_batch_size texts are queued or
+    max_wait_ms has passed since the first one, runs the batch on a dedicated worker
+    pool and resolves each caller's future with its slice of the result. Calls that
+    are already at least max_batch_size texts long go straight to the model.
+    """
+
+    def __init__(
+        self,
+        encoder: SharedEncoder,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        num_workers: int = 1,
+    ):
+        """
+        Initializes the encoder and starts its dispatcher thread.
+
+        :param encoder: Underlying shared encoder.
+        :param max_batch_size: Maximum number of texts per forward pass.
+        :param max_wait_ms: Maximum time a request waits for others to join its batch.
+        :param num_workers: Number of threads running batches.
+        """
+        self.encoder = encoder
+        self.model_name = encoder.model_name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: "queue.Queue[Optional[_EncodeRequest]]" = queue.Queue()
+        self._pool = ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix="embedding")
+        self._stats = {"requests": 0, "batches": 0, "texts": 0}
+        self._stats_lock = threading.Lock()
+        self._dispatcher = threading.Thread(
+            target=self._dispatch, name="embedding-dispatcher", daemon=True
+        )
+        self._dispatcher.start()
+
+    def encode(
+        self,
+        sentences,
+        convert_to_tensor: bool = False,
+        normalize_embeddings: bool = False,
+        **kwargs,
+    ):
+        """Encodes sentences; accepts the SentenceTransformer.encode arguments used in this package."""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        if len(texts) >= self.max_batch_size:
+            embeddings = self.encoder.encode(
+                texts,
+                batch_size=kwargs.get("batch_size", self.max_batch_size),
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            )
+        else:
+            embeddings = self.submit(texts).result()
+
+        return _finalize(embeddings, single, convert_to_tensor, normalize_embeddings)
+
+    def submit(self, texts: List[str]) -> Future:
+        """Queues texts for the next micro-batch and returns a future of their embeddings."""
+        request = _EncodeRequest(texts)
+        if not texts:
+            request.future.set_result(
+                np.empty((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+            )
+            return request.future
+        self._queue.put(request)
+        return request.future
+
+    def _dispatch(self):
+        """Collects queued requests into batches until a stop marker is received."""
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+
+            batch, size, stop = [first], len(first.texts), False
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if request is None:
+                    stop = True
+                    break
+                batch.append(request)
+                size += len(request.texts)
+
+            self._pool.submit(self._run, batch)
+            if stop:
+                return
+
+    def _run(self, batch: List[_EncodeRequest]):
+        """Encodes one micro-batch and hands each caller its rows."""
+        texts = [text for request in batch for text in request.texts]
+        try:
+            embeddings = self.encoder.encode(
+                texts, batch_size=len(texts), convert_to_numpy=True, show_progress_bar=False
+            )
+        except BaseException as e:
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        with self._stats_lock:
+            self._stats["requests"] += len(batch)
+            self._stats["batches"] += 1
+            self._stats["texts"] += len(texts)
+
+        offset = 0
+        for request in batch:
+            request.future.set_result(embeddings[offset : offset + len(request.texts)])
+            offset += len(request.texts)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.encoder.get_sentence_embedding_dimension()
+
+    def stats(self) -> Dict[str, float]:
+        """Returns request, batch and text counters and the mean batch size."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["mean_batch_size"] = stats["texts"] / stats["batches"] if stats["batches"] else 0.0
+        return stats
+
+    def close(self):
+        """Stops the dispatcher after the queued requests and shuts the worker pool down."""
+        self._queue.put(None)
+        self._dispatcher.join()
+        self._pool.shutdown(wait=True)
+
+    def __repr__(self):
+        return (
+            f"BatchingEncoder(model_name={self.model_name}, max_batch_size={self.max_batch_size}, "
+            f"max_wait_ms={self.max_wait * 1000})"
+        )
+
+
+class RemoteEncoder:
+    """
+    Client of an embedding service process (see embedding_service.serve_embeddings).
+
+    Lets every uvicorn worker on a host share a single model copy; each calling
+    thread keeps its own connection to the service.
+    """
+
+    def __init__(
+        self, address: Address, authkey: Optional[bytes] = None, model_name: str = EMBEDDING_MODEL
+    ):
+        """
+        Initializes the client. Connections are opened lazily.
+
+        :param address: Unix socket path or (host, port) of the service.
+        :param authkey: Shared secret expected by the service, if any.
+        :param model_name: Model the service must be serving.
+        """
+        self.address = address
+        self.authkey = authkey
+        self.model_name = model_name
+        self._local = threading.local()
+        self._dimension: Optional[int] = None
+
+    def _call(self, request: dict) -> Tuple[dict, Optional[np.ndarray]]:
+        """Sends one request, reconnecting once if the connection was dropped."""
+        request = {**request, "model": self.model_name}
+        for attempt in range(2):
+            connection = getattr(self._local, "connection", None)
+            try:
+                if connection is None:
+                    connection = Client(self.address, authkey=self.authkey)
+                    self._local.connection = connection
+                send_message(connection, request)
+                header, payload = recv_message(connection)
+                break
+            except (EOFError, OSError):
+                self._local.connection = None
+                if connection is not None:
+                    connection.close()
+                if attempt:
+                    raise
+        if header.get("status") != "ok":
+            raise RuntimeError(f"Embedding service error: {header.get('error')}")
+        return header, payload
+
+    def encode(
+        self,
+        sentences,
+        convert_to_tensor: bool = False,
+        normalize_embeddings: bool = False,
+        **kwargs,
+    ):
+        """Encodes sentences on the service; accepts the SentenceTransformer.encode arguments used in this package."""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        _, embeddings = self._call({"command": "encode", "texts": texts})
+        return _finalize(embeddings, single, convert_to_tensor, normalize_embeddings)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        if self._dimension is None:
+            header, _ = self._call({"command": "dimension"})
+            self._dimension = int(header["dimension"])
+        return self._dimension
+
+    def close(self):
+        """Closes the calling thread's connection."""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def __repr__(self):
+        return f"RemoteEncoder(address={self.address}, model_name={self.model_name})"
+
+
+class EmbeddingCache:
+    """
+    Size-bounded LRU cache of text embeddings keyed by (model, normalized text).
+
+    The bound is on the bytes held by the cached vectors and keys, so it stays
+    predictable whatever the embedding size.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        """
+        Initializes the cache.
+
+        :param max_bytes: Memory cap in bytes; least recently used entries are evicted beyond it.
+        """
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Collapses whitespace so trivially different spellings share an entry."""
+        return " ".join(text.split())
+
+    @staticmethod
+    def _size(key: Tuple[str, str], vector: np.ndarray) -> int:
+        return vector.nbytes + len(key[0]) + len(key[1].encode("utf-8"))
+
+    def get(self, model_name: str, text: str) -> Optional[np.ndarray]:
+        """Returns the cached embedding of a text, or None on a miss."""
+        key = (model_name, self.normalize(text))
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return vector
+
+    def put(self, model_name: str, text: str, vector: np.ndarray):
+        """Stores an embedding, evicting least recently used entries beyond the memory cap."""
+        key = (model_name, self.normalize(text))
+        vector = np.array(vector, dtype=np.float32)
+        vector.setflags(write=False)
+        size = self._size(key, vector)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= self._size(key, previous)
+            self._entries[key] = vector
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                old_key, old_vector = self._entries.popitem(last=False)
+                self._bytes -= self._size(old_key, old_vector)
+                self._stats["evictions"] += 1
+
+    def stats(self) -> Dict[str, float]:
+        """Returns hit/miss/eviction counters, the hit rate, and the entries and bytes held."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+class CachedEncoder:
+    """
+    Encoder that answers repeated texts from an EmbeddingCache and encodes only the misses.
+
+    Only small calls, the per-question path, go through the cache: larger batches are
+    dataset or index builds that would evict every cached question for no later hit.
+    """
+
+    def __init__(self, encoder, cache: EmbeddingCache, max_cached_batch: int = 32):
+        """
+        :param encoder: Underlying SharedEncoder, BatchingEncoder or RemoteEncoder.
+        :param cache: Cache shared by every encoder of the provider.
+        :param max_cached_batch: Calls with more texts bypass the cache.
+        """
+        self.encoder = encoder
+        self.cache = cache
+        self.max_cached_batch = max_cached_batch
+        self.model_name = encoder.model_name
+
+    def encode(
+        self,
+        sentences,
+        convert_to_tensor: bool = False,
+        normalize_embeddings: bool = False,
+        **kwargs,
+    ):
+        """Encodes sentences; accepts the SentenceTransformer.encode arguments used in this package."""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return _finalize(
+                np.empty((0, self.get_sentence_embedding_dimension()), dtype=np.float32),
+                single, convert_to_tensor, normalize_embeddings,
+            )
+
+        if len(texts) > self.max_cached_batch:
+            return self.encoder.encode(
+                sentences,
+                convert_to_tensor=convert_to_tensor,
+                normalize_embeddings=normalize_embeddings,
+                **kwargs,
+            )
+
+        rows = [self.cache.get(self.model_name, text) for text in texts]
+        missing = {}
+        for i, row in enumerate(rows):
+            if row is None:
+                missing.setdefault(EmbeddingCache.normalize(texts[i]), []).append(i)
+
+        if missing:
+            first = [positions[0] for positions in missing.values()]
+            computed = self.encoder.encode(
+                [texts[i] for i in first],
+                batch_size=kwargs.get("batch_size", 32),
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            )
+            for positions, vector in zip(missing.values(), computed):
+                self.cache.put(self.model_name, texts[positions[0]], vector)
+                for i in positions:
+                    rows[i] = vector
+
+        return _finalize(np.vstack(rows), single, convert_to_tensor, normalize_embeddings)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.encoder.get_sentence_embedding_dimension()
+
+    def close(self):
+        if hasattr(self.encoder, "close"):
+            self.encoder.close()
+
+    def __repr__(self):
+        return f"CachedEncoder(encoder={self.encoder})"
+
+
+class _PendingEncoder:
+    """Placeholder for an encoder being loaded, which concurrent acquirers wait on."""
+
+    def __init__(self):
+        self.encoder = None
+        self.error: Optional[BaseException] = None
+        self.ready = threading.Event()
+        self.holders = 1
+
+
+class EmbeddingModelProvider:
+    """
+    Process-wide provider handing out one shared encoder per model name.
+
+    Encoders are reference counted: the first acquire loads the model, later ones
+    reuse it, and the model is dropped when the last holder releases it. Models are
+    loaded outside the provider lock, so a cold load only delays callers of that model.
+    """
+
+    def __init__(self, num_threads: Optional[int] = None):
+        """
+        Initializes the provider.
+
+        :param num_threads: Optional CPU thread budget for torch inference in this process.
+        """
+        self._encoders: Dict[str, "SharedEncoder | BatchingEncoder | RemoteEncoder | CachedEncoder"] = {}
+        self._refcounts: Dict[str, int] = {}
+        self._loading: Dict[str, _PendingEncoder] = {}
+        self._lock = threading.Lock()
+        self.num_threads = None
+        if num_threads:
+            self.set_thread_budget(num_threads)
+
+        self.max_batch_size = 0
+        self.max_wait_ms = 5.0
+        self.num_workers = 1
+        self.service_address: Optional[Address] = None
+        self.service_authkey: Optional[bytes] = None
+        self.cache: Optional[EmbeddingCache] = EmbeddingCache()
+
+    def configure(
+        self,
+        max_batch_size: int = 0,
+        max_wait_ms: float = 5.0,
+        num_workers: int = 1,
+        service_address: Optional[Address] = None,
+        service_authkey: Optional[bytes] = None,
+        cache_max_bytes: int = 32 * 1024 * 1024,
+    ):
+        """
+        Chooses how encoders acquired from now on run.
+
+        :param max_batch_size: Micro-batch size for concurrent encode calls; 0 disables batching.
+        :param max_wait_ms: Maximum time a call waits for others to join its batch.
+        :param num_workers: Number of threads running batches.
+        :param service_address: Address of a shared embedding service; when set, no model is
+            loaded in this process.
+        :param service_authkey: Shared secret of the embedding service.
+        :param cache_max_bytes: Memory cap of the query-embedding cache; 0 disables it.
+        """
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.num_workers = num_workers
+        self.service_address = service_address
+        self.service_authkey = service_authkey
+        self.cache = EmbeddingCache(cache_max_bytes) if cache_max_bytes > 0 else None
+
+    def _create(self, model_name: str):
+        """Builds the encoder for a model according to the current configuration."""
+        if self.service_address is not None:
+            encoder = RemoteEncoder(self.service_address, self.service_authkey, model_name)
+        else:
+            encoder = SharedEncoder(model_name, SentenceTransformer(model_name))
+            if self.max_batch_size > 0:
+                encoder = BatchingEncoder(
+                    encoder, self.max_batch_size, self.max_wait_ms, self.num_workers
+                )
+
+        if self.cache is not None:
+            encoder = CachedEncoder(encoder, self.cache)
+        return encoder
+
+    def set_thread_budget(self, num_threads: int):
+        """Caps the number of CPU threads torch uses for inference."""
+        import torch
+
+        if num_threads < 1:
+            raise ValueError("Thread budget must be at least 1.")
+        torch.set_num_threads(num_threads)
+        self.num_threads = num_threads
+
+    def acquire(self, model_name: str = EMBEDDING_MODEL):
+        """
+        Returns the shared encoder for a model, loading it on first use.
+
+        Every acquire must be paired with a release. Concurrent callers asking for a
+        model that is still loading wait for that single load.
+        """
+        with self._lock:
+            encoder = self._encoders.get(model_name)
+            if encoder is not None:
+                self._refcounts[model_name] += 1
+                return encoder
+
+            pending = self._loading.get(model_name)
+            owner = pending is None
+            if owner:
+                pending = _PendingEncoder()
+                self._loading[model_name] = pending
+            else:
+                pending.holders += 1
+
+        if not owner:
+            pending.ready.wait()
+            if pending.error is not None:
+                raise RuntimeError(
+                    f"Failed to load embedding model {model_name}: {pending.error}"
+                ) from pending.error
+            return pending.encoder
+
+        try:
+            encoder = self._create(model_name)
+        except BaseException as e:
+            with self._lock:
+                del self._loading[model_name]
+            pending.error = e
+            pending.ready.set()
+            raise
+
+        with self._lock:
+            del self._loading[model_name]
+            self._encoders[model_name] = encoder
+            self._refcounts[model_name] = pending.holders
+        pending.encoder = encoder
+        pending.ready.set()
+        return encoder
+
+    def release(self, encoder):
+        """Drops one reference to an encoder, unloading the model when none remain."""
+        with self._lock:
+            model_name = encoder.model_name
+            if self._encoders.get(model_name) is not encoder:
+                return
+            self._refcounts[model_name] -= 1
+            if self._refcounts[model_name] > 0:
+                return
+            del self._encoders[model_name]
+            del self._refcounts[model_name]
+
+        if hasattr(encoder, "close"):
+            encoder.close()
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the number of holders of each loaded model."""
+        with self._lock:
+            return dict(self._refcounts)
+
+    def cache_stats(self) -> Dict[str, float]:
+        """Returns the query-embedding cache counters, or an empty dict when it is disabled."""
+        return self.cache.stats() if self.cache is not None else {}
+
+
+embedding_provider = EmbeddingModelProvider()
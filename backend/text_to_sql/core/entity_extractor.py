@@ -0,0 +1,256 @@
+import difflib
+import re
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .retrieve_context import encode_texts
+
+# Question words that never name a schema element, in English and Indonesian
+STOPWORDS = frozenset(
+    """
+    a about above after all also am among an and any are as at be been before being below between both
+    but by can could did do does doing done down during each either every for from further get give had
+    has have having he her here hers him his how i if in into is it its itself just least less list many
+    me more most much my never no nor not of off on once one only or other our out over own per please
+    return same she should show so some sort sorted such than that the their them then there these they
+    this those through to too top total under until up very was we were what when where which while who
+    whom whose why will with within without would you your order descending ascending desc asc
+    number count average sum maximum minimum highest lowest greatest first last find display
+    ada adalah akan apa atau bagi bahwa banyak belum berapa berdasarkan bersama dalam dan dari dengan
+    di ini itu jumlah juga ke kepada lebih mana mereka oleh pada paling pernah saja sama sampai semua
+    setiap siapa tampilkan tanpa tertinggi terendah untuk urut urutkan yang
+    """.split()
+)
+
+
+def normalize_text(text: str) -> str:
+    """Lower-cases text and replaces everything but letters and digits with single spaces."""
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", text.lower()).split())
+
+
+def name_variants(name: str) -> List[str]:
+    """Surface forms of a schema name: spaced, joined and with the last word singular or plural."""
+    words = normalize_text(name.replace("_", " ")).split()
+    if not words:
+        return []
+    last = words[-1]
+    if last.endswith("ies"):
+        forms = [last, last[:-3] + "y"]
+    elif last.endswith(("ss", "x", "ch", "sh")):
+        forms = [last, last + "es"]
+    elif last.endswith("s"):
+        forms = [last, last[:-1]]
+    elif last.endswith("y"):
+        forms = [last, last[:-1] + "ies"]
+    else:
+        forms = [last, last + "s"]
+    variants = {" ".join(words[:-1] + [form]) for form in forms}
+    variants.add("".join(words))
+    return sorted(v for v in variants if len(v) >= 3)
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton matching many patterns in one pass over the text.
+
+    Only matches that start and end on word boundaries of the normalized text are reported.
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[int, Any]]] = [[]]
+        self._built = False
+
+    def add(self, pattern: str, value: Any):
+        """Adds a pattern; value is reported for every match of it."""
+        node = 0
+        for char in pattern:
+            if char not in self._goto[node]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[node][char] = len(self._goto) - 1
+            node = self._goto[node][char]
+        self._output[node].append((len(pattern), value))
+        self._built = False
+
+    def build(self):
+        """Computes the failure links breadth first."""
+        queue = deque(self._goto[0].values())
+        for node in queue:
+            self._fail[node] = 0
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+        self._built = True
+
+    def find(self, text: str) -> List[Tuple[int, int, Any]]:
+        """
+        Finds every whole-word pattern occurrence.
+
+        :return: (start, end, value) triples with end exclusive.
+        """
+        if not self._built:
+            self.build()
+        matches = []
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for length, value in self._output[node]:
+                start, end = index - length + 1, index + 1
+                if (start == 0 or text[start - 1] == " ") and (end == len(text) or text[end] == " "):
+                    matches.append((start, end, value))
+        return matches
+
+
+class LocalEntityExtractor:
+    """
+    Extracts schema entities from a question without an LLM call.
+
+    Table, column and synonym names are matched exactly with an Aho-Corasick automaton,
+    remaining words fuzzily against the same vocabulary, and remaining n-grams by
+    embedding similarity to the columns. The confidence is the share of content words
+    explained by a match, weighted by the match score.
+    """
+
+    def __init__(
+        self,
+        metadata: Dict[str, Any],
+        encoder=None,
+        synonyms: Optional[Dict[str, Iterable[str]]] = None,
+        fuzzy_cutoff: float = 0.85,
+        embedding_threshold: float = 0.55,
+        max_ngram: int = 3,
+    ):
+        """
+        Initializes the extractor.
+
+        :param metadata: Parsed files/metadata/<database>.json; tables and columns may carry "synonyms".
+        :param encoder: Sentence encoder for n-gram matching; disabled if not given.
+        :param synonyms: Extra mapping of table or column name to synonyms.
+        :param fuzzy_cutoff: Minimum difflib ratio of a fuzzy match.
+        :param embedding_threshold: Minimum cosine similarity of an n-gram to a column.
+        """
+        self.encoder = encoder
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.embedding_threshold = embedding_threshold
+        self.max_ngram = max_ngram
+        synonyms = synonyms or {}
+
+        # Table names are added first so they win over columns sharing a surface form
+        self.vocabulary: Dict[str, str] = {}
+        for table in metadata.get("tables", []):
+            terms = table.get("synonyms", []) + list(synonyms.get(table["name"], []))
+            self._add_term(table["name"], table["name"], terms)
+
+        column_names, column_texts = [], []
+        for table in metadata.get("tables", []):
+            for column in table.get("columns", []):
+                terms = column.get("synonyms", []) + list(synonyms.get(column["name"], []))
+                self._add_term(column["name"], column["name"], terms)
+                column_names.append(column["name"])
+                column_texts.append(f"{table['name']} {column['name']}".replace("_", " "))
+
+        self.automaton = AhoCorasick()
+        for term, entity in self.vocabulary.items():
+            self.automaton.add(term, entity)
+        self.automaton.build()
+        self._terms = list(self.vocabulary)
+
+        self.column_names = column_names
+        self.column_embeddings = encode_texts(encoder, column_texts) if encoder is not None else None
+
+    def _add_term(self, name: str, entity: str, synonyms: Iterable[str]):
+        for term in name_variants(name) + [normalize_text(s) for s in synonyms]:
+            if term and term not in self.vocabulary:
+                self.vocabulary[term] = entity
+
+    @staticmethod
+    def _select(
+        candidates: List[Tuple[int, int, str, float]], taken: List[bool]
+    ) -> List[Tuple[int, int, str, float]]:
+        """Greedily keeps the longest, then best scoring, non-overlapping token spans."""
+        selected = []
+        for start, end, entity, score in sorted(candidates, key=lambda c: (c[0] - c[1], -c[3], c[0])):
+            if not any(taken[start:end]):
+                taken[start:end] = [True] * (end - start)
+                selected.append((start, end, entity, score))
+        return selected
+
+    def extract(self, question: str) -> Tuple[List[str], float]:
+        """
+        Extracts the entities mentioned in a question.
+
+        :return: Entities in order of appearance and the confidence in [0, 1].
+        """
+        text = normalize_text(question)
+        tokens = text.split()
+        if not tokens:
+            return [], 0.0
+
+        # Character offset of every token start, to map automaton matches to token spans
+        offsets, position = {}, 0
+        for index, token in enumerate(tokens):
+            offsets[position] = index
+            position += len(token) + 1
+
+        taken = [False] * len(tokens)
+        matches = self._select(
+            [
+                (offsets[start], offsets[start] + text[start:end].count(" ") + 1, entity, 1.0)
+                for start, end, entity in self.automaton.find(text)
+            ],
+            taken,
+        )
+
+        content = [i for i, token in enumerate(tokens) if token not in STOPWORDS and not token.isdigit()]
+        content_set = set(content)
+
+        fuzzy = []
+        for i in content:
+            if not taken[i] and len(tokens[i]) >= 4:
+                close = difflib.get_close_matches(tokens[i], self._terms, n=1, cutoff=self.fuzzy_cutoff)
+                if close:
+                    ratio = difflib.SequenceMatcher(None, tokens[i], close[0]).ratio()
+                    fuzzy.append((i, i + 1, self.vocabulary[close[0]], ratio))
+        matches += self._select(fuzzy, taken)
+
+        if self.column_embeddings is not None and len(self.column_embeddings):
+            spans = [
+                (start, start + n)
+                for n in range(1, self.max_ngram + 1)
+                for start in range(len(tokens) - n + 1)
+                if all(i in content_set and not taken[i] for i in range(start, start + n))
+            ]
+            if spans:
+                ngrams = [" ".join(tokens[start:end]) for start, end in spans]
+                scores = encode_texts(self.encoder, ngrams, cache=True) @ self.column_embeddings.T
+                best = scores.argmax(axis=1)
+                matches += self._select(
+                    [
+                        (start, end, self.column_names[column], float(scores[row, column]))
+                        for row, ((start, end), column) in enumerate(zip(spans, best))
+                        if scores[row, column] >= self.embedding_threshold
+                    ],
+                    taken,
+                )
+
+        entities = list(dict.fromkeys(entity for _, _, entity, _ in sorted(matches)))
+        if not content:
+            return entities, 1.0 if entities else 0.0
+
+        explained = np.zeros(len(tokens))
+        for start, end, _, score in matches:
+            explained[start:end] = score
+        return entities, float(explained[content].mean())
@@ -0,0 +1,196 @@
+import csv
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .embedding import EMBEDDING_MODEL, EmbeddingCache, embedding_provider
+from .retrieve_context import encode_texts, load_examples
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+EXAMPLE_COLUMNS = ["Question", "Answer", "Summary"]
+
+
+def find_near_duplicates(embeddings: np.ndarray, threshold: float, block_size: int = 2048) -> np.ndarray:
+    """
+    Flags rows that have a later row with cosine similarity of at least threshold,
+    so the newest of each group of near-identical questions is kept.
+
+    :param embeddings: (N, D) unit-length embeddings in insertion order.
+    :return: Boolean mask of the rows to drop.
+    """
+    n = embeddings.shape[0]
+    drop = np.zeros(n, dtype=bool)
+    for start in range(0, n, block_size):
+        block = embeddings[start : start + block_size]
+        later = embeddings[start + 1 :]
+        if later.shape[0] == 0:
+            break
+        similarities = block @ later.T
+        # Only compare each row with rows inserted after it
+        rows = np.arange(block.shape[0])[:, None]
+        columns = np.arange(later.shape[0])[None, :]
+        similarities[columns < rows] = -1.0
+        drop[start : start + block.shape[0]] = (similarities >= threshold).any(axis=1)
+    return drop
+
+
+class ExampleStore:
+    """
+    Append-only example dataset backed by the CSV used by RetrieveContext.
+
+    Accepted feedback is appended as one CSV row instead of rewriting the file.
+    Exact and near-identical questions are removed by compact(), which rewrites the
+    file atomically. It runs on demand, or every compact_every appends on a background
+    thread so that appends never wait for a rewrite.
+    """
+
+    def __init__(
+        self,
+        data_path: str,
+        compact_every: int = 0,
+        dedup_threshold: float = 0.97,
+    ):
+        """
+        Initializes the store.
+
+        :param data_path: Path to the dataset CSV.
+        :param compact_every: Compact after this many appends; 0 only compacts on demand.
+        :param dedup_threshold: Cosine similarity above which two questions are near-identical.
+        """
+        if os.path.splitext(data_path)[-1].lower() != ".csv":
+            raise ValueError("ExampleStore only supports CSV datasets.")
+
+        self.data_path = data_path
+        self.compact_every = compact_every
+        self.dedup_threshold = dedup_threshold
+        self._lock = threading.Lock()
+        self._appended = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._compaction: Optional[Future] = None
+
+    @contextmanager
+    def _file_lock(self):
+        """Serializes writers across processes sharing the dataset."""
+        if fcntl is None:
+            yield
+            return
+        with open(f"{self.data_path}.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _header(self) -> Optional[List[str]]:
+        if not os.path.exists(self.data_path) or os.path.getsize(self.data_path) == 0:
+            return None
+        with open(self.data_path, "r", newline="", encoding="utf-8") as file:
+            return next(csv.reader(file), None)
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.data_path, "rb") as file:
+            file.seek(-1, os.SEEK_END)
+            return file.read(1) in (b"\n", b"\r")
+
+    def append(self, question: str, answer: str, summary: str, **extra: str) -> Dict[str, str]:
+        """
+        Appends one example, keeping the columns of the existing file.
+
+        :param extra: Values for additional dataset columns, if any.
+        :return: The appended example.
+        """
+        row = {"Question": question, "Answer": answer, "Summary": summary, **extra}
+
+        with self._lock, self._file_lock():
+            header = self._header()
+            new_file = header is None
+            fieldnames = header or EXAMPLE_COLUMNS
+
+            with open(self.data_path, "a", newline="", encoding="utf-8") as file:
+                if not new_file and not self._ends_with_newline():
+                    file.write("\n")
+                writer = csv.DictWriter(file, fieldnames=fieldnames, extrasaction="ignore")
+                if new_file:
+                    writer.writeheader()
+                writer.writerow(row)
+
+            self._appended += 1
+            if self.compact_every and self._appended >= self.compact_every:
+                self._schedule_compaction()
+        return row
+
+    def _schedule_compaction(self):
+        """Starts a background compaction unless one is already pending. Caller must hold the lock."""
+        if self._compaction is not None and not self._compaction.done():
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="example-compaction")
+        self._compaction = self._executor.submit(self._compact_in_background)
+
+    def _compact_in_background(self):
+        try:
+            self.compact()
+        except Exception as e:
+            print(f"Warning: Failed to compact {self.data_path}: {e}")
+
+    def compact(self, encoder=None) -> int:
+        """
+        Removes exact and near-identical duplicate questions, keeping the newest.
+
+        The locks are only held to snapshot the file and to rewrite it, so appends
+        can proceed while the questions are being embedded; rows appended meanwhile
+        are carried over as is.
+
+        :param encoder: Sentence encoder; the shared one is used if not given.
+        :return: Number of removed rows.
+        """
+        with self._lock, self._file_lock():
+            if self._header() is None:
+                return 0
+            df = load_examples(self.data_path)
+            size = os.path.getsize(self.data_path)
+            self._appended = 0
+        total = len(df)
+
+        keys = df["Question"].astype(str).map(lambda q: EmbeddingCache.normalize(q).lower())
+        df = df[~keys.duplicated(keep="last")].reset_index(drop=True)
+
+        if len(df) > 1 and self.dedup_threshold < 1.0:
+            shared = encoder is None
+            encoder = encoder or embedding_provider.acquire(EMBEDDING_MODEL)
+            try:
+                embeddings = encode_texts(encoder, df["Question"].astype(str).tolist())
+            finally:
+                if shared:
+                    embedding_provider.release(encoder)
+            df = df[~find_near_duplicates(embeddings, self.dedup_threshold)]
+
+        removed = total - len(df)
+        if removed:
+            with self._lock, self._file_lock():
+                if os.path.getsize(self.data_path) < size:
+                    # Another process compacted the file in the meantime
+                    return 0
+                appended = load_examples(self.data_path).iloc[total:]
+                temp_path = f"{self.data_path}.tmp-{os.getpid()}"
+                pd.concat([df, appended], ignore_index=True).to_csv(temp_path, index=False)
+                os.replace(temp_path, self.data_path)
+
+        if removed:
+            print(f"Compacted {self.data_path}: removed {removed} duplicate example(s).")
+        return removed
+
+    def close(self):
+        """Waits for a pending background compaction to finish."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
@@ -1,15 +1,18 @@
 from text_to_sql.common import LLMConfig
 from .base_llm import BaseLLM
+from .schema_renderer import format_schema_context
 from typing import Dict, Any
 
-import json
-
 
 class QueryGenerator(BaseLLM):
     """
     A specialized LLM for generating SQL queries from user input.
     """
 
+    # Repairs always sample, even when generation runs at temperature 0, so that
+    # successive retries on the same error can produce different queries
+    FIX_TEMPERATURE = 0.7
+
     def __init__(self, config: LLMConfig):
         """
         Initializes the QueryGenerator model.
@@ -33,7 +36,7 @@ class QueryGenerator(BaseLLM):
         Converts a natural language query into an SQL query.
 
         :param user_prompt: The natural language input.
-        :param schema: The relevant database schema (JSON format).
+        :param schema: The schema linker output for the question.
         :return: The generated SQL query.
         """
         if not user_prompt or not isinstance(user_prompt, str):
@@ -42,9 +45,9 @@ class QueryGenerator(BaseLLM):
         if not schema or not isinstance(schema, dict):
             raise ValueError("Schema must be a non-empty dictionary.")
 
-        schema_json = json.dumps(schema, indent=2)
+        schema_text = format_schema_context(schema)
         formatted_system_prompt = self.system_prompt.format(
-            database_schema=schema_json,
+            database_schema=schema_text,
             relevant_question=example["relevant_question"],
             relevant_answer=example["relevant_answer"],
             relevant_summary=example["relevant_summary"],
@@ -60,7 +63,7 @@ class QueryGenerator(BaseLLM):
         Converts a natural language query into an SQL query.
 
         :param user_prompt: The natural language input.
-        :param schema: The relevant database schema (JSON format).
+        :param schema: The schema linker output for the question.
         :return: The generated SQL query.
         """
         if not user_prompt or not isinstance(user_prompt, str):
@@ -69,9 +72,9 @@ class QueryGenerator(BaseLLM):
         if not schema or not isinstance(schema, dict):
             raise ValueError("Schema must be a non-empty dictionary.")
 
-        schema_json = json.dumps(schema, indent=2)
+        schema_text = format_schema_context(schema)
         formatted_system_prompt = self.system_prompt_baseline.format(
-            database_schema=schema_json,
+            database_schema=schema_text,
         )
         sql_query = self.model.generate(
             system_prompt=formatted_system_prompt, user_prompt=user_prompt
@@ -86,7 +89,7 @@ class QueryGenerator(BaseLLM):
         Converts a natural language query into an SQL query.
 
         :param user_prompt: The natural language input.
-        :param schema: The relevant database schema (JSON format).
+        :param schema: The schema linker output for the question.
         :return: The generated SQL query.
         """
         if not user_prompt or not isinstance(user_prompt, str):
@@ -95,9 +98,9 @@ class QueryGenerator(BaseLLM):
         if not schema or not isinstance(schema, dict):
             raise ValueError("Schema must be a non-empty dictionary.")
 
-        schema_json = json.dumps(schema, indent=2)
+        schema_text = format_schema_context(schema)
         formatted_system_prompt = self.system_prompt.format(
-            database_schema=schema_json,
+            database_schema=schema_text,
             relevant_question=example["relevant_question"],
             relevant_answer=example["relevant_answer"],
             relevant_summary=example["relevant_summary"],
@@ -134,16 +137,19 @@ class QueryGenerator(BaseLLM):
         if not schema or not isinstance(schema, dict):
             raise ValueError("Schema must be a non-empty dictionary.")
 
-        schema_json = json.dumps(schema, indent=2)
+        schema_text = format_schema_context(schema)
         formatted_system_prompt = self.system_prompt_multistage.format(
             sql_query=sql_query,
             error_message=error_message,
-            database_schema=schema_json,
+            database_schema=schema_text,
         )
 
+        # A cached answer would replay the same broken query on every retry
         fixed_query = self.model.generate(
             system_prompt=formatted_system_prompt,
             user_prompt=user_prompt,
+            temperature=max(self.config.temperature, self.FIX_TEMPERATURE),
+            use_cache=False,
         )
 
         return fixed_query.strip()
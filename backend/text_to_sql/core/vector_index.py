@@ -0,0 +1,463 @@
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Scales each row to unit length so that dot products are cosine similarities."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k_similar(matrix: np.ndarray, query: np.ndarray, k: int):
+    """
+    Finds the k rows of a normalized matrix most similar to a normalized query.
+
+    :param matrix: (N, D) float32 matrix of unit-length embeddings.
+    :param query: (D,) unit-length query embedding.
+    :param k: Number of results to return.
+    :return: Tuple of (indices, scores), best match first.
+    """
+    k = min(k, matrix.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+    scores = matrix @ query
+    return _top_k(scores, k)
+
+
+def _top_k(scores: np.ndarray, k: int):
+    """Returns the indices and values of the k largest scores, best first."""
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    if k < scores.shape[0]:
+        indices = np.argpartition(-scores, k - 1)[:k]
+    else:
+        indices = np.arange(scores.shape[0])
+    indices = indices[np.argsort(-scores[indices], kind="stable")]
+    return indices, scores[indices]
+
+
+def _append_rows(buffer: np.ndarray, size: int, rows: np.ndarray) -> np.ndarray:
+    """
+    Writes rows after the first size rows of buffer, growing it geometrically so
+    repeated small appends stay amortized O(1). Read-only buffers (memory maps) are
+    copied on the first append.
+
+    :return: The buffer holding size + len(rows) valid rows.
+    """
+    needed = size + rows.shape[0]
+    if needed > buffer.shape[0] or not buffer.flags.writeable:
+        capacity = max(needed, int(buffer.shape[0] * 1.5) + 16)
+        grown = np.empty((capacity,) + buffer.shape[1:], dtype=buffer.dtype)
+        grown[:size] = buffer[:size]
+        buffer = grown
+    buffer[size:needed] = rows
+    return buffer
+
+
+def _kmeans(data: np.ndarray, k: int, iterations: int = 20, seed: int = 0) -> np.ndarray:
+    """Plain Lloyd's k-means; returns (k, D) centroids."""
+    rng = np.random.default_rng(seed)
+    k = min(k, data.shape[0])
+    centroids = data[rng.choice(data.shape[0], k, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = _nearest(data, centroids)
+        counts = np.bincount(assignments, minlength=k)
+        empty = counts == 0
+
+        # Sum the rows of each cluster with one sort + reduceat instead of np.add.at
+        order = np.argsort(assignments, kind="stable")
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[~empty]
+        sums = np.add.reduceat(data[order], starts, axis=0)
+        centroids[~empty] = sums / counts[~empty, None]
+        if empty.any():
+            # Re-seed empty clusters from random points
+            centroids[empty] = data[rng.choice(data.shape[0], int(empty.sum()), replace=False)]
+    return centroids
+
+
+def _nearest(data: np.ndarray, centroids: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+    """Returns the index of the closest centroid (L2) for each row, in chunks to bound memory."""
+    centroid_norms = (centroids ** 2).sum(axis=1)
+    assignments = np.empty(data.shape[0], dtype=np.int64)
+    for start in range(0, data.shape[0], chunk_size):
+        chunk = data[start : start + chunk_size]
+        distances = centroid_norms[None, :] - 2 * (chunk @ centroids.T)
+        assignments[start : start + chunk_size] = distances.argmin(axis=1)
+    return assignments
+
+
+class VectorIndex(ABC):
+    """
+    Interface of the example-retrieval indexes. Vectors are unit-length float32,
+    so inner products are cosine similarities.
+    """
+
+    @abstractmethod
+    def add(self, vectors: np.ndarray):
+        """Appends vectors; their ids continue from the current size."""
+        pass
+
+    @abstractmethod
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns (ids, scores) of the k nearest vectors, best first."""
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+
+PRECISIONS = ("float32", "float16", "int8", "binary")
+
+# Number of set bits of every byte value, for Hamming distances on packed codes
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+class FlatIndex(VectorIndex):
+    """
+    Exact index: one contiguous matrix scored with a single matmul.
+
+    Vectors can be stored at reduced precision to fit more stores in a worker:
+    float16 (2 bytes per dimension), int8 scalar-quantized with a per-dimension
+    scale (1 byte), or binary sign codes (1 bit). Binary search ranks rows by
+    Hamming distance first and rescores the best candidates with float vectors
+    read from the source memory map, so binary stores must be memory-mapped (from
+    an artifact bundle); only rows added later are kept in memory, at float16.
+    """
+
+    def __init__(
+        self,
+        vectors: Optional[np.ndarray] = None,
+        dim: Optional[int] = None,
+        precision: str = "float32",
+        rescore: int = 64,
+        chunk_size: int = 65536,
+    ):
+        """
+        :param vectors: Initial (N, D) matrix; a float32 read-only memory map is used as is until the first add.
+        :param dim: Embedding size, required when no vectors are given.
+        :param precision: Storage precision, one of PRECISIONS; "binary" needs a memory-mapped matrix.
+        :param rescore: Number of Hamming candidates rescored in float (binary only).
+        :param chunk_size: Rows dequantized at a time when scoring reduced-precision stores.
+        """
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision '{precision}'. Use one of {PRECISIONS}.")
+        if precision == "binary" and not isinstance(vectors, np.memmap):
+            # Rescoring needs float rows; an in-memory copy would outweigh float16 storage
+            raise ValueError(
+                "Binary precision needs a memory-mapped matrix to rescore from; "
+                "load the embeddings from an artifact bundle or use float16 or int8."
+            )
+        if vectors is None:
+            if dim is None:
+                raise ValueError("Either vectors or dim must be provided.")
+            vectors = np.empty((0, dim), dtype=np.float32)
+
+        self.precision = precision
+        self.rescore = rescore
+        self.chunk_size = chunk_size
+        self.dim = vectors.shape[1]
+        self._size = vectors.shape[0]
+
+        if precision == "int8":
+            self.scale = np.ones(self.dim, dtype=np.float32)
+            if self._size:
+                scale = np.abs(np.asarray(vectors, dtype=np.float32)).max(axis=0)
+                self.scale = np.where(scale > 0, scale, 1.0).astype(np.float32)
+
+        self._data = vectors if precision == "float32" else self._encode(vectors)
+        self._rescore_data = None
+        self._rescore_tail = None
+        if precision == "binary":
+            # Mapped rows come from the bundle; rows added afterwards live in the tail
+            self._rescore_data = vectors
+            self._rescore_tail = np.empty((0, self.dim), dtype=np.float16)
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Converts float32 rows to the storage precision."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.precision == "float32":
+            return vectors
+        if self.precision == "float16":
+            return vectors.astype(np.float16)
+        if self.precision == "int8":
+            return np.clip(np.rint(vectors / self.scale * 127), -127, 127).astype(np.int8)
+        return np.packbits(vectors > 0, axis=1)
+
+    def _decode(self, data: np.ndarray) -> np.ndarray:
+        """Converts stored rows back to float32."""
+        if self.precision == "int8":
+            return data.astype(np.float32) * (self.scale / 127)
+        return data.astype(np.float32)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """The stored vectors as float32 (the rescoring vectors for binary stores)."""
+        if self.precision == "float32":
+            return self._data[: self._size]
+        if self.precision == "binary":
+            return self._rescore_rows(np.arange(self._size))
+        return self._decode(self._data[: self._size])
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held in memory by the stored vectors (memory maps excluded)."""
+        total = 0 if isinstance(self._data, np.memmap) else self._data[: self._size].nbytes
+        if self._rescore_tail is not None:
+            total += self._rescore_tail[: self._size - len(self._rescore_data)].nbytes
+        return total
+
+    def add(self, vectors: np.ndarray):
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        if self._rescore_tail is not None:
+            self._rescore_tail = _append_rows(
+                self._rescore_tail, self._size - len(self._rescore_data), vectors.astype(np.float16)
+            )
+        self._data = _append_rows(self._data, self._size, self._encode(vectors))
+        self._size += vectors.shape[0]
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        """
+        Scores every stored vector against one (D,) or several (Q, D) queries.
+
+        :return: (N,) or (Q, N) cosine similarities.
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        if self.precision == "float32":
+            return queries @ self._data[: self._size].T
+
+        if self.precision == "int8":
+            # Fold the scale into the query instead of dequantizing the whole store
+            segments, queries = [(self._data, self._size)], queries * (self.scale / 127)
+        elif self.precision == "binary":
+            mapped = len(self._rescore_data)
+            segments = [(self._rescore_data, mapped), (self._rescore_tail, self._size - mapped)]
+        else:
+            segments = [(self._data, self._size)]
+
+        parts = []
+        for stored, size in segments:
+            for start in range(0, size, self.chunk_size):
+                end = min(start + self.chunk_size, size)
+                parts.append(queries @ stored[start:end].astype(np.float32).T)
+        if not parts:
+            return np.empty(queries.shape[:-1] + (0,), dtype=np.float32)
+        return np.concatenate(parts, axis=-1)
+
+    def _rescore_rows(self, ids: np.ndarray) -> np.ndarray:
+        """Float32 rescoring vectors of sorted row ids, from the memory map or the added tail."""
+        mapped = len(self._rescore_data)
+        split = np.searchsorted(ids, mapped)
+        rows = np.empty((len(ids), self.dim), dtype=np.float32)
+        rows[:split] = self._rescore_data[ids[:split]]
+        rows[split:] = self._rescore_tail[ids[split:] - mapped]
+        return rows
+
+    def _hamming(self, query: np.ndarray) -> np.ndarray:
+        """Hamming distance between the query's sign code and every stored code."""
+        code = np.packbits(query > 0)
+        distances = np.empty(self._size, dtype=np.int32)
+        for start in range(0, self._size, self.chunk_size):
+            end = min(start + self.chunk_size, self._size)
+            distances[start:end] = _POPCOUNT[np.bitwise_xor(self._data[start:end], code)].sum(axis=1)
+        return distances
+
+    def search(self, query: np.ndarray, k: int):
+        query = np.asarray(query, dtype=np.float32)
+        if self.precision != "binary":
+            return _top_k(self.scores(query), k)
+
+        if self._size == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        candidates = _top_k(-self._hamming(query).astype(np.float32), max(k, self.rescore))[0]
+        candidates.sort()
+        rescored = self._rescore_rows(candidates) @ query
+        top, top_scores = _top_k(rescored, k)
+        return candidates[top], top_scores
+
+    def __len__(self) -> int:
+        return self._size
+
+
+class IVFPQIndex(VectorIndex):
+    """
+    Approximate index: an inverted file over k-means cells with product-quantized
+    residuals (IVF-PQ), in NumPy.
+
+    Each vector is stored as its cell id plus n_subvectors one-byte codes, so a
+    384-dimensional store shrinks from 1536 to n_subvectors bytes per row. A query
+    scans the n_probe closest cells using per-subspace lookup tables, optionally
+    rescoring the best candidates with the exact vectors.
+    """
+
+    def __init__(
+        self,
+        n_lists: int = 1024,
+        n_subvectors: int = 48,
+        n_probe: int = 16,
+        rerank: int = 64,
+        train_size: int = 65536,
+        seed: int = 0,
+    ):
+        """
+        :param n_lists: Number of coarse k-means cells.
+        :param n_subvectors: Number of PQ subspaces (must divide the embedding size).
+        :param n_probe: Number of cells scanned per query.
+        :param rerank: Number of top candidates rescored with exact vectors; 0 keeps only the
+            PQ codes, trading ranking accuracy for memory.
+        :param train_size: Maximum number of vectors sampled to train the quantizers.
+        """
+        self.n_lists = n_lists
+        self.n_subvectors = n_subvectors
+        self.n_probe = n_probe
+        self.rerank = rerank
+        self.train_size = train_size
+        self.seed = seed
+
+        self.centroids: Optional[np.ndarray] = None
+        self.codebooks: Optional[np.ndarray] = None
+        self._codes = np.empty((0, n_subvectors), dtype=np.uint8)
+        self._vectors: Optional[np.ndarray] = None
+        self._lists: List[List[int]] = []
+        self._list_arrays: Dict[int, np.ndarray] = {}
+        # Guards _lists against _list_arrays so a search never caches a list missing an add
+        self._lists_lock = threading.Lock()
+        self._size = 0
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def train(self, vectors: np.ndarray):
+        """Fits the coarse quantizer and the PQ codebooks on a sample of vectors."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        dim = vectors.shape[1]
+        if dim % self.n_subvectors:
+            raise ValueError(
+                f"n_subvectors ({self.n_subvectors}) must divide the embedding size ({dim})."
+            )
+
+        rng = np.random.default_rng(self.seed)
+        if vectors.shape[0] > self.train_size:
+            vectors = vectors[rng.choice(vectors.shape[0], self.train_size, replace=False)]
+
+        self.centroids = _kmeans(vectors, self.n_lists, seed=self.seed)
+        self.n_lists = self.centroids.shape[0]
+        residuals = vectors - self.centroids[_nearest(vectors, self.centroids)]
+
+        sub_dim = dim // self.n_subvectors
+        n_codes = min(256, residuals.shape[0])
+        self.codebooks = np.stack(
+            [
+                _kmeans(residuals[:, m * sub_dim : (m + 1) * sub_dim], n_codes, seed=self.seed + m)
+                for m in range(self.n_subvectors)
+            ]
+        )
+        self._lists = [[] for _ in range(self.n_lists)]
+        self._list_arrays = {}
+
+    def _encode(self, residuals: np.ndarray) -> np.ndarray:
+        sub_dim = residuals.shape[1] // self.n_subvectors
+        codes = np.empty((residuals.shape[0], self.n_subvectors), dtype=np.uint8)
+        for m in range(self.n_subvectors):
+            codes[:, m] = _nearest(residuals[:, m * sub_dim : (m + 1) * sub_dim], self.codebooks[m])
+        return codes
+
+    def add(self, vectors: np.ndarray):
+        if not self.is_trained:
+            raise ValueError("IVFPQIndex must be trained before vectors are added.")
+
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.centroids.shape[1])
+        assignments = _nearest(vectors, self.centroids)
+        codes = self._encode(vectors - self.centroids[assignments])
+
+        ids = np.arange(self._size, self._size + vectors.shape[0])
+        self._codes = _append_rows(self._codes, self._size, codes)
+        if self.rerank:
+            if self._vectors is None:
+                self._vectors = np.empty((0, vectors.shape[1]), dtype=np.float32)
+            self._vectors = _append_rows(self._vectors, self._size, vectors)
+        with self._lists_lock:
+            for vector_id, cell in zip(ids, assignments):
+                self._lists[cell].append(int(vector_id))
+                self._list_arrays.pop(int(cell), None)
+        self._size += vectors.shape[0]
+
+    def _list_ids(self, cell: int) -> np.ndarray:
+        ids = self._list_arrays.get(cell)
+        if ids is None:
+            with self._lists_lock:
+                ids = np.asarray(self._lists[cell], dtype=np.int64)
+                self._list_arrays[cell] = ids
+        return ids
+
+    def search(self, query: np.ndarray, k: int):
+        if self._size == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        query = np.asarray(query, dtype=np.float32)
+        coarse = self.centroids @ query
+        cells = _top_k(coarse, self.n_probe)[0]
+
+        # Cell sizes come from the same id arrays that are scanned, so a concurrent add
+        # growing a list cannot misalign the candidate scores
+        cell_ids = [self._list_ids(int(cell)) for cell in cells]
+        ids = np.concatenate(cell_ids)
+        if ids.size == 0:
+            return ids, np.empty(0, dtype=np.float32)
+        cell_scores = np.concatenate(
+            [np.full(len(members), coarse[cell], dtype=np.float32) for cell, members in zip(cells, cell_ids)]
+        )
+
+        # q . (c + r) = q . c + sum over subspaces of q_m . codebook_m[code_m]
+        sub_dim = query.shape[0] // self.n_subvectors
+        tables = np.einsum(
+            "mkd,md->mk", self.codebooks, query.reshape(self.n_subvectors, sub_dim)
+        )
+        codes = self._codes[ids]
+        scores = cell_scores + tables[np.arange(self.n_subvectors), codes].sum(axis=1)
+
+        if self.rerank and self._vectors is not None:
+            candidates = _top_k(scores, max(k, self.rerank))[0]
+            ids = ids[candidates]
+            scores = self._vectors[ids] @ query
+
+        top, top_scores = _top_k(scores, k)
+        return ids[top], top_scores
+
+    def __len__(self) -> int:
+        return self._size
+
+
+INDEX_TYPES = ("flat", "ivfpq")
+
+
+def build_index(vectors: np.ndarray, index_type: str = "flat", **params) -> VectorIndex:
+    """
+    Builds an example-retrieval index over unit-length vectors.
+
+    :param index_type: "flat" for exact search or "ivfpq" for the approximate index.
+    :param params: Extra arguments of the index class.
+    """
+    if index_type == "flat":
+        return FlatIndex(vectors, **params)
+    if index_type == "ivfpq":
+        index = IVFPQIndex(**params)
+        if vectors.shape[0] < index.n_lists:
+            print(
+                f"Warning: {vectors.shape[0]} vectors are too few for {index.n_lists} IVF lists; "
+                "using the exact index instead."
+            )
+            return FlatIndex(vectors)
+        index.train(vectors)
+        index.add(vectors)
+        return index
+    raise ValueError(f"Unknown index type '{index_type}'. Use one of {INDEX_TYPES}.")
@@ -0,0 +1,92 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from text_to_sql.core.entity_extractor import AhoCorasick, LocalEntityExtractor, name_variants, normalize_text
+
+METADATA_DIR = Path(__file__).resolve().parents[1] / "files" / "metadata"
+
+
+@pytest.fixture(scope="module")
+def sakila():
+    with open(METADATA_DIR / "sakila.json", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def test_normalize_text():
+    assert normalize_text("  Films' Rental-Rate, (USD)? ") == "films rental rate usd"
+
+
+@pytest.mark.parametrize(
+    "name, expected",
+    [
+        ("film", ["film", "films"]),
+        ("category", ["categories", "category"]),
+        ("address", ["address", "addresses"]),
+        ("film_actor", ["film actor", "film actors", "filmactor"]),
+        ("box", ["box", "boxes"]),
+    ],
+)
+def test_name_variants(name, expected):
+    assert name_variants(name) == expected
+
+
+def test_aho_corasick_matches_whole_words_only():
+    automaton = AhoCorasick()
+    for pattern in ["film", "film actor", "actor", "cat"]:
+        automaton.add(pattern, pattern)
+
+    text = "film actors and the film actor category"
+    matches = {(text[start:end], value) for start, end, value in automaton.find(text)}
+
+    assert matches == {("film", "film"), ("film actor", "film actor"), ("actor", "actor")}
+
+
+def test_aho_corasick_reports_overlapping_patterns():
+    automaton = AhoCorasick()
+    automaton.add("rental rate", "rental_rate")
+    automaton.add("rate", "rate")
+
+    assert automaton.find("max rental rate") == [(4, 15, "rental_rate"), (11, 15, "rate")]
+
+
+def test_extracts_tables_and_columns_from_plural_mentions(sakila):
+    extractor = LocalEntityExtractor(sakila)
+
+    entities, confidence = extractor.extract("List the films and their categories with rental rate")
+
+    assert entities == ["film", "category", "rental_rate"]
+    assert confidence == pytest.approx(1.0)
+
+
+def test_prefers_the_longest_match(sakila):
+    extractor = LocalEntityExtractor(sakila)
+
+    entities, _ = extractor.extract("How many film actors are there?")
+
+    assert entities == ["film_actor"]
+
+
+def test_fuzzy_matches_misspellings(sakila):
+    extractor = LocalEntityExtractor(sakila)
+
+    entities, confidence = extractor.extract("show every custmer")
+
+    assert entities == ["customer"]
+    assert 0.85 <= confidence < 1.0
+
+
+def test_unmatched_words_lower_the_confidence(sakila):
+    extractor = LocalEntityExtractor(sakila)
+
+    entities, confidence = extractor.extract("films about dinosaurs")
+
+    assert entities == ["film"]
+    assert confidence == pytest.approx(0.5)
+
+
+def test_synonyms(sakila):
+    extractor = LocalEntityExtractor(sakila, synonyms={"film": ["movie"]})
+
+    assert extractor.extract("top 10 movies")[0] == ["film"]
@@ -0,0 +1,75 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from text_to_sql.core.join_graph import JoinGraph
+from text_to_sql.core.schema_linker import build_fk_graph
+
+METADATA_DIR = Path(__file__).resolve().parents[1] / "files" / "metadata"
+
+
+@pytest.fixture(scope="module")
+def sakila():
+    with open(METADATA_DIR / "sakila.json", encoding="utf-8") as file:
+        return JoinGraph(build_fk_graph(json.load(file)))
+
+
+def chain(*tables: str) -> JoinGraph:
+    """Graph joining the given tables one after the other."""
+    fk_graph = {table: [] for table in tables}
+    for a, b in zip(tables, tables[1:]):
+        join = f"{a}.{b}_id = {b}.id"
+        fk_graph[a].append({"table": b, "join": join})
+        fk_graph[b].append({"table": a, "join": join})
+    return JoinGraph(fk_graph)
+
+
+def test_actor_and_category_are_bridged_through_film(sakila):
+    assert sakila.connect(["actor", "category"]) == {
+        "actor",
+        "film_actor",
+        "film",
+        "film_category",
+        "category",
+    }
+
+
+def test_path(sakila):
+    assert sakila.path("actor", "category") == ["actor", "film_actor", "film", "film_category", "category"]
+    assert sakila.path("film", "film") == ["film"]
+
+
+def test_adjacent_tables_need_no_bridge(sakila):
+    assert sakila.connect(["film", "language"]) == {"film", "language"}
+
+
+def test_joins_lists_only_foreign_keys_inside_the_set(sakila):
+    joins = sakila.joins(sakila.connect(["actor", "category"]))
+
+    assert len(joins) == 4
+    assert all("language" not in join for join in joins)
+
+
+def test_connect_is_memoized_and_returns_copies(sakila):
+    first = sakila.connect(["actor", "category"])
+    first.add("payment")
+
+    assert "payment" not in sakila.connect(["category", "actor"])
+
+
+def test_three_tables_share_one_tree():
+    graph = chain("a", "b", "c", "d", "e")
+
+    assert graph.connect(["a", "c", "e"]) == {"a", "b", "c", "d", "e"}
+    assert graph.connect(["b", "d"]) == {"b", "c", "d"}
+
+
+def test_disconnected_and_unknown_tables_are_kept_as_is():
+    graph = chain("a", "b", "c")
+    graph_with_island = JoinGraph({**{t: [] for t in "abc"}, "island": []})
+
+    assert graph.path("a", "c") == ["a", "b", "c"]
+    assert graph.connect(["a", "missing"]) == {"a", "missing"}
+    assert graph_with_island.connect(["a", "island"]) == {"a", "island"}
+    assert graph_with_island.path("a", "island") == []
@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+
+from text_to_sql.core.vector_index import FlatIndex, IVFPQIndex, VectorIndex, build_index, normalize_rows
+
+
+def clustered_vectors(n: int = 2000, dim: int = 64, n_clusters: int = 32, seed: int = 0) -> np.ndarray:
+    """Unit-length vectors scattered around random cluster centres, like sentence embeddings."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((n_clusters, dim))
+    points = centres[rng.integers(n_clusters, size=n)] + 0.3 * rng.standard_normal((n, dim))
+    return normalize_rows(points.astype(np.float32))
+
+
+def queries_near(vectors: np.ndarray, n: int = 50, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    picked = vectors[rng.choice(len(vectors), n, replace=False)]
+    return normalize_rows(picked + 0.05 * rng.standard_normal(picked.shape).astype(np.float32))
+
+
+def recall_at_k(index: VectorIndex, exact: FlatIndex, queries: np.ndarray, k: int) -> float:
+    hits = 0
+    for query in queries:
+        expected = set(exact.search(query, k)[0].tolist())
+        hits += len(expected & set(index.search(query, k)[0].tolist()))
+    return hits / (k * len(queries))
+
+
+def test_vector_index_is_abstract():
+    with pytest.raises(TypeError):
+        VectorIndex()
+
+
+def test_ivfpq_recall_against_flat():
+    vectors = clustered_vectors()
+    exact = FlatIndex(vectors)
+    index = build_index(vectors, "ivfpq", n_lists=32, n_subvectors=16, n_probe=8, rerank=64)
+
+    assert isinstance(index, IVFPQIndex)
+    assert len(index) == len(vectors)
+    assert recall_at_k(index, exact, queries_near(vectors), k=10) >= 0.9
+
+
+def test_ivfpq_without_rerank_still_finds_the_nearest_row():
+    vectors = clustered_vectors()
+    index = build_index(vectors, "ivfpq", n_lists=32, n_subvectors=16, n_probe=8, rerank=0)
+
+    found = [index.search(vectors[i], 5)[0] for i in range(0, len(vectors), 100)]
+    assert np.mean([i * 100 in ids for i, ids in enumerate(found)]) >= 0.9
+
+
+def test_ivfpq_add_extends_ids():
+    vectors = clustered_vectors()
+    index = build_index(vectors[:1500], "ivfpq", n_lists=32, n_subvectors=16, n_probe=32)
+    index.add(vectors[1500:])
+
+    assert len(index) == len(vectors)
+    ids, scores = index.search(vectors[1999], 1)
+    assert ids[0] == 1999
+    assert scores[0] == pytest.approx(1.0, abs=1e-5)
+
+
+def test_ivfpq_requires_training():
+    with pytest.raises(ValueError):
+        IVFPQIndex(n_lists=4, n_subvectors=4).add(clustered_vectors(n=10))
+
+
+def test_build_index_falls_back_to_flat_for_small_stores():
+    assert isinstance(build_index(clustered_vectors(n=10), "ivfpq", n_lists=32), FlatIndex)
+
+
+def memory_mapped(vectors: np.ndarray, path) -> np.memmap:
+    mapped = np.lib.format.open_memmap(str(path), mode="w+", dtype=np.float32, shape=vectors.shape)
+    mapped[:] = vectors
+    mapped.flush()
+    return np.load(str(path), mmap_mode="r")
+
+
+@pytest.mark.parametrize("precision", ["float16", "int8"])
+def test_reduced_precision_round_trip(precision):
+    vectors = clustered_vectors()
+    index = FlatIndex(vectors, precision=precision)
+
+    assert np.abs(index.vectors - vectors).max() < 0.02
+    assert index.nbytes < vectors.nbytes
+
+
+@pytest.mark.parametrize("precision", ["float16", "int8"])
+def test_reduced_precision_ranking_matches_float32(precision):
+    vectors = clustered_vectors()
+    exact = FlatIndex(vectors)
+    index = FlatIndex(vectors, precision=precision)
+    queries = queries_near(vectors)
+
+    assert np.abs(index.scores(queries) - exact.scores(queries)).max() < 0.02
+    assert recall_at_k(index, exact, queries, k=10) >= 0.9
+
+
+def test_binary_needs_a_memory_map():
+    with pytest.raises(ValueError):
+        FlatIndex(clustered_vectors(), precision="binary")
+
+
+def test_binary_ranking_matches_float32(tmp_path):
+    vectors = clustered_vectors()
+    exact = FlatIndex(vectors)
+    index = FlatIndex(memory_mapped(vectors, tmp_path / "vectors.npy"), precision="binary", rescore=64)
+
+    assert index.nbytes == len(vectors) * 64 // 8
+    assert recall_at_k(index, exact, queries_near(vectors), k=10) >= 0.9
+
+
+def test_binary_add_keeps_rows_searchable(tmp_path):
+    vectors = clustered_vectors()
+    index = FlatIndex(memory_mapped(vectors[:1500], tmp_path / "vectors.npy"), precision="binary")
+    index.add(vectors[1500:])
+
+    assert len(index) == len(vectors)
+    assert index.vectors.shape == vectors.shape
+    ids, scores = index.search(vectors[1999], 1)
+    assert ids[0] == 1999
+    assert scores[0] == pytest.approx(1.0, abs=1e-2)
+    assert index.scores(vectors[:2]).shape == (2, len(vectors))
@@ -0,0 +1,103 @@
+"""
+Benchmark the fused triage call against the three-call triage path.
+
+Run from the backend directory:
+    python -m tools.benchmark_triage --provider openai --model gpt-4o-mini \
+        --dataset ../text_to_sql/files/dataset/dataset_intent.csv
+"""
+import argparse
+import time
+
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from utils.enum import ENUM
+from ai_agent.ai_agent import (
+    AgentState,
+    detect_language_tool,
+    detect_intent_tool,
+    is_question_detailed_enough,
+    triage_tool,
+)
+from text_to_sql.common import LLMConfig
+from text_to_sql.core import GeneralLLM
+
+
+def tokens_used(llm_agent, before: dict) -> int:
+    usage = llm_agent.model.usage
+    return (usage["prompt_tokens"] - before["prompt_tokens"]) + (
+        usage["completion_tokens"] - before["completion_tokens"]
+    )
+
+
+def run_three_calls(state: AgentState, llm_agent) -> dict:
+    labels = {}
+    labels.update(detect_language_tool(state, llm_agent))
+    labels.update(detect_intent_tool(state, llm_agent))
+    labels.update(is_question_detailed_enough(state, llm_agent))
+    if labels["DetectIntent"] == "other":
+        labels["CheckDetails"] = None
+    return labels
+
+
+def benchmark(prompts: list, llm_agent) -> pd.DataFrame:
+    rows = []
+    for prompt in prompts:
+        state = AgentState(query=prompt, model="", provider="", database="")
+        row = {"prompt": prompt}
+
+        for name, runner in (("three_call", run_three_calls), ("fused", triage_tool)):
+            before = dict(llm_agent.model.usage)
+            start = time.perf_counter()
+            labels = runner(state, llm_agent)
+            row[f"{name}_latency"] = time.perf_counter() - start
+            row[f"{name}_tokens"] = tokens_used(llm_agent, before)
+            for key, value in labels.items():
+                row[f"{name}_{key}"] = value
+
+        rows.append(row)
+
+    return pd.DataFrame(rows)
+
+
+def summarize(df: pd.DataFrame):
+    print(f"Prompts: {len(df)}")
+    for name in ("three_call", "fused"):
+        print(
+            f"{name:>10}: latency mean {df[f'{name}_latency'].mean():.3f}s, "
+            f"p95 {df[f'{name}_latency'].quantile(0.95):.3f}s, "
+            f"tokens mean {df[f'{name}_tokens'].mean():.1f}"
+        )
+
+    for key in ("Language", "DetectIntent", "CheckDetails"):
+        agreement = (df[f"three_call_{key}"].fillna("-") == df[f"fused_{key}"].fillna("-")).mean()
+        print(f"Agreement on {key}: {agreement:.2%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--provider", default="openai")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--dataset", default="../text_to_sql/files/dataset/dataset_intent.csv")
+    parser.add_argument("--column", default="prompt")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--output", default="")
+    args = parser.parse_args()
+
+    llm_agent = GeneralLLM(
+        config=LLMConfig(
+            type="api",
+            model=args.model,
+            provider=args.provider,
+            api_key=ENUM.get(args.provider, ""),
+        )
+    )
+
+    prompts = pd.read_csv(args.dataset)[args.column].dropna().astype(str).tolist()[: args.limit]
+    result = benchmark(prompts, llm_agent)
+    summarize(result)
+
+    if args.output:
+        result.to_csv(args.output, index=False)
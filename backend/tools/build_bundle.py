@@ -0,0 +1,47 @@
+"""
+Build the precomputed artifact bundle of one or more databases.
+
+A bundle holds the schema, metadata, example store, knowledge base, FK graph
+and embedding matrices, under a directory named after the hash of its sources.
+Engines configured with Config(bundle_dir=...) memory-map it at startup and
+rebuild it on their own when a source file changes.
+
+Run from the backend directory:
+    python -m tools.build_bundle sakila northwind academic soccer
+"""
+import argparse
+import os
+
+from text_to_sql.core.bundle import build_bundle, prune_bundles
+from text_to_sql.core.embedding import EMBEDDING_MODEL, embedding_provider
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("databases", nargs="+")
+    parser.add_argument("--bundle-dir", default="files/bundle")
+    parser.add_argument("--schema", default="files/schema/{database}.txt")
+    parser.add_argument("--metadata", default="files/metadata/{database}.json")
+    parser.add_argument("--examples", default="files/dataset/dataset_{database}.csv")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--prune", action="store_true", help="Remove older versions of each bundle.")
+    args = parser.parse_args()
+
+    encoder = embedding_provider.acquire(EMBEDDING_MODEL)
+    for database in args.databases:
+        bundle_dir = os.path.join(args.bundle_dir, database)
+        path = build_bundle(
+            bundle_dir,
+            schema_path=args.schema.format(database=database),
+            metadata_path=args.metadata.format(database=database),
+            data_path=args.examples.format(database=database),
+            encoder=encoder,
+            batch_size=args.batch_size,
+        )
+        if args.prune:
+            prune_bundles(bundle_dir, keep=path)
+        print(f"{database}: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Run the shared embedding service for every uvicorn worker on this host.
+
+Workers started with EMBEDDING_SERVICE_ADDRESS pointing at the same address
+send their encode calls here instead of loading their own model copy.
+
+Run from the backend directory:
+    python -m tools.embedding_server --address /tmp/text_to_sql_embeddings.sock
+"""
+import argparse
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from text_to_sql.core import parse_address, serve_embeddings
+from text_to_sql.core.embedding import EMBEDDING_MODEL
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--address",
+        default=os.getenv("EMBEDDING_SERVICE_ADDRESS") or "/tmp/text_to_sql_embeddings.sock",
+        help="Unix socket path, or host:port when EMBEDDING_SERVICE_AUTHKEY is set.",
+    )
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=None, help="CPU thread budget for torch.")
+    args = parser.parse_args()
+
+    address = parse_address(args.address)
+    if isinstance(address, str) and os.path.exists(address):
+        os.remove(address)
+
+    serve_embeddings(
+        address,
+        authkey=os.getenv("EMBEDDING_SERVICE_AUTHKEY", "").encode() or None,
+        model_name=args.model,
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+        num_workers=args.workers,
+        num_threads=args.threads,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,7 @@
-from typing import Dict
+from typing import Dict, Optional
+
+from .retry import RetryPolicy
+from .llm_cache import LLMCache
 
 
 class LLMConfig:
@@ -11,6 +14,10 @@ class LLMConfig:
         model: str = "",
         provider: str = "",
         timeout: int = 300,
+        retry_policy: Optional[RetryPolicy] = None,
+        cache: Optional[LLMCache] = None,
+        cache_ttl: Optional[float] = None,
+        temperature: float = 0.7,
     ):
         self.type = type
         self.api_key = api_key
@@ -19,10 +26,14 @@ class LLMConfig:
         self.model = model
         self.provider = provider
         self.timeout = timeout
+        self.retry_policy = retry_policy
+        self.cache = cache
+        self.cache_ttl = cache_ttl
+        self.temperature = temperature
 
     def __repr__(self):
         return (
-            f"LLMConfig(type={self.type}, provider={self.provider}, timeout={self.timeout}"
+            f"LLMConfig(type={self.type}, provider={self.provider}, timeout={self.timeout}, "
             f"model={self.model}, use_gpu={self.use_gpu}, "
             f"model_path={self.model_path}, api_key={'****' if self.api_key else 'None'})"
         )
@@ -39,17 +50,69 @@ class SLConfig(LLMConfig):
         provider: str = "",
         schema_path: Dict = None,
         metadata_path: Dict = None,
+        timeout: int = 300,
+        retry_policy: Optional[RetryPolicy] = None,
+        cache: Optional[LLMCache] = None,
+        cache_ttl: Optional[float] = None,
+        temperature: float = 0.7,
+        embedding_precision: str = "float32",
+        schema_mode: str = "full",
+        min_link_confidence: float = 0.3,
+        schema_format: str = "raw",
+        linker_mode: str = "llm",
+        local_confidence: float = 0.6,
+        column_pooling: str = "none",
+        max_columns: int = 0,
     ):
-        super().__init__(type, api_key, model_path, use_gpu, model, provider)
+        """
+        Initializes the SLConfig object.
+
+        :param schema_mode: "full" sends the whole schema with a hint of the linked tables;
+            "pruned" sends only the linked tables and the bridge tables that join them.
+        :param min_link_confidence: Mean best table similarity per entity below which the
+            pruned mode falls back to the full schema.
+        :param schema_format: "raw" sends the schema file as is; "ddl", "compact" or "typed"
+            render it from the metadata JSON in a more compact form.
+        :param linker_mode: "llm" extracts entities with the LLM, "local" with the local
+            extractor only, and "cascade" with the local extractor unless its confidence
+            is below local_confidence.
+        :param column_pooling: "max" or "mean" also scores each table by pooling the
+            similarity of its columns to the entities; "none" scores tables only.
+        :param max_columns: Keep only this many of the best-ranked columns per table, plus
+            its keys, in the pruned schema; 0 keeps every column.
+        """
+        if schema_mode not in ("full", "pruned"):
+            raise ValueError("Schema mode must be 'full' or 'pruned'.")
+        if schema_format not in ("raw", "ddl", "compact", "typed"):
+            raise ValueError("Schema format must be 'raw', 'ddl', 'compact' or 'typed'.")
+        if linker_mode not in ("llm", "local", "cascade"):
+            raise ValueError("Linker mode must be 'llm', 'local' or 'cascade'.")
+        if column_pooling not in ("none", "max", "mean"):
+            raise ValueError("Column pooling must be 'none', 'max' or 'mean'.")
+
+        super().__init__(
+            type, api_key, model_path, use_gpu, model, provider, timeout, retry_policy, cache, cache_ttl,
+            temperature,
+        )
         self.schema_path = schema_path if schema_path is not None else ""
         self.metadata_path = metadata_path if metadata_path is not None else ""
+        self.embedding_precision = embedding_precision
+        self.schema_mode = schema_mode
+        self.min_link_confidence = min_link_confidence
+        self.schema_format = schema_format
+        self.linker_mode = linker_mode
+        self.local_confidence = local_confidence
+        self.column_pooling = column_pooling
+        self.max_columns = max_columns
 
     def __repr__(self):
         return (
             f"SLConfig(type={self.type}, provider={self.provider}, "
             f"model={self.model}, use_gpu={self.use_gpu}, "
             f"model_path={self.model_path}, api_key={'****' if self.api_key else 'None'}, "
-            f"schema_path={self.schema_path}, metadata_path={self.metadata_path})"
+            f"schema_path={self.schema_path}, metadata_path={self.metadata_path}, "
+            f"schema_mode={self.schema_mode}, schema_format={self.schema_format}, "
+            f"linker_mode={self.linker_mode}, column_pooling={self.column_pooling})"
         )
 
 
@@ -57,11 +120,38 @@ class ContextConfig:
     def __init__(
         self,
         data_path: str,
+        batch_size: int = 64,
+        normalize_embeddings: bool = True,
+        index_type: str = "flat",
+        index_params: Optional[Dict] = None,
+        embedding_precision: str = "float32",
+        dedup_threshold: float = 0.97,
     ):
+        """
+        Initializes the ContextConfig object.
+
+        :param data_path: Path to the example dataset (CSV, JSON, or TXT).
+        :param batch_size: Number of questions encoded per forward pass.
+        :param normalize_embeddings: Whether the encoder returns unit-length embeddings.
+        :param index_type: Example index, "flat" (exact) or "ivfpq" (approximate, for large stores).
+        :param index_params: Extra arguments of the index, e.g. {"n_lists": 1024, "n_probe": 16}.
+        :param embedding_precision: Storage of the flat index: float32, float16, int8, or binary;
+            binary needs an artifact bundle (Config.bundle_dir) to rescore from.
+        :param dedup_threshold: Cosine similarity above which an added example is a duplicate.
+        """
         self.data_path = data_path
+        self.batch_size = batch_size
+        self.normalize_embeddings = normalize_embeddings
+        self.index_type = index_type
+        self.index_params = index_params or {}
+        self.embedding_precision = embedding_precision
+        self.dedup_threshold = dedup_threshold
 
     def __repr__(self):
-        return f"ContextConfig(data_path={self.data_path})"
+        return (
+            f"ContextConfig(data_path={self.data_path}, batch_size={self.batch_size}, "
+            f"index_type={self.index_type}, embedding_precision={self.embedding_precision})"
+        )
 
 
 class QueryConfig:
@@ -70,7 +160,14 @@ class QueryConfig:
     """
 
     def __init__(
-        self, host: str, database: str, user: str, password: str, port: int = 5432
+        self,
+        host: str,
+        database: str,
+        user: str,
+        password: str,
+        port: int = 5432,
+        min_connections: int = 1,
+        max_connections: int = 8,
     ):
         """
         Initializes the QueryConfig object.
@@ -80,12 +177,48 @@ class QueryConfig:
         :param user: Database user.
         :param password: Database password.
         :param port: Database port (default is 5432).
+        :param min_connections: Connections opened up front in the pool.
+        :param max_connections: Upper bound of concurrent connections; further queries wait.
         """
         self.host = host
         self.database = database
         self.user = user
         self.password = password
         self.port = port
+        self.min_connections = min_connections
+        self.max_connections = max_connections
+
+
+class HTTPConfig:
+    """
+    Configuration class for the process-wide HTTP connection pools used by API models.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 20,
+        max_connections: int = 100,
+        keepalive_expiry: float = 30.0,
+        http2: bool = True,
+    ):
+        """
+        Initializes the HTTPConfig object.
+
+        :param pool_size: Keep-alive connections kept per provider.
+        :param max_connections: Maximum concurrent connections per provider (async client).
+        :param keepalive_expiry: Seconds an idle connection is kept open.
+        :param http2: Whether the async client negotiates HTTP/2 (requires the 'h2' package).
+        """
+        self.pool_size = pool_size
+        self.max_connections = max_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.http2 = http2
+
+    def __repr__(self):
+        return (
+            f"HTTPConfig(pool_size={self.pool_size}, max_connections={self.max_connections}, "
+            f"keepalive_expiry={self.keepalive_expiry}, http2={self.http2})"
+        )
 
 
 class Config:
@@ -97,13 +230,22 @@ class Config:
         retrieve_context_config: ContextConfig,
         query_executor_config: QueryConfig,
         max_retry_attempt: int = 5,
+        bundle_dir: Optional[str] = None,
     ):
+        """
+        Initializes the Config object.
+
+        :param bundle_dir: Directory of the precomputed artifact bundle for this database.
+            When set, the schema linker and example retrieval load from the bundle,
+            which is rebuilt automatically when the source files change.
+        """
         self.rewriter_config = rewriter_config
         self.query_generator_config = query_generator_config
         self.schema_linker_config = schema_linker_config
         self.retrieve_context_config = retrieve_context_config
         self.query_executor_config = query_executor_config
         self.max_retry_attempt = max_retry_attempt
+        self.bundle_dir = bundle_dir
 
     def __repr__(self):
         return (
@@ -112,5 +254,5 @@ class Config:
             f"retrieve_context_config={self.retrieve_context_config}, "
             f"query_executor_config={self.query_executor_config}, "
             f"schema_linker_config={self.schema_linker_config}), "
-            f"max_retry_attempt={self.max_retry_attempt}"
+            f"max_retry_attempt={self.max_retry_attempt}, bundle_dir={self.bundle_dir}"
         )
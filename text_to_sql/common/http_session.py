@@ -0,0 +1,112 @@
+import threading
+from typing import Dict
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from .config import HTTPConfig
+
+_config = HTTPConfig()
+_sessions: Dict[str, requests.Session] = {}
+_async_clients: Dict[str, httpx.AsyncClient] = {}
+_lock = threading.Lock()
+
+
+def configure_http(config: HTTPConfig):
+    """
+    Sets the pool configuration used for sessions created from now on.
+
+    Call it before the first request (e.g. on application startup); existing
+    sessions keep their settings until they are closed.
+
+    :param config: HTTPConfig object with pool size, keep-alive and HTTP/2 settings.
+    """
+    global _config
+    _config = config
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def get_session(provider: str) -> requests.Session:
+    """
+    Returns the shared keep-alive session for a provider, creating it on first use.
+
+    :param provider: The provider name ('openai', 'deepseek', 'gemini').
+    :return: A requests.Session backed by a connection pool.
+    """
+    session = _sessions.get(provider)
+    if session is not None:
+        return session
+
+    with _lock:
+        session = _sessions.get(provider)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=_config.pool_size,
+                pool_maxsize=_config.pool_size,
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[provider] = session
+        return session
+
+
+def get_async_client(provider: str) -> httpx.AsyncClient:
+    """
+    Returns the shared async client for a provider, creating it on first use.
+
+    The client belongs to the event loop it is first used in; the application
+    runs a single loop, so one client per provider is enough.
+
+    :param provider: The provider name ('openai', 'deepseek', 'gemini').
+    :return: An httpx.AsyncClient backed by a connection pool.
+    """
+    client = _async_clients.get(provider)
+    if client is not None and not client.is_closed:
+        return client
+
+    with _lock:
+        client = _async_clients.get(provider)
+        if client is None or client.is_closed:
+            http2 = _config.http2 and _http2_available()
+            if _config.http2 and not http2:
+                print("Warning: HTTP/2 requested but the 'h2' package is not installed; using HTTP/1.1.")
+
+            client = httpx.AsyncClient(
+                http2=http2,
+                limits=httpx.Limits(
+                    max_connections=_config.max_connections,
+                    max_keepalive_connections=_config.pool_size,
+                    keepalive_expiry=_config.keepalive_expiry,
+                ),
+            )
+            _async_clients[provider] = client
+        return client
+
+
+def close_sessions():
+    """Closes all shared synchronous sessions."""
+    with _lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+
+    for session in sessions:
+        session.close()
+
+
+async def aclose_sessions():
+    """Closes all shared async clients."""
+    with _lock:
+        clients = list(_async_clients.values())
+        _async_clients.clear()
+
+    for client in clients:
+        await client.aclose()
@@ -0,0 +1,186 @@
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Iterable, Optional
+
+# Absolute deadline (time.monotonic()) of the request currently being served
+_deadline: ContextVar[Optional[float]] = ContextVar("text_to_sql_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a call cannot complete before the request deadline."""
+
+
+class RetryPolicy:
+    """
+    Bounded retry policy for API calls: capped attempts, exponential backoff with
+    full jitter, and honoring of the provider's Retry-After header.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 20.0,
+        jitter: bool = True,
+        retry_statuses: Iterable[int] = (408, 409, 425, 429, 500, 502, 503, 504),
+        max_retry_after: Optional[float] = None,
+    ):
+        """
+        Initializes the RetryPolicy object.
+
+        :param max_attempts: Total number of attempts, including the first one.
+        :param base_delay: Delay in seconds before the first retry.
+        :param max_delay: Upper bound in seconds for a single computed backoff delay.
+        :param jitter: Whether to draw each delay uniformly from [0, backoff] (full jitter).
+        :param retry_statuses: HTTP status codes that are worth retrying.
+        :param max_retry_after: Longest Retry-After in seconds worth waiting for; None
+            waits as long as the request deadline allows.
+        """
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1.")
+
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.retry_statuses = frozenset(retry_statuses)
+        self.max_retry_after = max_retry_after
+
+    def __repr__(self):
+        return (
+            f"RetryPolicy(max_attempts={self.max_attempts}, base_delay={self.base_delay}, "
+            f"max_delay={self.max_delay}, jitter={self.jitter}, "
+            f"max_retry_after={self.max_retry_after})"
+        )
+
+    def is_retryable(self, status_code: int) -> bool:
+        """Returns whether an HTTP status code should be retried."""
+        return status_code in self.retry_statuses
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Computes the delay before the next attempt.
+
+        :param attempt: Number of attempts made so far (1 after the first failure).
+        :param retry_after: Delay requested by the server, in seconds, if any. It is a
+            lower bound on the computed backoff: retrying sooner only earns another rejection.
+        :return: Delay in seconds.
+        """
+        delay = min(self.base_delay * (2 ** (attempt - 1)), self.max_delay)
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def next_delay(
+        self,
+        attempt: int,
+        error: Exception,
+        retry_after: Optional[float] = None,
+        deadline: Optional[float] = None,
+    ) -> float:
+        """
+        Decides whether to retry after a failed attempt.
+
+        :param attempt: Number of attempts made so far.
+        :param error: The error of the failed attempt, re-raised when giving up.
+        :param retry_after: Delay requested by the server, in seconds, if any.
+        :param deadline: Absolute deadline (time.monotonic()) of the call, if any.
+        :return: Delay in seconds before the next attempt.
+        :raises: The error itself when out of attempts or when the server asks to wait
+            longer than max_retry_after, DeadlineExceeded when the wait outlasts the deadline.
+        """
+        if attempt >= self.max_attempts:
+            raise error
+        if retry_after is not None and self.max_retry_after is not None and retry_after > self.max_retry_after:
+            raise error
+
+        delay = self.backoff(attempt, retry_after)
+        remaining = remaining_time(deadline)
+        if remaining is not None and remaining <= delay:
+            raise DeadlineExceeded(
+                f"Deadline exceeded after {attempt} attempt(s): {error}"
+            ) from error
+        return delay
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parses a Retry-After header given either in seconds or as an HTTP date.
+
+    :return: Delay in seconds, or None if the header is missing or invalid.
+    """
+    if not value:
+        return None
+
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(retry_at.timestamp() - time.time(), 0.0)
+
+
+def current_deadline() -> Optional[float]:
+    """Returns the absolute deadline (time.monotonic()) of the current request, if any."""
+    return _deadline.get()
+
+
+def remaining_time(deadline: Optional[float] = None) -> Optional[float]:
+    """
+    Returns the seconds left before a deadline.
+
+    :param deadline: Absolute deadline; defaults to the current request deadline.
+    :return: Remaining seconds, or None when there is no deadline.
+    """
+    deadline = deadline if deadline is not None else current_deadline()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def request_timeout(timeout: Optional[float], deadline: Optional[float] = None) -> Optional[float]:
+    """
+    Caps a per-request timeout by the time left before the deadline.
+
+    :raises DeadlineExceeded: If the deadline has already passed.
+    """
+    remaining = remaining_time(deadline)
+    if remaining is None:
+        return timeout
+    if remaining <= 0:
+        raise DeadlineExceeded("Deadline exceeded before the request was sent.")
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """
+    Sets a deadline for every API call made within the block, including calls made
+    from worker threads started with asyncio.to_thread. Nested scopes can only
+    shorten the deadline.
+
+    :param seconds: Time budget in seconds; None leaves the current deadline unchanged.
+    """
+    if seconds is None:
+        yield current_deadline()
+        return
+
+    deadline = time.monotonic() + seconds
+    outer = current_deadline()
+    if outer is not None:
+        deadline = min(deadline, outer)
+
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
@@ -1,8 +1,23 @@
 from .rewriter import RewriterPrompt
 from .query_generator import QueryGenerator
 from .schema_linker import SchemaLinker
+from .schema_renderer import SchemaRenderer, format_schema_context
 from .summarization import Summarization
 from .retrieve_context import RetrieveContext
+from .embedding import (
+    EmbeddingModelProvider,
+    SharedEncoder,
+    BatchingEncoder,
+    RemoteEncoder,
+    EmbeddingCache,
+    CachedEncoder,
+    embedding_provider,
+    parse_address,
+)
+from .embedding_service import serve_embeddings
+from .vector_index import VectorIndex, FlatIndex, IVFPQIndex, build_index
+from .example_store import ExampleStore
+from .bundle import ArtifactBundle, build_bundle, load_bundle
 from .query_executor import QueryExecutor
 from .evaluator import QueryEvaluator
-from .general_llm import GeneralLLM
\ No newline at end of file
+from .general_llm import GeneralLLM, AsyncGeneralLLM
@@ -37,7 +37,10 @@ class BaseLLM(ABC):
         if not self.config.model_path:
             raise ValueError("Model path must be provided for local models.")
         return LocalModel(
-            model_path=self.config.model_path, use_gpu=self.config.use_gpu
+            model_path=self.config.model_path,
+            use_gpu=self.config.use_gpu,
+            cache=self.config.cache,
+            cache_ttl=self.config.cache_ttl,
         )
 
     def _load_api_model(self) -> APIModel:
@@ -49,6 +52,10 @@ class BaseLLM(ABC):
             model=self.config.model,
             provider=self.config.provider,
             timeout=self.config.timeout,
+            retry_policy=self.config.retry_policy,
+            cache=self.config.cache,
+            cache_ttl=self.config.cache_ttl,
+            temperature=self.config.temperature,
         )
 
     def _load_system_prompt(self, system_prompt_path: Optional[str] = None) -> str:
@@ -63,7 +70,7 @@ class BaseLLM(ABC):
                 f"System prompt file not found at {system_prompt_path}."
             )
 
-        with open(system_prompt_path, "r") as file:
+        with open(system_prompt_path, encoding="utf-8") as file:
             return file.read().strip()
 
     @abstractmethod
@@ -0,0 +1,106 @@
+import threading
+from multiprocessing.connection import Connection, Listener
+from typing import Optional
+
+from sentence_transformers import SentenceTransformer
+
+from .embedding import (
+    EMBEDDING_MODEL,
+    Address,
+    BatchingEncoder,
+    SharedEncoder,
+    embedding_provider,
+    recv_message,
+    send_message,
+)
+
+
+def _handle(connection: Connection, encoder: BatchingEncoder):
+    """Serves encode requests from one client connection until it disconnects."""
+    try:
+        while True:
+            try:
+                request, _ = recv_message(connection)
+            except (EOFError, OSError):
+                return
+            except ValueError as e:
+                # Not a framed JSON request: drop the client rather than guess
+                print(f"Warning: Malformed embedding service request: {e}")
+                return
+
+            try:
+                if request.get("model") != encoder.model_name:
+                    raise ValueError(
+                        f"Service runs {encoder.model_name}, not {request.get('model')}."
+                    )
+                command = request.get("command")
+                if command == "encode":
+                    texts = request.get("texts")
+                    if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+                        raise ValueError("'texts' must be a list of strings.")
+                    send_message(connection, {"status": "ok"}, encoder.submit(texts).result())
+                elif command == "dimension":
+                    send_message(
+                        connection, {"status": "ok", "dimension": encoder.get_sentence_embedding_dimension()}
+                    )
+                else:
+                    raise ValueError(f"Unknown command '{command}'.")
+            except Exception as e:
+                send_message(connection, {"status": "error", "error": str(e)})
+    finally:
+        connection.close()
+
+
+def serve_embeddings(
+    address: Address,
+    authkey: Optional[bytes] = None,
+    model_name: str = EMBEDDING_MODEL,
+    max_batch_size: int = 64,
+    max_wait_ms: float = 5.0,
+    num_workers: int = 1,
+    num_threads: Optional[int] = None,
+):
+    """
+    Runs an embedding service holding the only copy of the model on this host.
+
+    Requests from every connected worker are merged into the same micro-batches.
+    Clients connect with RemoteEncoder, typically by configuring the provider
+    with embedding_provider.configure(service_address=...). Messages are JSON
+    requests and raw float32 responses (see send_message), never pickles.
+
+    :param address: Unix socket path or (host, port) to listen on.
+    :param authkey: Shared secret clients must present; required on a TCP address.
+    :param num_threads: Optional CPU thread budget for torch inference.
+    :raises ValueError: If a TCP address is given without an authkey.
+    """
+    if not isinstance(address, str) and not authkey:
+        raise ValueError(
+            f"Refusing to serve embeddings on TCP address {address} without an authkey; "
+            "set EMBEDDING_SERVICE_AUTHKEY or listen on a Unix socket."
+        )
+
+    if num_threads:
+        embedding_provider.set_thread_budget(num_threads)
+
+    encoder = BatchingEncoder(
+        SharedEncoder(model_name, SentenceTransformer(model_name)),
+        max_batch_size=max_batch_size,
+        max_wait_ms=max_wait_ms,
+        num_workers=num_workers,
+    )
+
+    with Listener(address, authkey=authkey) as listener:
+        print(f"Embedding service for {model_name} listening on {address}.")
+        while True:
+            try:
+                connection = listener.accept()
+            except KeyboardInterrupt:
+                break
+            except Exception as e:
+                print(f"Warning: Rejected embedding service connection: {e}")
+                continue
+            threading.Thread(
+                target=_handle, args=(connection, encoder), daemon=True
+            ).start()
+
+    encoder.close()
@@ -1,4 +1,6 @@
-from common import LLMConfig, APIModel, LocalModel
+import asyncio
+
+from common import LLMConfig, APIModel, AsyncAPIModel, LocalModel
 
 
 class GeneralLLM:
@@ -30,7 +32,10 @@ class GeneralLLM:
         if not self.config.model_path:
             raise ValueError("Model path must be provided for local models.")
         return LocalModel(
-            model_path=self.config.model_path, use_gpu=self.config.use_gpu
+            model_path=self.config.model_path,
+            use_gpu=self.config.use_gpu,
+            cache=self.config.cache,
+            cache_ttl=self.config.cache_ttl,
         )
 
     def _load_api_model(self) -> APIModel:
@@ -42,6 +47,10 @@ class GeneralLLM:
             model=self.config.model,
             provider=self.config.provider,
             timeout=self.config.timeout,
+            retry_policy=self.config.retry_policy,
+            cache=self.config.cache,
+            cache_ttl=self.config.cache_ttl,
+            temperature=self.config.temperature,
         )
 
     def generate(self, system_prompt: str, user_prompt: str) -> str:
@@ -56,3 +65,89 @@ class GeneralLLM:
             user_prompt=user_prompt,
         )
         return result.strip()
+
+    def stream(self, system_prompt: str, user_prompt: str):
+        """
+        Streams a response as text deltas.
+
+        Models without streaming support yield the full response as a single delta.
+
+        :param user_prompt: User's input prompt.
+        :return: Generator yielding text deltas.
+        """
+        if isinstance(self.model, APIModel):
+            yield from self.model.stream(
+                system_prompt=system_prompt,
+                user_prompt=user_prompt,
+            )
+        else:
+            yield self.model.generate(
+                system_prompt=system_prompt,
+                user_prompt=user_prompt,
+            )
+
+
+class AsyncGeneralLLM(GeneralLLM):
+    """
+    GeneralLLM whose ``generate`` is a coroutine.
+
+    API models use the non-blocking AsyncAPIModel; local models run in a worker
+    thread so the event loop is never blocked.
+    """
+
+    def _load_api_model(self) -> AsyncAPIModel:
+        """Loads a non-blocking API-based model if specified in the configuration."""
+        if not self.config.api_key:
+            raise ValueError("API key must be provided for API models.")
+        return AsyncAPIModel(
+            api_key=self.config.api_key,
+            model=self.config.model,
+            provider=self.config.provider,
+            timeout=self.config.timeout,
+            retry_policy=self.config.retry_policy,
+            cache=self.config.cache,
+            cache_ttl=self.config.cache_ttl,
+            temperature=self.config.temperature,
+        )
+
+    async def generate(self, system_prompt: str, user_prompt: str) -> str:
+        """
+        Generates a response without blocking the event loop.
+
+        :param user_prompt: User's input prompt.
+        :return: Model-generated response.
+        """
+        if isinstance(self.model, AsyncAPIModel):
+            result = await self.model.generate(
+                system_prompt=system_prompt,
+                user_prompt=user_prompt,
+            )
+        else:
+            result = await asyncio.to_thread(
+                self.model.generate,
+                system_prompt=system_prompt,
+                user_prompt=user_prompt,
+            )
+        return result.strip()
+
+    async def stream(self, system_prompt: str, user_prompt: str):
+        """
+        Streams a response as text deltas without blocking the event loop.
+
+        Local models yield the full response as a single delta.
+
+        :param user_prompt: User's input prompt.
+        :return: Async generator yielding text deltas.
+        """
+        if isinstance(self.model, AsyncAPIModel):
+            async for delta in self.model.stream(
+                system_prompt=system_prompt,
+                user_prompt=user_prompt,
+            ):
+                yield delta
+        else:
+            yield await asyncio.to_thread(
+                self.model.generate,
+                system_prompt=system_prompt,
+                user_prompt=user_prompt,
+            )
@@ -0,0 +1,121 @@
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, List, Set, Tuple
+
+import numpy as np
+
+
+class JoinGraph:
+    """
+    Foreign-key join graph of one database with all-pairs shortest join paths.
+
+    Paths are precomputed with one breadth-first search per table when the graph is
+    built. connect() returns a small connected subgraph for a set of linked tables,
+    using the shortest-path Steiner tree heuristic: starting from one table, the
+    closest remaining table is repeatedly attached to the tree along its shortest path.
+    """
+
+    def __init__(self, fk_graph: Dict[str, List[Dict[str, str]]], max_entries: int = 1024):
+        """
+        Builds the graph and its path tables.
+
+        :param fk_graph: Undirected adjacency as built by build_fk_graph.
+        :param max_entries: Number of connect() results to keep.
+        """
+        self.tables = sorted(set(fk_graph) | {e["table"] for edges in fk_graph.values() for e in edges})
+        self.index = {table: i for i, table in enumerate(self.tables)}
+        self.neighbours: List[List[int]] = [[] for _ in self.tables]
+        self.join_conditions: Dict[Tuple[str, str], str] = {}
+
+        for table, edges in fk_graph.items():
+            for edge in edges:
+                i, j = self.index[table], self.index[edge["table"]]
+                if j not in self.neighbours[i]:
+                    self.neighbours[i].append(j)
+                    self.neighbours[j].append(i)
+                if edge.get("join"):
+                    self.join_conditions.setdefault(tuple(sorted((table, edge["table"]))), edge["join"])
+
+        n = len(self.tables)
+        # distance[s, t] is the number of joins between s and t (-1 if unreachable) and
+        # parent[s, t] the table before t on a shortest path from s
+        self.distance = np.full((n, n), -1, dtype=np.int32)
+        self.parent = np.full((n, n), -1, dtype=np.int32)
+        for source in range(n):
+            self._bfs(source)
+
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _bfs(self, source: int):
+        distance, parent = self.distance[source], self.parent[source]
+        distance[source] = 0
+        queue = deque([source])
+        while queue:
+            node = queue.popleft()
+            for neighbour in sorted(self.neighbours[node]):
+                if distance[neighbour] < 0:
+                    distance[neighbour] = distance[node] + 1
+                    parent[neighbour] = node
+                    queue.append(neighbour)
+
+    def path(self, source: str, target: str) -> List[str]:
+        """
+        Shortest join path between two tables.
+
+        :return: Tables from source to target, or an empty list if they are not connected.
+        """
+        s, t = self.index[source], self.index[target]
+        if self.distance[s, t] < 0:
+            return []
+        path = [t]
+        while path[-1] != s:
+            path.append(self.parent[s, path[-1]])
+        return [self.tables[i] for i in reversed(path)]
+
+    def connect(self, tables: Iterable[str]) -> Set[str]:
+        """
+        Approximates the minimal set of tables that joins all the given tables.
+
+        Tables unknown to the graph are returned as is; tables in different connected
+        components are connected within their own component.
+
+        :return: The given tables plus the bridge tables needed to join them.
+        """
+        tables = frozenset(tables)
+        with self._lock:
+            if tables in self._cache:
+                self._cache.move_to_end(tables)
+                return set(self._cache[tables])
+
+        connected = set(tables)
+        remaining = sorted(self.index[t] for t in tables if t in self.index)
+        if remaining:
+            tree = [remaining.pop(0)]
+            while remaining:
+                distances = self.distance[np.ix_(tree, remaining)].astype(np.float64)
+                distances[distances < 0] = np.inf
+                row, column = np.unravel_index(np.argmin(distances), distances.shape)
+                target = remaining.pop(column)
+                if np.isinf(distances[row, column]):
+                    # Not reachable from the tree: start a new component from it
+                    tree.append(target)
+                    continue
+                for table in self.path(self.tables[tree[row]], self.tables[target]):
+                    if self.index[table] not in tree:
+                        tree.append(self.index[table])
+            connected |= {self.tables[i] for i in tree}
+
+        with self._lock:
+            self._cache[tables] = frozenset(connected)
+            if len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return connected
+
+    def joins(self, tables: Iterable[str]) -> List[str]:
+        """Join conditions of every foreign key between the given tables."""
+        tables = set(tables)
+        return sorted(
+            join for (a, b), join in self.join_conditions.items() if a in tables and b in tables
+        )
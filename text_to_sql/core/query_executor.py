@@ -1,28 +1,50 @@
-from contextlib import closing
+import threading
+from contextlib import closing, contextmanager
 
 import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
 
 
 class QueryExecutor:
     """
     A class for executing SQL queries using a configured PostgreSQL database connection.
+
+    Connections come from a thread-safe pool so concurrent requests on the same engine
+    run in parallel; connections dropped by the server are replaced transparently.
     """
 
     def __init__(self, config):
         """
-        Initializes the QueryExecutor with a database connection.
+        Initializes the QueryExecutor with a database connection pool.
 
         :param config: QueryConfig object containing database settings.
         """
         self.config = config
-        self.connection = psycopg2.connect(
+        self.pool = ThreadedConnectionPool(
+            self.config.min_connections,
+            self.config.max_connections,
             host=self.config.host,
             database=self.config.database,
             user=self.config.user,
             password=self.config.password,
             port=self.config.port,
         )
-        self.connection.autocommit = True
+        # ThreadedConnectionPool raises instead of waiting when exhausted
+        self._slots = threading.BoundedSemaphore(self.config.max_connections)
+
+    @contextmanager
+    def _connection(self):
+        """Leases a live connection from the pool, discarding it if it breaks meanwhile."""
+        with self._slots:
+            connection = self.pool.getconn()
+            try:
+                if connection.closed:
+                    self.pool.putconn(connection, close=True)
+                    connection = self.pool.getconn()
+                connection.autocommit = True
+                yield connection
+            finally:
+                self.pool.putconn(connection, close=bool(connection.closed))
 
     def execute_query(self, query: str, params: tuple = (), timeout: int = 5000) -> list[dict]:
         """
@@ -33,20 +55,26 @@ class QueryExecutor:
         :param timeout: Timeout in milliseconds for the SQL statement.
         :return: Query result as a list of dictionaries.
         """
-        with closing(self.connection.cursor()) as cursor:
-            try:
-                cursor.execute(f"SET statement_timeout = {timeout}")
-                cursor.execute(query, params) if params else cursor.execute(query)
+        for attempt in range(2):
+            with self._connection() as connection, closing(connection.cursor()) as cursor:
+                try:
+                    cursor.execute(f"SET statement_timeout = {timeout}")
+                    cursor.execute(query, params) if params else cursor.execute(query)
 
-                if cursor.description is None:
-                    return []
+                    if cursor.description is None:
+                        return []
 
-                columns = [desc[0] for desc in cursor.description]
-                return [dict(zip(columns, row)) for row in cursor.fetchall()]
-            except psycopg2.Error as e:
-                print(f"Error executing query: {e}")
-                raise
+                    columns = [desc[0] for desc in cursor.description]
+                    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+                except psycopg2.Error as e:
+                    # A connection dropped by a server restart or idle timeout is only noticed
+                    # on use; retry once on a fresh one instead of reporting a SQL error
+                    if connection.closed and attempt == 0:
+                        print(f"Warning: Database connection lost ({e}), reconnecting.")
+                        continue
+                    print(f"Error executing query: {e}")
+                    raise
 
     def close_connection(self):
-        """Closes the database connection."""
-        self.connection.close()
+        """Closes every pooled database connection."""
+        self.pool.closeall()
@@ -1,10 +1,77 @@
 from common import ContextConfig
-from typing import Dict, List, Any
-from sentence_transformers import SentenceTransformer, util
+from typing import Any, Dict, List, Optional
+from sentence_transformers import SentenceTransformer
 
+from .embedding import EMBEDDING_MODEL, CachedEncoder, embedding_provider
+from .vector_index import build_index, normalize_rows
+
+import numpy as np
 import pandas as pd
 import json
 import os
+import threading
+
+
+def load_examples(file_path: str) -> pd.DataFrame:
+    """
+    Loads an example dataset from a CSV, JSON, or TXT file.
+
+    :param file_path: Path to the dataset.
+    :return: DataFrame with at least the Question, Answer, and Summary columns.
+    """
+    file_ext = os.path.splitext(file_path)[-1].lower()
+
+    try:
+        if file_ext == ".csv":
+            df = pd.read_csv(file_path)
+        elif file_ext == ".json":
+            with open(file_path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+            df = pd.DataFrame(data)
+        elif file_ext == ".txt":
+            with open(file_path, "r", encoding="utf-8") as file:
+                lines = [line.strip().split("|") for line in file.readlines()]
+            df = pd.DataFrame(lines, columns=["Question", "Answer", "Summary"])
+        else:
+            raise ValueError("Unsupported file format. Use CSV, JSON, or TXT.")
+
+        if not {"Question", "Answer", "Summary"}.issubset(df.columns):
+            raise ValueError(
+                "File must contain 'Question', 'Answer', and 'Summary' columns."
+            )
+    except Exception as e:
+        raise ValueError(f"Error loading file: {e}")
+
+    return df
+
+
+def encode_texts(
+    model: SentenceTransformer,
+    texts: List[str],
+    batch_size: int = 64,
+    normalize_embeddings: bool = True,
+    cache: bool = False,
+) -> np.ndarray:
+    """
+    Encodes texts in batches into one contiguous, row-normalized float32 matrix.
+
+    :param cache: Go through the query-embedding cache; only for per-question texts,
+        so dataset and index builds do not evict the cached questions.
+    :return: (len(texts), D) matrix; empty texts give a (0, D) matrix.
+    """
+    if not cache and isinstance(model, CachedEncoder):
+        model = model.encoder
+    if not texts:
+        return np.empty((0, model.get_sentence_embedding_dimension()), dtype=np.float32)
+
+    embeddings = model.encode(
+        texts,
+        batch_size=batch_size,
+        convert_to_numpy=True,
+        normalize_embeddings=normalize_embeddings,
+        show_progress_bar=False,
+    )
+    return np.ascontiguousarray(normalize_rows(embeddings))
 
 
 class RetrieveContext:
@@ -12,48 +79,87 @@ class RetrieveContext:
     A class for performing vector search on local files (CSV, JSON, and TXT) containing Question, Answer, and Summary.
     """
 
-    def __init__(self, config: ContextConfig):
+    def __init__(self, config: ContextConfig, bundle=None):
         """
         Initializes the VectorSearch class by loading data and computing embeddings.
 
         :param config: ContextConfig object containing data path and model details.
+        :param bundle: Optional prebuilt ArtifactBundle holding the examples and their embeddings.
         """
         self.file_path = config.data_path
-        self.model = SentenceTransformer("all-MiniLM-L6-v2")
-        self._load_data()
-        self._generate_embeddings()
+        self.batch_size = config.batch_size
+        self.normalize_embeddings = config.normalize_embeddings
+        self.index_type = config.index_type
+        self.index_params = config.index_params
+        self.dedup_threshold = config.dedup_threshold
+        self.model = embedding_provider.acquire(EMBEDDING_MODEL)
+
+        if bundle is not None:
+            self.records = bundle.examples
+            self.embeddings = bundle.example_embeddings
+        else:
+            self._load_data()
+            self._generate_embeddings()
+
+        self.records = list(self.records)
+        params = dict(self.index_params)
+        if self.index_type == "flat":
+            params.setdefault("precision", config.embedding_precision)
+        self.index = build_index(self.embeddings, self.index_type, **params)
+        self._write_lock = threading.Lock()
 
     def _load_data(self):
         """Loads data from supported file formats (CSV, JSON, TXT)."""
-        file_ext = os.path.splitext(self.file_path)[-1].lower()
-
-        try:
-            if file_ext == ".csv":
-                self.df = pd.read_csv(self.file_path)
-            elif file_ext == ".json":
-                with open(self.file_path, "r", encoding="utf-8") as file:
-                    data = json.load(file)
-                self.df = pd.DataFrame(data)
-            elif file_ext == ".txt":
-                with open(self.file_path, "r", encoding="utf-8") as file:
-                    lines = [line.strip().split("|") for line in file.readlines()]
-                self.df = pd.DataFrame(lines, columns=["Question", "Answer", "Summary"])
-            else:
-                raise ValueError("Unsupported file format. Use CSV, JSON, or TXT.")
-
-            if not {"Question", "Answer", "Summary"}.issubset(self.df.columns):
-                raise ValueError(
-                    "File must contain 'Question', 'Answer', and 'Summary' columns."
-                )
-        except Exception as e:
-            raise ValueError(f"Error loading file: {e}")
+        self.df = load_examples(self.file_path)
 
     def _generate_embeddings(self):
-        """Precomputes embeddings for the questions in the dataset."""
-        self.df["embedding"] = self.df["Question"].apply(
-            lambda q: self.model.encode(q, convert_to_tensor=True)
+        """Precomputes normalized embeddings for the questions in the dataset as one matrix, in batches."""
+        self.records = self.df[["Question", "Answer", "Summary"]].to_dict(orient="records")
+        self.embeddings = encode_texts(
+            self.model,
+            self.df["Question"].astype(str).tolist(),
+            batch_size=self.batch_size,
+            normalize_embeddings=self.normalize_embeddings,
+        )
+
+    def close(self):
+        """Releases the shared embedding model."""
+        if self.model is not None:
+            embedding_provider.release(self.model)
+            self.model = None
+
+    def add_example(
+        self,
+        question: str,
+        answer: str,
+        summary: str,
+        dedup_threshold: Optional[float] = None,
+    ) -> bool:
+        """
+        Adds one example to the live index, embedding only the new question.
+
+        :param dedup_threshold: Skip the example if a stored question is at least this similar;
+            defaults to the configured threshold.
+        :return: Whether the example was added.
+        """
+        if dedup_threshold is None:
+            dedup_threshold = self.dedup_threshold
+        embedding = normalize_rows(
+            self.model.encode(
+                question, convert_to_numpy=True, normalize_embeddings=self.normalize_embeddings
+            )
         )
 
+        with self._write_lock:
+            _, scores = self.index.search(embedding, 1)
+            if len(scores) and scores[0] >= dedup_threshold:
+                return False
+
+            # Record first, so concurrent searches never see an id without its record
+            self.records.append({"Question": question, "Answer": answer, "Summary": summary})
+            self.index.add(embedding[None, :])
+        return True
+
     def search(self, query: str, top_n: int = 1) -> List[Dict[str, Any]]:
         """
         Finds the top N most similar questions to the query and returns their answers and summaries.
@@ -62,19 +168,13 @@ class RetrieveContext:
         :param top_n: Number of top similar results to return.
         :return: List of dictionaries containing Question, Answer, and Summary for the top matches.
         """
-        query_embedding = self.model.encode(query, convert_to_tensor=True)
-
-        similarities = [
-            util.pytorch_cos_sim(query_embedding, emb).item()
-            for emb in self.df["embedding"]
-        ]
-
-        self.df["similarity"] = similarities
-        top_results = self.df.nlargest(top_n, "similarity")[
-            ["Question", "Answer", "Summary", "similarity"]
-        ]
-
-        return top_results.drop(columns=["similarity"]).to_dict(orient="records")
+        query_embedding = normalize_rows(
+            self.model.encode(
+                query, convert_to_numpy=True, normalize_embeddings=self.normalize_embeddings
+            )
+        )
+        indices, _ = self.index.search(query_embedding, top_n)
+        return [dict(self.records[i]) for i in indices]
 
     def generate(self, user_prompt: str) -> Dict[str, Any]:
         """
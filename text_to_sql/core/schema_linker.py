@@ -1,9 +1,91 @@
-import json, ast
+import json, ast, re
 from common import SLConfig
 from .base_llm import BaseLLM
-from typing import Dict, List, Any, Set
-from sentence_transformers import SentenceTransformer, util
-from collections import defaultdict
+from typing import Dict, List, Any, Optional, Set, Tuple
+
+import numpy as np
+
+from .embedding import EMBEDDING_MODEL, embedding_provider
+from .entity_extractor import LocalEntityExtractor
+from .join_graph import JoinGraph
+from .retrieve_context import encode_texts
+from .schema_renderer import SchemaRenderer, key_columns
+from .vector_index import FlatIndex
+
+
+def build_knowledge_base(database_structure: Dict[str, Any]) -> Dict[str, str]:
+    """Renders one descriptive text per table, used to embed and prompt the schema."""
+    knowledge_base_mapping = {}
+    for table in database_structure.get("tables", []):
+        lines = [f"Table: {table['name']} - {table.get('description', 'No description')}", "Columns:"]
+        for column in table.get("columns", []):
+            column_desc = (
+                f"- {column['name']} ({column['type']}, "
+                f"{'NULLABLE' if column.get('nullable') else 'NOT NULL'}, "
+                f"{', '.join(column.get('attributes', [])) if column.get('attributes') else 'No attributes'}): "
+                f"{column.get('description', 'No description')}"
+            )
+            lines.append(column_desc)
+        knowledge_base_mapping[table["name"]] = "\n".join(lines)
+    return knowledge_base_mapping
+
+
+def build_column_texts(database_structure: Dict[str, Any]) -> Tuple[List[List[str]], List[str]]:
+    """
+    Renders one short text per column, grouped by table in metadata order, for the column index.
+
+    :return: The [table, column] pairs and their texts.
+    """
+    columns, texts = [], []
+    for table in database_structure.get("tables", []):
+        for column in table.get("columns", []):
+            columns.append([table["name"], column["name"]])
+            texts.append(
+                f"{table['name']}.{column['name']} ({column['type']}): "
+                f"{column.get('description', 'No description')}"
+            )
+    return columns, texts
+
+
+def build_fk_graph(database_structure: Dict[str, Any]) -> Dict[str, List[Dict[str, str]]]:
+    """
+    Builds the undirected foreign-key graph of the schema.
+
+    :return: Mapping of table name to its neighbours, each with the table and join condition.
+    """
+    graph = {table["name"]: [] for table in database_structure.get("tables", [])}
+    for table in database_structure.get("tables", []):
+        for relation in table.get("relations", []):
+            for source, target in (
+                (table["name"], relation["foreign_table"]),
+                (relation["foreign_table"], table["name"]),
+            ):
+                neighbours = graph.setdefault(source, [])
+                if all(edge["table"] != target for edge in neighbours):
+                    neighbours.append({"table": target, "join": relation.get("join", "")})
+    return graph
+
+
+CONSTRAINT_KEYWORDS = {"PRIMARY", "FOREIGN", "CONSTRAINT", "UNIQUE", "CHECK"}
+
+CREATE_TABLE_PATTERN = re.compile(
+    r'CREATE TABLE\s+(?:\w+\.)?("?)(\w+)\1\s*\((.*?)\n\);', re.DOTALL | re.IGNORECASE
+)
+
+
+def parse_create_tables(schema: str) -> Dict[str, List[str]]:
+    """
+    Extracts the column definitions of every CREATE TABLE statement in a schema dump.
+
+    :return: Mapping of table name (folded to lower case unless quoted) to its column
+        definition lines, without comments or trailing commas.
+    """
+    tables = {}
+    for match in CREATE_TABLE_PATTERN.finditer(schema):
+        quoted, name, body = match.groups()
+        lines = (re.sub(r"\s*--.*$", "", line).strip().rstrip(",") for line in body.splitlines())
+        tables[name if quoted else name.lower()] = [line for line in lines if line]
+    return tables
 
 
 class SchemaLinker(BaseLLM):
@@ -11,18 +93,54 @@ class SchemaLinker(BaseLLM):
     A specialized LLM for linking schemas to user queries and generating structured representations.
     """
 
-    def __init__(self, config: SLConfig):
+    def __init__(self, config: SLConfig, bundle=None):
         super().__init__(
             config=config, system_prompt_path="files/prompt/schema_linker_system_prompt.txt"
         )
         self.schema_path = config.schema_path
         self.metadata_path = config.metadata_path
-        self.embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
+        self.embedding_precision = config.embedding_precision
+        self.schema_mode = config.schema_mode
+        self.min_link_confidence = config.min_link_confidence
+        self.schema_format = config.schema_format
+        self.linker_mode = config.linker_mode
+        self.local_confidence = config.local_confidence
+        self.column_pooling = config.column_pooling
+        self.max_columns = config.max_columns
+        self.column_index = None
+        self._schema_context = None
+        self.embedding_model = embedding_provider.acquire(EMBEDDING_MODEL)
+
+        if bundle is not None:
+            self._load_bundle(bundle)
+        else:
+            if self.metadata_path:
+                self._load_metadata()
+            if self.schema_path:
+                self._load_schema()
+
+        if self.schema_format != "raw":
+            self.schema = self.schema_renderer.render(self.schema_format)
 
-        if self.metadata_path:
-            self._load_metadata()
-        if self.schema_path:
-            self._load_schema()
+        self.entity_extractor = None
+        if self.linker_mode != "llm":
+            self.entity_extractor = LocalEntityExtractor(self.metadata, encoder=self.embedding_model)
+
+    def _load_bundle(self, bundle):
+        """Takes the schema, knowledge base and table embeddings from a prebuilt ArtifactBundle."""
+        self.schema = bundle.schema
+        self.table_ddl = parse_create_tables(self.schema)
+        self.metadata = bundle.metadata
+        self.database = self.metadata.get("database", "Unknown Database")
+        self.tables = {table["name"]: table for table in self.metadata.get("tables", [])}
+        self.schema_renderer = SchemaRenderer(self.metadata)
+        self.knowledge_base = bundle.knowledge_base
+        self.fk_graph = bundle.fk_graph
+        self.join_graph = JoinGraph(self.fk_graph)
+        self.table_names = bundle.table_names
+        self._build_table_index(bundle.table_embeddings)
+        if self.column_pooling != "none" or self.max_columns:
+            self._build_column_index(bundle.columns, bundle.column_embeddings)
 
     def _load_schema(self):
         try:
@@ -31,6 +149,7 @@ class SchemaLinker(BaseLLM):
                 if not content:
                     raise ValueError(f"Schema file at {self.schema_path} is empty.")
                 self.schema = content
+                self.table_ddl = parse_create_tables(content)
         except FileNotFoundError as e:
             raise ValueError(f"Error loading schema from {self.schema_path}: {e}")
 
@@ -43,36 +162,127 @@ class SchemaLinker(BaseLLM):
 
         self.database = self.metadata.get("database", "Unknown Database")
         self.tables = {table["name"]: table for table in self.metadata.get("tables", [])}
+        self.schema_renderer = SchemaRenderer(self.metadata)
         self.knowledge_base = self.generate_knowledge_base_text(self.metadata)
+        self.fk_graph = build_fk_graph(self.metadata)
+        self.join_graph = JoinGraph(self.fk_graph)
         self.table_embeddings = self._generate_table_embeddings()
+        if self.column_pooling != "none" or self.max_columns:
+            columns, texts = build_column_texts(self.metadata)
+            self._build_column_index(columns, encode_texts(self.embedding_model, texts))
 
     def _generate_table_embeddings(self) -> Dict[str, Any]:
         if hasattr(self, "table_embeddings") and self.table_embeddings:
             return self.table_embeddings
 
-        table_embeddings = {}
-        for table_name, knowledge_text in self.knowledge_base.items():
-            table_embeddings[table_name] = self.embedding_model.encode(
-                knowledge_text, convert_to_tensor=True
-            )
+        self.table_names = list(self.knowledge_base.keys())
+        self._build_table_index(
+            encode_texts(self.embedding_model, list(self.knowledge_base.values()))
+        )
+        return self.table_embeddings
+
+    def _build_table_index(self, table_matrix):
+        """Stores the table embeddings at the configured precision."""
+        self.table_index = FlatIndex(table_matrix, precision=self.embedding_precision)
+        self.table_embeddings = dict(zip(self.table_names, self.table_index.vectors))
+
+    def _build_column_index(self, columns: List[List[str]], column_matrix):
+        """Stores one embedding per column, grouped by table, at the configured precision."""
+        table_ids = {table: i for i, table in enumerate(self.table_names)}
+        self.columns = [tuple(column) for column in columns]
+        if not self.columns:
+            return
+
+        column_tables = np.array([table_ids[table] for table, _ in self.columns])
+        counts = np.bincount(column_tables, minlength=len(self.table_names))
+        # Columns are contiguous per table, so each table with columns pools one slice
+        self._pooled_tables = np.flatnonzero(counts)
+        self._column_starts = np.searchsorted(column_tables, self._pooled_tables)
+        self._column_counts = counts[self._pooled_tables]
+        self.column_index = FlatIndex(column_matrix, precision=self.embedding_precision)
+
+    def _entity_scores(self, entities: List[str]) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Scores every entity against every table, and every column when the column index
+        is enabled, with one matrix product each. With column pooling, the table score is
+        the mean of the table-level score and the pooled column score.
+
+        :return: (E, T) table scores and (E, C) column scores, or None without a column index.
+        """
+        entity_matrix = encode_texts(self.embedding_model, entities, cache=True)
+        table_scores = self.table_index.scores(entity_matrix)
+        if self.column_index is None:
+            return table_scores, None
+
+        column_scores = self.column_index.scores(entity_matrix)
+        if self.column_pooling != "none":
+            pooled = table_scores.copy()
+            if self.column_pooling == "max":
+                pooled[:, self._pooled_tables] = np.maximum.reduceat(column_scores, self._column_starts, axis=1)
+            else:
+                sums = np.add.reduceat(column_scores, self._column_starts, axis=1)
+                pooled[:, self._pooled_tables] = sums / self._column_counts
+            table_scores = (table_scores + pooled) / 2
+        return table_scores, column_scores
+
+    def _rank_columns(self, column_scores: np.ndarray, tables: Set[str]) -> Dict[str, List[str]]:
+        """Columns of each given table, ordered by their best similarity to any entity."""
+        ranked = {table: [] for table in sorted(tables)}
+        for i in np.argsort(-column_scores.max(axis=0), kind="stable"):
+            table, column = self.columns[i]
+            if table in ranked:
+                ranked[table].append(column)
+        return ranked
+
+    def _rank_tables(self, entity_scores: np.ndarray) -> List[Tuple[str, float]]:
+        """
+        Sums the entity scores per table and ranks the tables.
+
+        :return: (table, summed cosine similarity over entities) pairs, best first.
+        """
+        table_scores = entity_scores.sum(axis=0)
+        ranking = np.argsort(-table_scores, kind="stable")
+        return [(self.table_names[i], float(table_scores[i])) for i in ranking]
+
+    def _score_tables(self, entities: List[str]) -> List[Tuple[str, float]]:
+        """Ranks the tables by their summed similarity to the entities."""
+        return self._rank_tables(self._entity_scores(entities)[0])
+
+    def prune_schema(self, tables: Set[str], columns: Optional[Dict[str, List[str]]] = None) -> str:
+        """
+        Renders only the given tables, either as DDL from the schema file followed by
+        their join conditions, or in the configured metadata format.
 
-        self.table_embeddings = table_embeddings
-        return table_embeddings
+        :param tables: Linked tables together with the bridge tables that join them.
+        :param columns: Optional mapping of table to the columns to keep besides its keys.
+        """
+        if self.schema_format != "raw":
+            return self.schema_renderer.render(self.schema_format, tables, columns=columns)
+
+        blocks = []
+        for table in sorted(tables):
+            lines = self.table_ddl[table]
+            if columns and table in columns:
+                keep = {c.lower() for c in columns[table]}
+                keep |= {c.lower() for c in key_columns(self.tables.get(table, {}))}
+                lines = [
+                    line for line in lines
+                    if line.split()[0].strip('"').lower() in keep or line.split()[0].upper() in CONSTRAINT_KEYWORDS
+                ]
+            blocks.append(f"CREATE TABLE {table} (\n" + ",\n".join(lines) + "\n);")
+        joins = self.join_graph.joins(tables)
+        if joins:
+            blocks.append("-- Joins:\n" + "\n".join(f"-- {join}" for join in joins))
+        return "\n\n".join(blocks)
+
+    def close(self):
+        """Releases the shared embedding model."""
+        if self.embedding_model is not None:
+            embedding_provider.release(self.embedding_model)
+            self.embedding_model = None
 
     def generate_knowledge_base_text(self, database_structure: Dict[str, Any]) -> Dict[str, str]:
-        knowledge_base_mapping = {}
-        for table in database_structure.get("tables", []):
-            lines = [f"Table: {table['name']} - {table.get('description', 'No description')}", "Columns:"]
-            for column in table.get("columns", []):
-                column_desc = (
-                    f"- {column['name']} ({column['type']}, "
-                    f"{'NULLABLE' if column.get('nullable') else 'NOT NULL'}, "
-                    f"{', '.join(column.get('attributes', [])) if column.get('attributes') else 'No attributes'}): "
-                    f"{column.get('description', 'No description')}"
-                )
-                lines.append(column_desc)
-            knowledge_base_mapping[table["name"]] = "\n".join(lines)
-        return knowledge_base_mapping
+        return build_knowledge_base(database_structure)
 
     def get_related_tables(self, table_list: List[str]) -> Set[str]:
         related_tables = set()
@@ -84,6 +294,10 @@ class SchemaLinker(BaseLLM):
                     related_tables.add(foreign_table)
         return related_tables
 
+    def get_bridge_tables(self, table_list: List[str]) -> Set[str]:
+        """Bridge tables on the shortest join paths connecting the given tables."""
+        return self.join_graph.connect(table_list) - set(table_list)
+
     def generate(self, user_prompt: str, filter: bool = False) -> Dict[str, Any]:
         if not filter:
             return {
@@ -93,8 +307,7 @@ class SchemaLinker(BaseLLM):
         if not user_prompt or not isinstance(user_prompt, str):
             raise ValueError("User prompt cannot be empty and must be a string.")
 
-        enriched_prompt = self._generate_schema_aware_prompt(user_prompt)
-        entities = self.predict_entities(enriched_prompt)
+        entities = self.extract_entities(user_prompt)
         print(f"Entities: {entities}")
 
         if not entities:
@@ -109,16 +322,9 @@ class SchemaLinker(BaseLLM):
                 "hints_detail": {}
             }
 
-        entity_embeddings = self.embedding_model.encode(entities, convert_to_tensor=True)
-        print(f"Entity Embeddings: {entity_embeddings}")
-        table_scores = defaultdict(float)
-
-        for entity_emb in entity_embeddings:
-            for table_name, table_emb in self.table_embeddings.items():
-                score = util.pytorch_cos_sim(entity_emb, table_emb).item()
-                table_scores[table_name] += score
-
-        sorted_tables_scores = sorted(table_scores.items(), key=lambda x: x[1], reverse=True)
+        entity_scores, column_scores = self._entity_scores(entities)
+        sorted_tables_scores = self._rank_tables(entity_scores)
+        table_scores = dict(sorted_tables_scores)
         print(f"Similarity Scores: {sorted_tables_scores}")
 
         top_k = len(entities)
@@ -137,6 +343,46 @@ class SchemaLinker(BaseLLM):
             "The following tables might be relevant to the user's question: "
             + ", ".join(sorted(related_tables))
         )
+        ranked_columns = None
+        if column_scores is not None:
+            ranked_columns = self._rank_columns(column_scores, related_tables)
+
+        if self.schema_mode == "pruned":
+            # Mean over entities of the similarity to their best-matching table
+            confidence = float(entity_scores.max(axis=1).mean())
+            linked_tables = set(top_tables).union(self.get_bridge_tables(top_tables))
+            available = self.table_ddl if self.schema_format == "raw" else self.tables
+            missing = [t for t in linked_tables if t not in available]
+            if confidence >= self.min_link_confidence and not missing:
+                linked_columns = None
+                if column_scores is not None:
+                    linked_columns = self._rank_columns(column_scores, linked_tables)
+                columns = None
+                if self.max_columns and linked_columns:
+                    columns = {t: c[: self.max_columns] for t, c in linked_columns.items()}
+                return {
+                    "schema": self.prune_schema(linked_tables, columns),
+                    "hint": (
+                        "The following tables might be relevant to the user's question: "
+                        + ", ".join(sorted(linked_tables))
+                    ),
+                    "usage_note": (
+                        "The schema above only contains the tables linked to the user's question "
+                        "and the tables needed to join them. "
+                        "Only use tables and columns listed in it."
+                    ),
+                    "potential_related_tables": sorted(list(linked_tables)),
+                    "hints_detail": {
+                        t: round(table_scores[t], 4) for t in sorted(linked_tables) if t in table_scores
+                    },
+                    "ranked_columns": linked_columns,
+                }
+            print(
+                f"Warning: Schema linking confidence {confidence:.3f}"
+                + (f" with tables missing from the schema {sorted(missing)}" if missing else "")
+                + "; falling back to the full schema."
+            )
+
         usage_note = (
             "Use the full schema above to answer the user's question. "
             "The hint lists some tables that may be relevant based on prior analysis, "
@@ -149,11 +395,28 @@ class SchemaLinker(BaseLLM):
             "usage_note": usage_note,
             "potential_related_tables": sorted(list(related_tables)),
             "hints_detail": hints_detail,
+            "ranked_columns": ranked_columns,
         }
 
     def _generate_schema_aware_prompt(self, user_prompt: str) -> str:
-        schema_context = "\n\n".join(self.knowledge_base.values())
-        return f"Schema Context:\n{schema_context}\n\nUser Query: {user_prompt}"
+        if self._schema_context is None:
+            self._schema_context = "\n\n".join(self.knowledge_base.values())
+        return f"Schema Context:\n{self._schema_context}\n\nUser Query: {user_prompt}"
+
+    def extract_entities(self, user_prompt: str) -> List[str]:
+        """
+        Extracts the schema entities of a prompt according to the linker mode.
+
+        The local extractor needs no LLM call; in cascade mode the LLM is only asked
+        when the local extractor finds nothing or its confidence is low.
+        """
+        if self.entity_extractor is not None:
+            entities, confidence = self.entity_extractor.extract(user_prompt)
+            if self.linker_mode == "local" or (entities and confidence >= self.local_confidence):
+                return entities
+            print(f"Local entity confidence {confidence:.3f} is low; asking the LLM.")
+
+        return self.predict_entities(self._generate_schema_aware_prompt(user_prompt))
 
     def predict_entities(self, enriched_prompt: str) -> List[str]:
         try:
@@ -173,13 +436,4 @@ class SchemaLinker(BaseLLM):
             return set(self.tables.keys())
 
         top_k = len(entities)
-        entity_embeddings = self.embedding_model.encode(entities, convert_to_tensor=True)
-        table_scores = defaultdict(float)
-
-        for entity_emb in entity_embeddings:
-            for table_name, table_emb in self.table_embeddings.items():
-                score = util.pytorch_cos_sim(entity_emb, table_emb).item()
-                table_scores[table_name] += score
-
-        sorted_tables = sorted(table_scores.items(), key=lambda x: x[1], reverse=True)
-        return {table for table, _ in sorted_tables[:top_k]}
+        return {table for table, _ in self._score_tables(entities)[:top_k]}
@@ -0,0 +1,175 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+SCHEMA_FORMATS = ("ddl", "compact", "typed")
+
+
+def format_reference(references: Any) -> str:
+    """Renders a column reference, given as {"table", "column"} or "table(column)", as table.column."""
+    if isinstance(references, dict):
+        return f"{references.get('table')}.{references.get('column')}"
+    match = re.fullmatch(r"\s*(\w+)\s*\(\s*(\w+)\s*\)\s*", str(references))
+    return f"{match.group(1)}.{match.group(2)}" if match else str(references)
+
+
+def primary_key(table: Dict[str, Any]) -> List[str]:
+    """Names of the primary-key columns of a metadata table, in column order."""
+    return [
+        column["name"]
+        for column in table.get("columns", [])
+        if "PRIMARY KEY" in (column.get("attributes") or [])
+    ]
+
+
+def key_columns(table: Dict[str, Any]) -> Set[str]:
+    """Names of the primary-key and foreign-key columns of a metadata table."""
+    return {
+        column["name"]
+        for column in table.get("columns", [])
+        if column.get("references") or "PRIMARY KEY" in (column.get("attributes") or [])
+    }
+
+
+def format_schema_context(schema: Dict[str, Any]) -> str:
+    """
+    Lays out the schema linker output as prompt text: the schema followed by the
+    hint and usage note, without the escaped newlines of a JSON dump.
+    """
+    parts = [schema.get("schema", "")]
+    if schema.get("hint"):
+        parts.append(f"Hint: {schema['hint']}")
+    if schema.get("hints_detail"):
+        parts.append(
+            "Table relevance: "
+            + ", ".join(f"{table} {score}" for table, score in schema["hints_detail"].items())
+        )
+    if schema.get("usage_note"):
+        parts.append(f"Note: {schema['usage_note']}")
+    return "\n\n".join(parts)
+
+
+class SchemaRenderer:
+    """
+    Serializes a database schema from its metadata JSON in a compact prompt format.
+
+    Formats:
+        ddl      CREATE TABLE statements with types, keys and references, no defaults.
+        compact  One line per table with column names, PK markers and FK arrows;
+                 composite keys are annotated once as PK(a, b).
+        typed    Like compact, with the column types.
+
+    Rendered strings are memoized per (format, table subset, column subset).
+    """
+
+    def __init__(self, metadata: Dict[str, Any], max_entries: int = 256):
+        """
+        Initializes the renderer.
+
+        :param metadata: Parsed files/metadata/<database>.json.
+        :param max_entries: Number of rendered strings to keep.
+        """
+        self.database = metadata.get("database", "Unknown Database")
+        self.tables = {table["name"]: table for table in metadata.get("tables", [])}
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def render(
+        self,
+        format: str = "ddl",
+        tables: Optional[Iterable[str]] = None,
+        key_only: Iterable[str] = (),
+        columns: Optional[Dict[str, Iterable[str]]] = None,
+    ) -> str:
+        """
+        Renders the schema, or a subset of it.
+
+        :param format: One of SCHEMA_FORMATS.
+        :param tables: Tables rendered with all columns; all tables if not given.
+        :param key_only: Further tables rendered with only their primary and foreign keys.
+        :param columns: Optional mapping of table to the columns to keep, in addition to its keys.
+        :return: The serialized schema.
+        """
+        if format not in SCHEMA_FORMATS:
+            raise ValueError(f"Unknown schema format '{format}'. Expected one of {SCHEMA_FORMATS}.")
+
+        tables = frozenset(self.tables if tables is None else tables)
+        key_only = frozenset(key_only) - tables
+        columns = frozenset((t, frozenset(c)) for t, c in columns.items()) if columns else None
+        key = (format, tables, key_only, columns)
+
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        render_table = getattr(self, f"_render_{format}")
+        separator = "\n\n" if format == "ddl" else "\n"
+        # Keep the metadata order so the same subset always renders identically
+        keep = dict(columns) if columns else {}
+        rendered = separator.join(
+            render_table(table, self._columns(table, name in key_only, keep.get(name)))
+            for name, table in self.tables.items()
+            if name in tables or name in key_only
+        )
+
+        with self._lock:
+            self._cache[key] = rendered
+            if len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return rendered
+
+    @staticmethod
+    def _columns(
+        table: Dict[str, Any], key_only: bool, keep: Optional[Iterable[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Columns of a table to render, in metadata order; keys are always kept."""
+        columns = table.get("columns", [])
+        if key_only or keep is not None:
+            allowed = key_columns(table) | (set() if key_only else set(keep))
+            columns = [column for column in columns if column["name"] in allowed]
+        return columns
+
+    def _render_ddl(self, table: Dict[str, Any], columns: List[Dict[str, Any]]) -> str:
+        # A composite key is one table-level constraint, not a PRIMARY KEY per column
+        key = primary_key(table)
+        composite = key if len(key) > 1 else []
+        lines = []
+        for column in columns:
+            # Defaults and sequences do not help query generation
+            attributes = [a for a in column.get("attributes") or [] if not a.upper().startswith("DEFAULT")]
+            if composite:
+                attributes = [a for a in attributes if a != "PRIMARY KEY"]
+            if column.get("nullable") is False and "PRIMARY KEY" not in attributes:
+                attributes.append("NOT NULL")
+            if column.get("references"):
+                table_name, _, column_name = format_reference(column["references"]).partition(".")
+                attributes.append(f"REFERENCES {table_name}({column_name})")
+            lines.append(" ".join([column["name"], column["type"], *attributes]))
+        if composite:
+            lines.append(f"PRIMARY KEY ({', '.join(composite)})")
+        return f"CREATE TABLE {table['name']} (\n" + ",\n".join(lines) + "\n);"
+
+    def _render_line(self, table: Dict[str, Any], columns: List[Dict[str, Any]], typed: bool) -> str:
+        key = primary_key(table)
+        rendered = []
+        for column in columns:
+            parts = [column["name"]]
+            if typed:
+                parts.append(column["type"])
+            if len(key) == 1 and column["name"] in key:
+                parts.append("PK")
+            if column.get("references"):
+                parts.append(f"-> {format_reference(column['references'])}")
+            rendered.append(" ".join(parts))
+        if len(key) > 1:
+            rendered.append(f"PK({', '.join(key)})")
+        return f"{table['name']}({', '.join(rendered)})"
+
+    def _render_compact(self, table: Dict[str, Any], columns: List[Dict[str, Any]]) -> str:
+        return self._render_line(table, columns, typed=False)
+
+    def _render_typed(self, table: Dict[str, Any], columns: List[Dict[str, Any]]) -> str:
+        return self._render_line(table, columns, typed=True)
@@ -11,6 +11,9 @@ from core import (
     RetrieveContext,
     QueryExecutor,
     QueryEvaluator,
+    load_bundle,
+    embedding_provider,
+    format_schema_context,
 )
 
 
@@ -26,11 +29,29 @@ class TextToSQL:
         """Load core modules for text-to-SQL pipeline."""
         self.rewriter = RewriterPrompt(config=self.config.rewriter_config)
         self.query_generator = QueryGenerator(config=self.config.query_generator_config)
-        self.schema_linker = SchemaLinker(config=self.config.schema_linker_config)
-        self.retrieve_context = RetrieveContext(config=self.config.retrieve_context_config)
+        # Held for the engine's lifetime so the shared encoder is not reloaded between modules
+        self.embedding_model = embedding_provider.acquire()
+        bundle = self._load_bundle()
+        self.schema_linker = SchemaLinker(config=self.config.schema_linker_config, bundle=bundle)
+        self.retrieve_context = RetrieveContext(
+            config=self.config.retrieve_context_config, bundle=bundle
+        )
         self.query_executor = QueryExecutor(config=self.config.query_executor_config)
         self.evaluator = QueryEvaluator()
 
+    def _load_bundle(self):
+        """Load the precomputed artifact bundle if one is configured."""
+        if not self.config.bundle_dir:
+            return None
+        return load_bundle(
+            self.config.bundle_dir,
+            schema_path=self.config.schema_linker_config.schema_path,
+            metadata_path=self.config.schema_linker_config.metadata_path,
+            data_path=self.config.retrieve_context_config.data_path,
+            encoder=self.embedding_model,
+            batch_size=self.config.retrieve_context_config.batch_size,
+        )
+
     def generate_baseline(self, user_prompt: str) -> str:
         """Generate baseline SQL query without context, rewriter, or error handling."""
         schema = self.schema_linker.generate(user_prompt=user_prompt)
@@ -92,7 +113,7 @@ class TextToSQL:
         step_split_prompt = (
             f"You are given a complex natural language question about a database.\n"
             f"Your task is to break this question into a series of step-by-step sub-questions that build towards the final answer.\n\n"
-            f"Database Schema:\n{schema}\n\n"
+            f"Database Schema:\n{format_schema_context(schema)}\n\n"
             f"{user_prompt}\nReturn a list of step-by-step sub-questions."
         )
 
@@ -127,7 +148,7 @@ class TextToSQL:
         step_split_prompt = (
             f"You are given a complex natural language question about a database.\n"
             f"Your task is to break this question into a series of step-by-step sub-questions that build towards the final answer.\n\n"
-            f"Database Schema:\n{schema}\n\n"
+            f"Database Schema:\n{format_schema_context(schema)}\n\n"
             f"{user_prompt}\nReturn a list of step-by-step sub-questions."
         )
 
@@ -239,6 +260,17 @@ class TextToSQL:
         except Exception as e:
             return {"error": str(e)}
 
+    def add_example(self, question: str, answer: str, summary: str) -> bool:
+        """Add an accepted example to the live retrieval index without re-embedding the dataset."""
+        return self.retrieve_context.add_example(question, answer, summary)
+
+    def close(self):
+        """Release resources held by the engine, such as the database connection and shared embedding model."""
+        self.query_executor.close_connection()
+        self.schema_linker.close()
+        self.retrieve_context.close()
+        embedding_provider.release(self.embedding_model)
+
     # For experiment use only 
     def predict_rewriter_only(self, user_prompt: str) -> str:
         """Return the rewritten_prompt for the given prompt."""
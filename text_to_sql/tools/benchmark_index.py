@@ -0,0 +1,98 @@
+"""
+Benchmark recall@k and per-query latency of the approximate example index
+(IVF-PQ) against the exact flat index.
+
+Synthetic embeddings are drawn around random cluster centres so that, like real
+question embeddings, they are not uniformly spread over the sphere. Queries are
+perturbed copies of stored rows.
+
+Run from the text_to_sql directory:
+    python -m tools.benchmark_index --sizes 100000 1000000 --n-probe 4 16 64
+"""
+import argparse
+import time
+
+import numpy as np
+
+from core.vector_index import FlatIndex, IVFPQIndex, normalize_rows
+
+
+def synthetic_store(
+    size: int, dim: int, clusters: int, spread: float, rng: np.random.Generator
+) -> np.ndarray:
+    """Returns (size, dim) unit vectors scattered around random cluster centres."""
+    centres = normalize_rows(rng.standard_normal((clusters, dim)))
+    noise = spread * rng.standard_normal((size, dim)) / np.sqrt(dim)
+    return normalize_rows(centres[rng.integers(0, clusters, size)] + noise)
+
+
+def recall_at_k(exact: list, approximate: list, k: int) -> float:
+    """Fraction of the exact top-k ids that the approximate index also returned."""
+    hits = sum(len(set(e[:k]) & set(a[:k])) for e, a in zip(exact, approximate))
+    return hits / (k * len(exact))
+
+
+def run_queries(index, queries: np.ndarray, k: int):
+    """Returns the result ids of every query and the mean latency in milliseconds."""
+    start = time.perf_counter()
+    results = [index.search(query, k)[0].tolist() for query in queries]
+    return results, (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=2000)
+    parser.add_argument(
+        "--spread", type=float, default=0.6, help="Noise norm around each cluster centre (centres have norm 1)."
+    )
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--n-lists", type=int, default=1024)
+    parser.add_argument("--n-subvectors", type=int, default=48)
+    parser.add_argument("--n-probe", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--rerank", type=int, default=100, help="Candidates rescored exactly; 0 disables.")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(
+        f"{'rows':>9} {'index':>22} {'build (s)':>10} {'MB':>8} "
+        f"{'latency (ms)':>13} {f'recall@{args.k}':>10}"
+    )
+
+    for size in args.sizes:
+        store = synthetic_store(size, args.dim, args.clusters, args.spread, rng)
+        queries = normalize_rows(
+            store[rng.integers(0, size, args.queries)]
+            + 0.2 * args.spread * rng.standard_normal((args.queries, args.dim)) / np.sqrt(args.dim)
+        )
+
+        flat = FlatIndex(store)
+        exact, latency = run_queries(flat, queries, args.k)
+        print(f"{size:>9} {'flat':>22} {0.0:>10.1f} {store.nbytes / 2**20:>8.1f} {latency:>13.3f} {1.0:>10.3f}")
+
+        for rerank in sorted({0, args.rerank}):
+            start = time.perf_counter()
+            index = IVFPQIndex(
+                n_lists=args.n_lists, n_subvectors=args.n_subvectors, rerank=rerank
+            )
+            index.train(store)
+            index.add(store)
+            build = time.perf_counter() - start
+            memory = index._codes[: len(index)].nbytes + index.centroids.nbytes + index.codebooks.nbytes
+            if rerank:
+                memory += index._vectors[: len(index)].nbytes
+
+            for n_probe in args.n_probe:
+                index.n_probe = n_probe
+                approximate, latency = run_queries(index, queries, args.k)
+                name = f"ivfpq p={n_probe}" + (f" rr={rerank}" if rerank else "")
+                print(
+                    f"{size:>9} {name:>22} {build:>10.1f} {memory / 2**20:>8.1f} "
+                    f"{latency:>13.3f} {recall_at_k(exact, approximate, args.k):>10.3f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Measure memory per million examples and the recall impact of storing example
+embeddings at reduced precision (float16, int8, binary with float rescoring),
+against the float32 flat index.
+
+Run from the text_to_sql directory:
+    python -m tools.benchmark_quantization --size 200000 --rescore 32 64 128
+"""
+import argparse
+import os
+import tempfile
+
+import numpy as np
+
+from core.vector_index import FlatIndex, normalize_rows
+from tools.benchmark_index import recall_at_k, run_queries, synthetic_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=2000)
+    parser.add_argument("--spread", type=float, default=0.6)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--rescore", type=int, nargs="+", default=[32, 64, 128])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    store = synthetic_store(args.size, args.dim, args.clusters, args.spread, rng)
+    queries = normalize_rows(
+        store[rng.integers(0, args.size, args.queries)]
+        + 0.2 * args.spread * rng.standard_normal((args.queries, args.dim)) / np.sqrt(args.dim)
+    )
+
+    exact_1, _ = run_queries(FlatIndex(store), queries, 1)
+    exact_10, _ = run_queries(FlatIndex(store), queries, 10)
+
+    configurations = [("float32", 0), ("float16", 0), ("int8", 0)]
+    configurations += [("binary", rescore) for rescore in args.rescore]
+
+    print(
+        f"{'precision':>18} {'bytes/row':>10} {'MB per 1M':>10} "
+        f"{'latency (ms)':>13} {'recall@1':>9} {'recall@10':>10}"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        # Binary stores rescore from a memory map, as when loaded from a bundle
+        path = os.path.join(directory, "store.npy")
+        np.save(path, store)
+        mapped = np.load(path, mmap_mode="r")
+
+        for precision, rescore in configurations:
+            vectors = mapped if precision == "binary" else store
+            index = FlatIndex(vectors, precision=precision, rescore=rescore or 64)
+            per_row = index.nbytes / len(index)
+            approximate_1, latency = run_queries(index, queries, 1)
+            approximate_10, _ = run_queries(index, queries, 10)
+            name = precision + (f" rs={rescore}" if rescore else "")
+            print(
+                f"{name:>18} {per_row:>10.0f} {per_row * 1e6 / 2**20:>10.0f} {latency:>13.3f} "
+                f"{recall_at_k(exact_1, approximate_1, 1):>9.3f} {recall_at_k(exact_10, approximate_10, 10):>10.3f}"
+            )
+        del index, mapped
+
+    print(
+        "\nBinary memory is the packed codes only; rescoring reads the memory-mapped rows, "
+        "which the page cache shares between worker processes."
+    )
+
+
+if __name__ == "__main__":
+    main()
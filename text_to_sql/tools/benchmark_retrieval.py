@@ -0,0 +1,64 @@
+"""
+Benchmark per-query latency of example retrieval as the example store grows.
+
+Compares the previous row-by-row cosine loop with the vectorized matmul +
+argpartition top-k used by RetrieveContext. Embeddings are synthetic, so no
+model download is needed.
+
+Run from the text_to_sql directory:
+    python -m tools.benchmark_retrieval --sizes 1000 10000 100000 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from core.vector_index import normalize_rows, top_k_similar
+
+
+def loop_top_k(embeddings: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    """Row-by-row cosine similarity followed by a full sort, as done before."""
+    similarities = [
+        float(np.dot(query, emb) / (np.linalg.norm(query) * np.linalg.norm(emb)))
+        for emb in embeddings
+    ]
+    return np.argsort(similarities)[::-1][:k]
+
+
+def time_queries(fn, queries: np.ndarray) -> float:
+    """Returns the mean latency in milliseconds of fn over the queries."""
+    start = time.perf_counter()
+    for query in queries:
+        fn(query)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=384, help="Embedding size (all-MiniLM-L6-v2 is 384).")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=1)
+    parser.add_argument(
+        "--loop-max", type=int, default=100_000, help="Largest store size timed with the loop baseline."
+    )
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    queries = normalize_rows(rng.standard_normal((args.queries, args.dim)))
+
+    print(f"{'rows':>10} {'loop (ms)':>12} {'vectorized (ms)':>16} {'speedup':>9}")
+    for size in args.sizes:
+        embeddings = normalize_rows(rng.standard_normal((size, args.dim)))
+
+        vectorized = time_queries(lambda q: top_k_similar(embeddings, q, args.top_k), queries)
+        if size <= args.loop_max:
+            loop_queries = queries[: max(1, min(len(queries), 100_000 // size))]
+            loop = time_queries(lambda q: loop_top_k(embeddings, q, args.top_k), loop_queries)
+            print(f"{size:>10} {loop:>12.2f} {vectorized:>16.3f} {loop / vectorized:>8.0f}x")
+        else:
+            print(f"{size:>10} {'-':>12} {vectorized:>16.3f} {'-':>9}")
+
+
+if __name__ == "__main__":
+    main()
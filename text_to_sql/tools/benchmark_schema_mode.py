@@ -0,0 +1,147 @@
+"""
+Measure prompt tokens, end-to-end latency and execution accuracy of the filtered
+pipelines (generate_v3 and generate_v5) with the full schema against the pruned
+schema that only renders the linked tables.
+
+Prompt tokens are the usage reported by the provider for the query generator,
+including fix_query retries, and for the schema linker's entity extraction.
+Needs the API key and database variables used by the experiment notebooks
+(API_KEY_<PROVIDER>, DB_HOST_<DATABASE>, ...).
+
+Run from the text_to_sql directory:
+    python -m tools.benchmark_schema_mode sakila northwind academic soccer --limit 20
+"""
+import argparse
+import ast
+import os
+import time
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from text_to_sql import TextToSQL, Config, LLMConfig, SLConfig, ContextConfig, QueryConfig
+
+
+def build_config(
+    database: str, provider: str, model: str, min_confidence: float, schema_format: str, linker_mode: str
+) -> Config:
+    db_key = database.upper().replace("-", "_")
+    api_key = os.getenv(f"API_KEY_{provider.upper().replace('-', '_')}")
+
+    return Config(
+        rewriter_config=LLMConfig(type="api", model=model, provider=provider, api_key=api_key),
+        query_generator_config=LLMConfig(type="api", model=model, provider=provider, api_key=api_key),
+        schema_linker_config=SLConfig(
+            type="api",
+            model=model,
+            provider=provider,
+            api_key=api_key,
+            schema_path=f"files/schema/{database}.txt",
+            metadata_path=f"files/metadata/{database}.json",
+            min_link_confidence=min_confidence,
+            schema_format=schema_format,
+            linker_mode=linker_mode,
+        ),
+        retrieve_context_config=ContextConfig(data_path=f"files/dataset/dataset_{database}_example.csv"),
+        query_executor_config=QueryConfig(
+            host=os.getenv(f"DB_HOST_{db_key}"),
+            database=os.getenv(f"DB_DATABASE_{db_key}"),
+            user=os.getenv(f"DB_USER_{db_key}"),
+            password=os.getenv(f"DB_PASSWORD_{db_key}"),
+            port=os.getenv(f"DB_PORT_{db_key}"),
+        ),
+    )
+
+
+def run(engine: TextToSQL, method: str, dataset: pd.DataFrame) -> dict:
+    """Runs one pipeline over the dataset and aggregates tokens, latency and accuracy."""
+    schemas = []
+    generate_schema = engine.schema_linker.generate
+
+    def record_schema(*args, **kwargs):
+        result = generate_schema(*args, **kwargs)
+        schemas.append(result["schema"])
+        return result
+
+    engine.schema_linker.generate = record_schema
+    usage = engine.query_generator.model.usage
+    linker_usage = engine.schema_linker.model.usage
+    tokens_before = usage["prompt_tokens"]
+    linker_tokens_before = linker_usage["prompt_tokens"]
+    latencies, accuracies = [], []
+
+    try:
+        for _, row in dataset.iterrows():
+            start = time.perf_counter()
+            try:
+                query = getattr(engine, method)(user_prompt=row["Question"])
+            except Exception as e:
+                print(f"Warning: {method} failed on '{row['Question']}': {e}")
+                query = "ERROR"
+            latencies.append(time.perf_counter() - start)
+
+            try:
+                expected_columns = ast.literal_eval(row["Expected Result"])
+                accuracies.append(
+                    engine.evaluate(query=query, true_query=row["Answer"], expected_columns=expected_columns)
+                )
+            except Exception:
+                accuracies.append(0.0)
+    finally:
+        engine.schema_linker.generate = generate_schema
+
+    full_schema = engine.schema_linker.schema
+    return {
+        "prompt_tokens": (usage["prompt_tokens"] - tokens_before) / len(dataset),
+        "linker_prompt_tokens": (linker_usage["prompt_tokens"] - linker_tokens_before) / len(dataset),
+        "schema_chars": sum(len(s) for s in schemas) / max(len(schemas), 1),
+        "full_schema_share": sum(s == full_schema for s in schemas) / max(len(schemas), 1),
+        "latency_s": sum(latencies) / len(latencies),
+        "p95_latency_s": pd.Series(latencies).quantile(0.95),
+        "accuracy": sum(accuracies) / len(accuracies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("databases", nargs="+")
+    parser.add_argument("--provider", default="openai")
+    parser.add_argument("--model", default="gpt-4.1-mini")
+    parser.add_argument("--methods", nargs="+", default=["generate_v3", "generate_v5"])
+    parser.add_argument("--limit", type=int, default=20, help="Questions per database from the test set.")
+    parser.add_argument("--min-confidence", type=float, default=0.3)
+    parser.add_argument(
+        "--schema-format", default="raw", choices=["raw", "ddl", "compact", "typed"],
+        help="raw sends the schema file; the others render it from the metadata.",
+    )
+    parser.add_argument("--linker-mode", default="llm", choices=["llm", "local", "cascade"])
+    parser.add_argument("--output", default=None, help="Optional CSV path for the results.")
+    args = parser.parse_args()
+
+    load_dotenv()
+    results = []
+    for database in args.databases:
+        dataset = pd.read_csv(f"files/dataset/dataset_{database}_test.csv").head(args.limit)
+        config = build_config(
+            database, args.provider, args.model, args.min_confidence, args.schema_format, args.linker_mode
+        )
+        engine = TextToSQL(config=config)
+        try:
+            for method in args.methods:
+                for mode in ("full", "pruned"):
+                    engine.schema_linker.schema_mode = mode
+                    results.append(
+                        {"database": database, "method": method, "schema_mode": mode, **run(engine, method, dataset)}
+                    )
+                    print(results[-1])
+        finally:
+            engine.close()
+
+    summary = pd.DataFrame(results)
+    print(summary.to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+    if args.output:
+        summary.to_csv(args.output, index=False)
+
+
+if __name__ == "__main__":
+    main()